@@ -1,22 +1,147 @@
 import os
+from functools import lru_cache
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # App settings
     app_name: str = "Automate Notion Notes API"
     debug: bool = False
+    # Logging: "text", or "json" for one structured object per line
+    log_level: str = "INFO"
+    log_format: str = "text"
+    # Import yt-dlp and the OpenAI SDK in the background once the app accepts
+    # traffic, instead of in the first request that needs them
+    prewarm_enabled: bool = True
 
     #OpenAI API settings
     openai_api_key: str = ""
+    openai_timeout_seconds: float = 600.0
+    openai_base_url: Optional[str] = None  # None uses the SDK default
     
     # Notion API settings
     notion_api_key: str = ""
     notion_database_id: str = ""
+    notion_base_url: str = "https://api.notion.com"
+    # Notion allows roughly 3 requests per second per integration
+    notion_requests_per_second: float = 3.0
+    notion_burst: int = 3
+    notion_max_retries: int = 5
+    notion_backoff_base_seconds: float = 0.5
+    notion_backoff_max_seconds: float = 30.0
+    # Cached database schemas, also refreshed when last_edited_time changes
+    notion_schema_cache_size: int = 128
+    notion_schema_cache_ttl_seconds: int = 300
+    notion_database_index_ttl_seconds: int = 60
+    # What to do when a video already has a page in the database: skip, update or create
+    notion_on_duplicate: str = "skip"
     
-    # Instagram Authentication (optional)
+    # Instagram Authentication (optional). The installed yt-dlp's Instagram
+    # extractor only logs in with cookies (see ytdl_cookie_file); these are
+    # used only by yt-dlp versions whose extractor supports a password login
     instagram_username: str = ""
     instagram_password: str = ""
-    
+
+    # Long-lived yt-dlp sessions per worker, sharing a cookie jar persisted
+    # here (put the cookies of a logged-in Instagram session in it to log in)
+    ytdl_cookie_file: str = "data/cookies.txt"
+    ytdl_session_max_age_seconds: int = 3600
+    ytdl_max_idle_sessions: int = 8
+    # Max concurrent yt-dlp requests per extractor; others are bounded by download_workers
+    ytdl_extractor_concurrency: Dict[str, int] = {"Instagram": 2}
+
+    # Audio extraction
+    ffmpeg_location: str = "/opt/homebrew/bin/ffmpeg"
+    # Pipe the source through ffmpeg into memory instead of writing intermediate files
+    streaming_extraction: bool = True
+    stream_spill_threshold_bytes: int = 32 * 1024 * 1024
+
+    # Scratch space for downloads: one workspace per run under scratch_dir
+    # (default: the system temp directory), or on /dev/shm with scratch_tmpfs
+    scratch_dir: str = ""
+    scratch_tmpfs: bool = False
+    # Downloads wait once this much space is reserved, by all workers sharing
+    # state_db_path and the scratch root
+    scratch_quota_bytes: int = 2 * 1024 * 1024 * 1024
+    # Reservation per second of video when its file size is unknown (~4 Mbit/s)
+    scratch_bytes_per_second: int = 512 * 1024
+    scratch_default_reservation_bytes: int = 64 * 1024 * 1024
+    scratch_stale_seconds: int = 6 * 3600
+    scratch_janitor_interval_seconds: int = 300
+
+    # Split long audio on silences and transcribe the chunks concurrently
+    chunked_transcription: bool = True
+    chunk_threshold_seconds: int = 600
+    chunk_max_seconds: int = 300
+    chunk_overlap_seconds: float = 2.0
+    chunk_search_window_seconds: int = 60
+    chunk_silence_threshold_db: int = -35
+    chunk_min_silence_seconds: float = 0.4
+    chunk_transcription_fanout: int = 4
+
+    # Summarization sized by tokens: shorter transcripts are their own summary,
+    # longer ones are condensed in sections (in parallel) before summarizing
+    summary_min_tokens: int = 40
+    summary_chunk_tokens: int = 6000
+    summary_section_max_tokens: int = 500
+    summary_map_fanout: int = 4
+
+    # Worker pools (max concurrent blocking calls per pipeline stage)
+    download_workers: int = 4
+    openai_workers: int = 8
+
+    # In-process cache of yt-dlp metadata, keyed by canonical URL
+    metadata_cache_size: int = 512
+    metadata_cache_ttl_seconds: int = 900
+
+    # Persistent cache of transcripts and summaries, keyed by video id and model
+    result_cache_enabled: bool = True
+    result_cache_path: str = "data/results.db"
+    result_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Batch extraction
+    batch_max_items: int = 100
+    batch_max_in_flight: int = 8
+
+    # Shared HTTP connection pools for the OpenAI and Notion clients
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = True
+
+    # Local state (SQLite) for durable background work
+    state_db_path: str = "data/state.db"
+
+    # Write-behind Notion sync: respond before the page is written
+    notion_write_behind: bool = False
+    notion_sync_workers: int = 2
+    notion_sync_max_attempts: int = 8
+    notion_sync_retry_base_seconds: float = 5.0
+    notion_sync_retry_max_seconds: float = 600.0
+
+    # Concurrent requests for the same video share one pipeline run
+    single_flight_enabled: bool = True
+    # Also wait for runs in other worker processes sharing state_db_path (SQLite lease)
+    single_flight_lease: bool = False
+    single_flight_lease_ttl_seconds: float = 60.0
+    single_flight_lease_wait_seconds: float = 900.0
+
+    # Background extraction jobs
+    job_workers: int = 4
+    job_retention_hours: int = 72
+    # Jobs and Notion writes claimed by a worker are taken back when the worker
+    # is dead, or has not sent a heartbeat for claim_stale_seconds
+    claim_heartbeat_seconds: float = 15.0
+    claim_stale_seconds: float = 120.0
+
+    # Opt-in request profiling; off unless a token or a sample rate is set.
+    # Requests carrying X-Profile-Token: <profile_token> are always profiled.
+    profile_token: str = ""
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 5.0
+    profile_dir: str = "data/profiles"
+    profile_max_files: int = 100
+
     # Security
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
@@ -25,4 +150,30 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-settings = Settings()
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """The app settings, read from the environment and .env on first use"""
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Stand-in for the ``Settings`` instance that builds it on first access
+
+    Modules keep ``from app.config import settings as config`` and read
+    ``config.<name>`` as before; the environment and .env are only read
+    when a setting is first used, through ``get_settings``.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
+settings = _LazySettings()
@@ -0,0 +1,24 @@
+from fastapi import Depends, Request
+from app.services.clients import ServiceClients
+from app.services.jobs import JobQueue
+from app.services.notion import NotionService
+from app.services.outbox import NotionSyncWorker
+from app.services.pipeline import ExtractionPipeline
+
+# Shared objects are created once by the app lifespan (see app.main) and
+# handed to routes through these dependencies.
+
+def get_service_clients(request: Request) -> ServiceClients:
+    return request.app.state.clients
+
+def get_notion_service(clients: ServiceClients = Depends(get_service_clients)) -> NotionService:
+    return clients.notion
+
+def get_pipeline(request: Request) -> ExtractionPipeline:
+    return request.app.state.pipeline
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+def get_notion_sync(request: Request) -> NotionSyncWorker:
+    return request.app.state.notion_sync
@@ -1,14 +1,116 @@
-from fastapi import FastAPI
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from app.log import configure_logging
+from app.middleware import ProfilingMiddleware, RequestContextMiddleware
 from app.routers import audio
+from app.services.cache import shutdown_result_cache
+from app.services.executors import get_executors, shutdown_executors
+from app.services.clients import ServiceClients
+from app.services.jobs import JobQueue, JobStore
+from app.services.metrics import CONTENT_TYPE, render_metrics
+from app.services.outbox import NotionOutbox, NotionSyncWorker
+from app.services.profiler import get_profile_store
+from app.services.scratch import ScratchManager
+from app.services.singleflight import PipelineLease
+from app.services.pipeline import ExtractionPipeline
+from app.services.warmup import start_prewarm
+from app.services.ytdl_sessions import get_session_pool, shutdown_session_pool
+from app.config import settings as config
+from starlette.types import ASGIApp
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings are read on first use, so importing the app does not build them
+    configure_logging()
+    # Start the bounded stage pools before accepting traffic
+    get_executors()
+    # Pooled API clients shared by every request
+    app.state.clients = ServiceClients()
+    # yt-dlp sessions with the shared cookie jar and logins, set up off the event loop
+    await asyncio.to_thread(get_session_pool)
+    # Drain queued write-behind Notion pages in the background
+    app.state.notion_sync = NotionSyncWorker(
+        NotionOutbox(config.state_db_path),
+        app.state.clients.notion,
+        workers=config.notion_sync_workers
+    )
+    await app.state.notion_sync.start()
+    # Lets worker processes wait for each other's runs of the same video
+    lease = None
+    if config.single_flight_lease:
+        lease = PipelineLease(config.state_db_path, ttl=config.single_flight_lease_ttl_seconds)
+    # Bounded scratch space for downloads, with a janitor for orphaned workspaces
+    scratch = ScratchManager(
+        config.scratch_dir or None,
+        tmpfs=config.scratch_tmpfs,
+        quota_bytes=config.scratch_quota_bytes,
+        stale_seconds=config.scratch_stale_seconds,
+        db_path=config.state_db_path
+    )
+    await scratch.start_janitor(config.scratch_janitor_interval_seconds)
+    app.state.pipeline = ExtractionPipeline(
+        openai_factory=app.state.clients.get_openai,
+        notion_service=app.state.clients.notion,
+        notion_sync=app.state.notion_sync,
+        lease=lease,
+        scratch=scratch
+    )
+    # Resume queued and interrupted jobs from the local store
+    app.state.job_queue = JobQueue(JobStore(config.state_db_path), app.state.pipeline, workers=config.job_workers)
+    await app.state.job_queue.start()
+    # yt-dlp and the OpenAI SDK load in a thread while the app already serves
+    prewarm = start_prewarm(app.state.clients) if config.prewarm_enabled else None
+    yield
+    if prewarm is not None and not prewarm.done():
+        # The import thread cannot be interrupted; stop waiting for it
+        prewarm.cancel()
+    await app.state.job_queue.stop()
+    await app.state.notion_sync.stop()
+    await scratch.stop_janitor()
+    scratch.close()
+    shutdown_executors()
+    # Saves the cookie jar
+    shutdown_session_pool()
+    if lease is not None:
+        lease.close()
+    await app.state.clients.aclose()
+    shutdown_result_cache()
 
 
 # Create FastAPI instance
 app = FastAPI(
     title="Automate Notion Notes API",
     description="API for automating Notion note creation and management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+def profiling_middleware(app: ASGIApp) -> ASGIApp:
+    """
+    Opt-in request profiling; not installed at all unless configured
+
+    Called when the middleware stack is built at startup, so the settings
+    are read then rather than at import.
+    """
+    if not (config.profile_token or config.profile_sample_rate > 0):
+        return app
+    return ProfilingMiddleware(
+        app,
+        store=get_profile_store(),
+        token=config.profile_token,
+        sample_rate=config.profile_sample_rate,
+        interval=config.profile_interval_ms / 1000
+    )
+
+
+app.add_middleware(profiling_middleware)
+# Outermost, so everything below logs with the request id
+app.add_middleware(RequestContextMiddleware)
+
 # Include routers
 app.include_router(audio.router, prefix="/api/audio", tags=["audio"])
 # app.include_router(notes.router, prefix="/api/notes", tags=["notes"])
@@ -21,3 +123,18 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Pipeline stage latencies, throughput and errors in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_profile_token: str = Header(default="")):
+    """Download a saved request profile; open it at https://www.speedscope.app"""
+    if not config.profile_token or not hmac.compare_digest(x_profile_token.encode(), config.profile_token.encode()):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    profile = get_profile_store().load(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(profile, media_type="application/json")
@@ -0,0 +1,132 @@
+import asyncio
+import hmac
+import logging
+import random
+import re
+import time
+import uuid
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.log import request_id_var
+from app.services.profiler import ProfileStore, SamplingProfiler
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Client-supplied request ids are kept only when they look like ids
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+class RequestContextMiddleware:
+    """
+    Give every request an id and log one structured line when it finishes
+
+    The id comes from the ``X-Request-ID`` header when the client sends a
+    sensible one. It is echoed in the response and attached to every log
+    record written while the request runs.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = Headers(scope=scope).get(REQUEST_ID_HEADER, "")
+        request_id = supplied if _REQUEST_ID_RE.fullmatch(supplied) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            logger.info(
+                f"{scope['method']} {scope['path']} {status_code}",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                }
+            )
+            request_id_var.reset(token)
+
+
+class ProfilingMiddleware:
+    """
+    Capture a sampling profile of selected requests as speedscope JSON
+
+    A request is profiled when it carries ``X-Profile-Token`` matching the
+    configured token, or is picked at ``sample_rate``. One request is
+    profiled at a time; the profile is saved under a server-generated id,
+    which is returned in ``X-Profile-Id``. The request id, which clients can
+    choose, is only recorded in the profile's name. Only install this middleware when
+    profiling is configured, so other deployments pay nothing for it.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        token: str = "",
+        sample_rate: float = 0.0,
+        interval: float = 0.005
+    ):
+        self.app = app
+        self.store = store
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._active = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        supplied = Headers(scope=scope).get(PROFILE_TOKEN_HEADER)
+        if supplied is not None and self.token:
+            return hmac.compare_digest(supplied.encode(), self.token.encode())
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Never profile the download of a profile
+        if scope["type"] != "http" or self._active or scope["path"].startswith("/debug/") or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile_id = uuid.uuid4().hex
+        profiler: Optional[SamplingProfiler] = None
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        try:
+            profiler = SamplingProfiler(self.interval).start()
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            self._active = False
+            if profiler is not None:
+                profiler.stop()
+                name = f"{scope['method']} {scope['path']} ({profiler.duration * 1000:.0f} ms, request {request_id_var.get()})"
+                try:
+                    path = await asyncio.to_thread(self.store.save, profile_id, profiler.to_speedscope(name))
+                    logger.info(f"Saved profile of {profiler.sample_count()} samples to {path}")
+                except OSError:
+                    logger.exception("Failed to save profile")
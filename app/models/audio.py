@@ -1,11 +1,15 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 class AudioExtractionRequest(BaseModel):
     url: HttpUrl
     audio_format: Optional[str] = "mp3"
     quality: Optional[str] = "best"
+    audio_profile: Literal["speech", "hifi"] = "speech"  # speech: 16 kHz mono, low bitrate
     notion_database_id: Optional[str] = None  # Optional: specific database ID
+    notion_write_behind: Optional[bool] = None  # Queue the Notion write instead of waiting; defaults to config
+    on_duplicate: Optional[Literal["skip", "update", "create"]] = None  # Video already has a Notion page; defaults to config
+    debug: bool = False  # Include per-stage timings in the response
     # notion_page_title: Optional[str] = None   # Optional: custom title for the page
 
 class AudioExtractionResponse(BaseModel):
@@ -16,4 +20,44 @@ class AudioExtractionResponse(BaseModel):
     summary: Optional[str] = None
     notion_page_id: Optional[str] = None
     notion_page_url: Optional[str] = None
-    error: Optional[str] = None
\ No newline at end of file
+    notion_sync_id: Optional[str] = None  # Set when the Notion write was queued
+    notion_sync_status: Optional[str] = None
+    notion_duplicate: bool = False  # The video already had a Notion page, which was reused
+    video_id: Optional[str] = None  # Canonical video id, e.g. "Instagram:C1a2B3"
+    coalesced: bool = False  # Shared the run of a concurrent request for the same video
+    timings: Optional[Dict[str, float]] = None  # Seconds per stage, when debugging
+    error: Optional[str] = None
+class BatchExtractionRequest(BaseModel):
+    items: List[AudioExtractionRequest]
+
+class BatchExtractionResponse(BaseModel):
+    results: List[AudioExtractionResponse]  # Same order as the request items
+    succeeded: int
+    failed: int
+
+class NotionSyncStatusResponse(BaseModel):
+    sync_id: str
+    video_id: str
+    database_id: str
+    job_id: Optional[str] = None
+    status: str  # pending, running, done, failed or superseded
+    attempts: int
+    page_id: Optional[str] = None
+    page_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed or failed
+    stage: Optional[str] = None
+    progress: float = 0.0
+    result: Optional[AudioExtractionResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
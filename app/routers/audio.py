@@ -1,196 +1,224 @@
-from fastapi import APIRouter, HTTPException, status
-from app.models.audio import AudioExtractionRequest, AudioExtractionResponse
-import tempfile
-import os
-import shutil
+import asyncio
 import json
-import re
-from openai import OpenAI
+import logging
+from typing import Any, AsyncIterator, Dict, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from app.models.audio import (
+    AudioExtractionRequest,
+    AudioExtractionResponse,
+    BatchExtractionRequest,
+    BatchExtractionResponse,
+    JobStatusResponse,
+    JobSubmitResponse,
+    NotionSyncStatusResponse,
+)
+from app.config import settings as config
+from app.services.cache import get_result_cache
+from app.services.ratelimit import bucket_stats
+from app.services.executors import DOWNLOAD, run_in_stage
 from app.services.extractAudio import AudioExtractor
+from app.dependencies import get_job_queue, get_notion_service, get_notion_sync, get_pipeline
+from app.services.jobs import JobQueue
 from app.services.notion import NotionService
-from app.config import settings as config
+from app.services.outbox import NotionSyncWorker
+from app.services.page_index import backfill_page_index
+from app.services.pipeline import ExtractionPipeline, PipelineError
+from app.services.ytdl_sessions import get_session_pool
+
 
+# Set up logging
+logger = logging.getLogger(__name__)
 
-def clean_markdown(text: str) -> str:
-    """Remove markdown formatting from text"""
-    # Remove markdown headers
-    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-    # Remove bold formatting
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    # Remove italic formatting  
-    text = re.sub(r'\*(.*?)\*', r'\1', text)
-    # Remove horizontal lines
-    text = re.sub(r'^---+$', '', text, flags=re.MULTILINE)
-    # Remove blockquotes
-    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-    # Clean up extra whitespace
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    return text.strip()
+# Seconds between SSE keep-alive comments while a stage is running
+SSE_KEEPALIVE_SECONDS = 15.0
 
+# Streamed extractions keep running if the client goes away; hold on to them
+_stream_tasks = set()
 
 router = APIRouter()
 
 @router.post("/extract", response_model=AudioExtractionResponse)
-async def extract_audio_from_url(request: AudioExtractionRequest):
+async def extract_audio_from_url(
+    request: AudioExtractionRequest,
+    pipeline: ExtractionPipeline = Depends(get_pipeline)
+):
     """
     Extract audio from a video URL, transcribe it, and provide a summary
     """
-    # Create temporary directory for audio file
-    temp_dir = tempfile.mkdtemp()
-    
     try:
-        # Extract audio to temporary directory
-        extractor = AudioExtractor(output_dir=temp_dir)
-        result = extractor.extract_audio_from_url(
-            url=str(request.url),
-            audio_format=request.audio_format,
-            quality=request.quality
+        return await pipeline.run(request)
+    
+    except PipelineError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Audio processing failed: {str(e)}"
         )
-        
-        if not result['success']:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=result['error']
-            )
-        
-        # Initialize OpenAI client
-        client = OpenAI(api_key=config.openai_api_key)
-        
-        # Step 1: Transcribe audio to text
-        with open(result['file_path'], "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model="gpt-4o-transcribe",  
-                file=audio_file,
-            )
-        
-        # Step 2: Summarize the transcript and extract metadata
-        transcript_length = len(transcription.text.split())
-        # More generous token calculation: at least 300, up to 1000 tokens
-        dynamic_max_tokens = min(1000, max(300, transcript_length))
-        
-        summary_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": """You are a helpful assistant that summarizes content from short form videos like reels.
 
-CRITICAL: You must return ONLY a JSON object. Do NOT use any markdown formatting in the summary field.
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-Return a JSON object with this EXACT structure:
-{
-  "title": "A concise title",
-  "category": "If fitness related categorize by body part. Otherwise categorize by topic.",
-  "summary": "Plain text summary with proper line breaks. Use numbered lists and bullet points as shown below."
-}
+@router.post("/extract/stream")
+async def extract_audio_stream(
+    request: AudioExtractionRequest,
+    pipeline: ExtractionPipeline = Depends(get_pipeline)
+):
+    """
+    Run an extraction and stream its results as server-sent events
 
+    Events, in order: ``stage`` (as each stage starts), ``metadata``,
+    ``transcript``, ``summary_delta`` (summary text as the model writes it),
+    ``summary``, ``notion``, then ``done`` with the full response or
+    ``error`` with ``detail`` and ``status_code``. The extraction finishes
+    even if the client disconnects.
+    """
+    queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue()
 
-REQUIRED formatting (with line breaks):
-1. First main point
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        queue.put_nowait((event, data))
 
-• Sub-point under first point
-• Another sub-point
+    async def on_stage(stage: str, progress: float) -> None:
+        on_event("stage", {"stage": stage, "progress": progress})
 
-2. Second main point
+    async def run() -> None:
+        try:
+            response = await pipeline.run(request, on_stage=on_stage, on_event=on_event)
+            on_event("done", response.model_dump())
+        except PipelineError as e:
+            on_event("error", {"detail": str(e), "status_code": e.status_code})
+        except Exception as e:
+            logger.exception(f"Audio processing failed for {request.url}")
+            on_event("error", {"detail": f"Audio processing failed: {str(e)}", "status_code": 500})
+        finally:
+            queue.put_nowait(None)
 
-• Sub-point under second point
-• Final sub-point
+    task = asyncio.create_task(run())
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
 
-Each numbered item should be on its own line. Each bullet point should be on its own line. Use actual line breaks (\\n) between sections.
+    async def events() -> AsyncIterator[str]:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            yield _sse(*item)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-Focus on key takeaways and actionable insights. No filler content or sponsorship mentions."""},
-                {"role": "user", "content": f"Please analyze and summarize this transcript:\n\n{transcription.text}"}
-            ],
-            max_tokens=dynamic_max_tokens,
-            temperature=0.3
+@router.post("/extract/batch", response_model=BatchExtractionResponse)
+async def extract_audio_batch(
+    request: BatchExtractionRequest,
+    pipeline: ExtractionPipeline = Depends(get_pipeline)
+):
+    """
+    Run several extractions with their stages pipelined, returning per-item results
+    """
+    if not request.items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Batch must contain at least one item"
         )
-        
-        # Parse the JSON response
-        try:
-            summary_data = json.loads(summary_response.choices[0].message.content)
-            # Clean any remaining markdown from the summary
-            summary_data['summary'] = clean_markdown(summary_data['summary'])
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            summary_data = {
-                "title": f"Summary: {result['title']}" if result.get('title') else "Video Summary",
-                "category": "Other",
-                "author": "Unknown",
-                "summary": summary_response.choices[0].message.content
-            }
-        
-        # Optional: Save to Notion if database_id is provided
-        notion_page_id = None
-        notion_page_url = None
+    if len(request.items) > config.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch too large: {len(request.items)} items (max {config.batch_max_items})"
+        )
+    
+    results = await pipeline.run_batch(request.items)
+    succeeded = sum(1 for result in results if result.success)
+    
+    return BatchExtractionResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded
+    )
 
-        print("Config Notion Database ID:", config.notion_database_id)
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_extraction_job(
+    request: AudioExtractionRequest,
+    job_queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Queue an extraction and return a job id immediately
+    """
+    job_id = await job_queue.submit(request)
+    return JobSubmitResponse(job_id=job_id, status="queued")
 
-        if request.notion_database_id or config.notion_database_id:
-            print("Saving to Notion...")
-            try:
-                notion_service = NotionService()
-                database_id = request.notion_database_id or config.notion_database_id
-                
-                # Get author information - use uploader from video info or fallback
-                author = "Unknown"
-                try:
-                    video_info = extractor.get_video_info(str(request.url))
-                    if video_info.get('success') and video_info.get('uploader'):
-                        author = video_info['title'].split("Video by")[1].rstrip()
-                except Exception as e:
-                    print(f"Could not get video uploader info: {e}")
-                
-                page_title = summary_data['title']
-                
-                notion_result = notion_service.create_page_in_database(
-                    database_id=database_id,
-                    title=page_title,
-                    category=summary_data['category'],
-                    author=author,
-                    summary=summary_data['summary'],
-                    transcript=transcription.text,
-                    video_url=str(request.url),
-                    duration=result['duration'],
-                    video_title=result['title']
-                )
-                
-                print(f"Notion result: {notion_result}")
-                
-                if notion_result['success']:
-                    notion_page_id = notion_result['page_id']
-                    notion_page_url = notion_result['page_url']
-                    print(f"Successfully created Notion page: {notion_page_url}")
-                else:
-                    print(f"Failed to create Notion page: {notion_result.get('error', 'Unknown error')}")
-                    
-            except Exception as notion_error:
-                # Don't fail the whole request if Notion fails
-                print(f"Failed to save to Notion: {str(notion_error)}")
-                print(f"Notion error type: {type(notion_error)}")
-                import traceback
-                print(f"Notion error traceback: {traceback.format_exc()}")
-                pass
-        
-        return AudioExtractionResponse(
-            success=True,
-            title=summary_data['title'],
-            duration=result['duration'],
-            transcript=transcription.text,
-            summary=summary_data['summary'],
-            notion_page_id=notion_page_id,
-            notion_page_url=notion_page_url
-        )
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_extraction_job(
+    job_id: str,
+    job_queue: JobQueue = Depends(get_job_queue),
+    notion_sync: NotionSyncWorker = Depends(get_notion_sync)
+):
+    """
+    Get the stage, progress and result of an extraction job
+    """
+    job = await job_queue.get(job_id)
     
-    except HTTPException:
-        raise
-    except Exception as e:
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Audio processing failed: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
         )
     
-    finally:
-        # Clean up temporary directory
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+    # A write-behind Notion page may have been created since the job finished
+    result = job['result']
+    if result and result.get('notion_sync_id'):
+        entry = await notion_sync.get(result['notion_sync_id'])
+        if entry is not None:
+            result['notion_sync_status'] = entry['status']
+            result['notion_page_id'] = entry['page_id']
+            result['notion_page_url'] = entry['page_url']
+    
+    return JobStatusResponse(
+        job_id=job['id'],
+        status=job['status'],
+        stage=job['stage'],
+        progress=job['progress'],
+        result=result,
+        error=job['error'],
+        created_at=job['created_at'],
+        updated_at=job['updated_at']
+    )
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get hit/miss counters and size of the transcript and summary cache
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/scratch/stats")
+async def get_scratch_stats(pipeline: ExtractionPipeline = Depends(get_pipeline)):
+    """
+    Get the quota, reserved and used bytes of the download scratch space
+    """
+    return await asyncio.to_thread(pipeline.scratch.usage)
+
+@router.get("/sessions/stats")
+async def get_session_stats():
+    """
+    Get the idle, created and reused yt-dlp sessions of this worker and its cookie count
+    """
+    return get_session_pool().stats()
 
 @router.get("/info")
 async def get_video_info(url: str):
@@ -199,7 +227,7 @@ async def get_video_info(url: str):
     """
     try:
         extractor = AudioExtractor()
-        result = extractor.get_video_info(url)
+        result = await run_in_stage(DOWNLOAD, extractor.get_video_info, url)
         
         if result['success']:
             return result
@@ -217,37 +245,95 @@ async def get_video_info(url: str):
             detail=f"Failed to get video info: {str(e)}"
         )
 
+@router.get("/notion/stats")
+async def get_notion_stats():
+    """
+    Get request, throttling and retry metrics for each Notion integration token
+    """
+    return {"integrations": bucket_stats()}
+
+@router.get("/notion/sync/{video_id:path}", response_model=NotionSyncStatusResponse)
+async def get_notion_sync_status(video_id: str, notion_sync: NotionSyncWorker = Depends(get_notion_sync)):
+    """
+    Get the status of the latest write-behind Notion write for a video
+
+    ``video_id`` is the ``video_id`` returned by the extract endpoints, or the
+    ``notion_sync_id`` of a specific write.
+    """
+    entry = await notion_sync.latest_for_video(video_id) or await notion_sync.get(video_id)
+    
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No Notion sync found for: {video_id}"
+        )
+    
+    return NotionSyncStatusResponse(**entry)
+
 @router.get("/notion/databases")
-async def list_notion_databases():
+async def list_notion_databases(
+    format: Literal["json", "ndjson"] = "json",
+    refresh: bool = False,
+    notion_service: NotionService = Depends(get_notion_service)
+):
     """
     List all Notion databases available to the integration
+
+    The listing follows Notion's pagination to the end and is streamed as it
+    arrives, either as one JSON document or as newline-delimited JSON
+    (``format=ndjson``). Results are served from a short-lived cache unless
+    ``refresh`` is set.
     """
-    try:
-        notion_service = NotionService()
-        result = notion_service.list_databases()
-        
-        if result['success']:
-            return result
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=result['error']
-            )
+    databases = notion_service.iter_databases(refresh=refresh)
     
+    # Fetch the first page before responding so errors still get a status code
+    try:
+        first = await databases.__anext__()
+    except StopAsyncIteration:
+        first = None
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to list Notion databases: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to list databases: {str(e)}"
         )
+    
+    if format == "ndjson":
+        return StreamingResponse(_ndjson_databases(first, databases), media_type="application/x-ndjson")
+    return StreamingResponse(_json_databases(first, databases), media_type="application/json")
+
+async def _json_databases(first, databases):
+    # A failure after the first page is reported at the end of the document
+    yield '{"databases": ['
+    if first is not None:
+        yield json.dumps(first)
+        try:
+            async for database in databases:
+                yield ", " + json.dumps(database)
+        except Exception as e:
+            yield '], "success": false, "error": ' + json.dumps(f"Failed to list databases: {str(e)}") + '}'
+            return
+    yield '], "success": true}'
+
+async def _ndjson_databases(first, databases):
+    if first is None:
+        return
+    yield json.dumps(first) + "\n"
+    try:
+        async for database in databases:
+            yield json.dumps(database) + "\n"
+    except Exception as e:
+        yield json.dumps({"error": f"Failed to list databases: {str(e)}"}) + "\n"
 
 @router.get("/notion/database/{database_id}/properties")
-async def get_database_properties(database_id: str):
+async def get_database_properties(
+    database_id: str,
+    notion_service: NotionService = Depends(get_notion_service)
+):
     """
     Get the properties schema of a specific Notion database
     """
     try:
-        notion_service = NotionService()
-        result = notion_service.get_database_properties(database_id)
+        result = await notion_service.get_database_properties(database_id)
         
         if result['success']:
             return result
@@ -262,3 +348,23 @@ async def get_database_properties(database_id: str):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get database properties: {str(e)}"
         )
+
+@router.post("/notion/database/{database_id}/index")
+async def index_database_pages(
+    database_id: str,
+    notion_service: NotionService = Depends(get_notion_service)
+):
+    """
+    Backfill the local video to page index from the existing pages of a database
+
+    Pages are matched to videos through their URL property, so duplicates
+    created before the index existed are recognized too.
+    """
+    try:
+        return await backfill_page_index(notion_service, database_id)
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to index database pages: {str(e)}"
+        )
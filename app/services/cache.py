@@ -0,0 +1,193 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+from app.config import settings as config
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Initialize the TTLCache
+
+        Args:
+            maxsize: Maximum number of entries; the least recently used entry
+                     is evicted when the cache is full
+            ttl: Seconds an entry stays valid after it is stored
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class ResultCache:
+    """
+    Persistent, size-bounded SQLite cache for transcripts, summaries and the
+    video details they were made for
+
+    Keys are content addresses built from the canonical video id plus the
+    model (and prompt version) that produced the value, so a model or prompt
+    change never serves stale results. When the stored values exceed
+    ``max_bytes`` the least recently used entries are evicted.
+    """
+
+    TRANSCRIPT = "transcript"
+    SUMMARY = "summary"
+    VIDEO = "video"
+
+    def __init__(self, db_path: str, max_bytes: int):
+        """
+        Initialize the ResultCache
+
+        Args:
+            db_path: Path of the SQLite database file. Parent directories are
+                     created if they do not exist.
+            max_bytes: Upper bound on the total size of cached values
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._counters = {kind: {"hits": 0, "misses": 0} for kind in (self.TRANSCRIPT, self.SUMMARY, self.VIDEO)}
+        self._evictions = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    @staticmethod
+    def make_key(kind: str, video_key: str, *parts: str) -> str:
+        """Build the content address for a result"""
+        raw = "|".join((kind, video_key) + parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """Return the decoded value for key, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counters[kind]["misses"] += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._counters[kind]["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, kind: str, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict old entries if over budget"""
+        encoded = json.dumps(value)
+        size = len(encoded.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, kind, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, encoded, size, now, now)
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Other processes may share the file, so start from the real total
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._size -= size
+            self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {
+                **{kind: dict(counters) for kind, counters in self._counters.items()},
+                "entries": entries,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the process-wide result cache, or None if it is disabled"""
+    global _result_cache
+    if _result_cache is None and config.result_cache_enabled:
+        _result_cache = ResultCache(config.result_cache_path, max_bytes=config.result_cache_max_bytes)
+    return _result_cache
+
+
+def shutdown_result_cache() -> None:
+    """Close the process-wide result cache if it was opened"""
+    global _result_cache
+    if _result_cache is not None:
+        _result_cache.close()
+        _result_cache = None
@@ -0,0 +1,81 @@
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from typing import Optional, Tuple
+
+# The pid the owner below was made for, and the owner
+_owner: Optional[Tuple[int, str]] = None
+
+
+def current_owner() -> str:
+    """
+    Identify this process in the rows it claims: "<host>:<pid>:<token>"
+
+    The token tells a restarted process apart from a dead one that had the
+    same pid (in a container every worker may be pid 1). It is made on first
+    use in each process, so workers forked after import (gunicorn
+    --preload) do not share their parent's.
+    """
+    global _owner
+    pid = os.getpid()
+    if _owner is None or _owner[0] != pid:
+        _owner = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+    return _owner[1]
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_is_dead(owner: Optional[str]) -> bool:
+    """
+    Whether the process that claimed a row is known to be gone
+
+    Only owners on this host can be checked; claims of other hosts expire
+    through their heartbeat instead.
+    """
+    if not owner:
+        # Claimed before owners were recorded
+        return True
+    try:
+        host, pid, token = owner.rsplit(":", 2)
+        pid_number = int(pid)
+    except ValueError:
+        return True
+    own_host, own_pid, own_token = current_owner().rsplit(":", 2)
+    if host != own_host:
+        return False
+    if pid == own_pid:
+        return token != own_token
+    return not pid_alive(pid_number)
+
+
+def owner_is_local(owner: Optional[str]) -> bool:
+    """Whether the owner is a process on this host"""
+    return bool(owner) and owner.rsplit(":", 2)[0] == current_owner().rsplit(":", 2)[0]
+
+
+def claim_is_stale(owner: Optional[str], heartbeat_at: Optional[float], stale_seconds: float) -> bool:
+    """A running row should be taken back when its owner died or stopped sending heartbeats"""
+    if owner == current_owner():
+        return False
+    if owner_is_dead(owner):
+        return True
+    return heartbeat_at is None or time.time() - heartbeat_at > stale_seconds
+
+
+def add_claim_columns(conn: sqlite3.Connection, table: str) -> None:
+    """Add the ``owner`` and ``heartbeat_at`` columns to a table created without them"""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if "owner" not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN owner TEXT")
+    if "heartbeat_at" not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN heartbeat_at REAL")
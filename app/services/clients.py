@@ -0,0 +1,85 @@
+import importlib.util
+import logging
+import threading
+from typing import TYPE_CHECKING, Optional
+
+import httpx
+from notion_client import AsyncClient
+
+from app.config import settings as config
+from app.services.lazy import LazyModule
+from app.services.notion import NotionService
+from app.services.page_index import NotionPageIndex
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+openai = LazyModule('openai')
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``)"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ServiceClients:
+    """
+    Connection-pooled OpenAI and Notion clients shared by the whole process
+
+    Created once at startup so every request reuses warm keep-alive
+    connections instead of paying for new TLS handshakes. The OpenAI client
+    is built on first use (see ``get_openai``) so startup does not wait for
+    the SDK import.
+    """
+
+    def __init__(self):
+        limits = httpx.Limits(
+            max_connections=config.http_max_connections,
+            max_keepalive_connections=config.http_max_keepalive_connections,
+            keepalive_expiry=config.http_keepalive_expiry_seconds
+        )
+        http2 = config.http2_enabled and _http2_available()
+        if config.http2_enabled and not http2:
+            logger.info("h2 is not installed, using HTTP/1.1 keep-alive connections")
+
+        # notion_client configures base URL and headers on the httpx client it
+        # is given, so each API gets its own pool
+        self._openai_http = httpx.Client(
+            limits=limits,
+            http2=http2,
+            timeout=httpx.Timeout(config.openai_timeout_seconds, connect=10.0)
+        )
+        self._notion_http = httpx.AsyncClient(limits=limits, http2=http2)
+
+        self._openai: Optional["OpenAI"] = None
+        self._openai_lock = threading.Lock()
+        self.notion = NotionService(
+            client=AsyncClient(client=self._notion_http, auth=config.notion_api_key, base_url=config.notion_base_url),
+            page_index=NotionPageIndex(config.state_db_path)
+        )
+
+    def get_openai(self) -> "OpenAI":
+        """The pooled OpenAI client, created on the first call from any thread"""
+        if self._openai is None:
+            with self._openai_lock:
+                if self._openai is None:
+                    self._openai = openai.OpenAI(
+                        api_key=config.openai_api_key,
+                        base_url=config.openai_base_url,
+                        http_client=self._openai_http
+                    )
+        return self._openai
+
+    @property
+    def openai(self) -> "OpenAI":
+        return self.get_openai()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections"""
+        # Closes the pool whether or not the client was ever created
+        self._openai_http.close()
+        await self._notion_http.aclose()
+        self.notion.page_index.close()
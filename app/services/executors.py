@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.config import settings as config
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Pipeline stages that run blocking code (Notion calls are async and rate limited instead)
+DOWNLOAD = "download"
+OPENAI = "openai"
+
+
+class StageExecutors:
+    """Bounded thread pools, one per blocking pipeline stage"""
+
+    def __init__(self, pool_sizes: Dict[str, int]):
+        """
+        Initialize the stage executors
+
+        Args:
+            pool_sizes: Maximum number of worker threads for each stage
+        """
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=max(1, size), thread_name_prefix=f"{stage}-worker")
+            for stage, size in pool_sizes.items()
+        }
+
+    async def run(self, stage: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking callable on the executor for the given stage
+
+        The current context is copied so context variables set by the caller
+        are visible inside the worker thread.
+        """
+        executor = self._executors[stage]
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down every stage executor"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+
+
+_executors: Optional[StageExecutors] = None
+
+
+def get_executors() -> StageExecutors:
+    """Return the process-wide stage executors, creating them on first use"""
+    global _executors
+    if _executors is None:
+        _executors = StageExecutors({
+            DOWNLOAD: config.download_workers,
+            OPENAI: config.openai_workers,
+        })
+        logger.info(
+            f"Stage executors started (download={config.download_workers}, "
+            f"openai={config.openai_workers})"
+        )
+    return _executors
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    """Shut down the process-wide stage executors if they were started"""
+    global _executors
+    if _executors is not None:
+        _executors.shutdown(wait=wait)
+        _executors = None
+
+
+async def run_in_stage(stage: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking callable on the bounded executor for a pipeline stage"""
+    return await get_executors().run(stage, func, *args, **kwargs)
@@ -1,46 +1,245 @@
-import yt_dlp
+import copy
+import functools
 import os
+import re
+import shutil
+import subprocess
 import tempfile
+import threading
 from typing import Optional, Dict, Any
 from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 import logging
+from app.config import settings as config
+from app.services.cache import TTLCache
+from app.services.lazy import LazyModule
+from app.services.metrics import StageTimer
+from app.services.ytdl_sessions import YoutubeDLSessionPool, get_session_pool
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Imported on first use; importing yt-dlp loads hundreds of extractor modules
+yt_dlp = LazyModule('yt_dlp')
+
+# Query parameters that never change which video a URL points to
+_TRACKING_PARAMS = {'igsh', 'igshid', 'si', 'feature', 'fbclid', 'gclid', 'ref', 'is_from_webapp', 'sender_device'}
+
+# Transcode settings per extraction profile. Speech-to-text models resample to
+# 16 kHz mono anyway, so the speech profile keeps files (and uploads) small.
+AUDIO_PROFILES = {
+    'speech': {'bitrate': '32', 'ffmpeg_args': ['-ac', '1', '-ar', '16000']},
+    'hifi': {'bitrate': '192', 'ffmpeg_args': []},
+}
+DEFAULT_AUDIO_PROFILE = 'speech'
+
+# ffmpeg encoder and container for each output format that can be written to a pipe
+STREAMABLE_FORMATS = {
+    'mp3': ('libmp3lame', 'mp3'),
+    'opus': ('libopus', 'ogg'),
+    'ogg': ('libvorbis', 'ogg'),
+    'flac': ('flac', 'flac'),
+    'wav': ('pcm_s16le', 'wav'),
+}
+
+# Protocols ffmpeg can read directly from the selected format's URL
+STREAMABLE_PROTOCOLS = {'http', 'https', 'm3u8', 'm3u8_native'}
+
+# ffmpeg silencedetect / header output
+_SILENCE_START_RE = re.compile(r'silence_start: (-?\d+(?:\.\d+)?)')
+_SILENCE_END_RE = re.compile(r'silence_end: (-?\d+(?:\.\d+)?)')
+_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+
+# Raw yt-dlp info dicts keyed by canonical URL, shared by every extractor in the process
+_metadata_cache: Optional[TTLCache] = None
+_metadata_cache_lock = threading.Lock()
+
+
+def _get_metadata_cache() -> TTLCache:
+    """Return the process-wide metadata cache, creating it on first use"""
+    global _metadata_cache
+    if _metadata_cache is None:
+        with _metadata_cache_lock:
+            if _metadata_cache is None:
+                _metadata_cache = TTLCache(maxsize=config.metadata_cache_size, ttl=config.metadata_cache_ttl_seconds)
+    return _metadata_cache
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a video URL so that equivalent links share a cache key
+
+    Lowercases the host, drops a leading ``www.``, the fragment, trailing
+    slashes and tracking query parameters, and sorts what is left of the query.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in _TRACKING_PARAMS and not key.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ''))
+
+
+# yt-dlp extractor classes in matching order, without the catch-all generic one
+_extractor_classes = None
+
+
+def load_extractor_classes() -> list:
+    """Build the extractor class list ``video_key_from_url`` matches against, once"""
+    global _extractor_classes
+    if _extractor_classes is None:
+        _extractor_classes = [ie for ie in yt_dlp.extractor.gen_extractor_classes() if ie.ie_key() != 'Generic']
+    return _extractor_classes
+
+
+def _site_extractor(url: str):
+    """The first site-specific yt-dlp extractor class whose URL pattern matches, or None"""
+    for ie in load_extractor_classes():
+        if ie.suitable(url):
+            return ie
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def video_key_from_url(url: str) -> Optional[str]:
+    """
+    Derive the canonical video id (see ``AudioExtractor.get_video_key``) from
+    the URL alone, without a network request
+
+    Uses the first site-specific yt-dlp extractor whose URL pattern matches.
+    Returns None for URLs only the generic extractor would handle, or whose
+    pattern carries no id.
+    """
+    ie = _site_extractor(url)
+    if ie is None:
+        return None
+    try:
+        video_id = ie.get_temp_id(url)
+    except Exception:
+        return None
+    return f"{ie.ie_key()}:{video_id}" if video_id else None
+
+
+@functools.lru_cache(maxsize=1024)
+def extractor_key_from_url(url: str) -> str:
+    """Key of the yt-dlp extractor that will handle the URL ('Generic' when no site matches)"""
+    ie = _site_extractor(url)
+    return ie.ie_key() if ie is not None else 'Generic'
+
+
 class AudioExtractor:
     """Service for extracting audio from video URLs using yt-dlp"""
     
-    def __init__(self, output_dir: Optional[str] = None):
+    def __init__(self, output_dir: Optional[str] = None, sessions: Optional[YoutubeDLSessionPool] = None):
         """
         Initialize the AudioExtractor
         
         Args:
             output_dir: Directory to save extracted audio files. 
                        If None, uses system temp directory.
-            instagram_username: Instagram username for authentication
-            instagram_password: Instagram password for authentication
+            sessions: yt-dlp sessions, cookies, logins and per-extractor
+                      limits to use. If None, the worker's shared pool is
+                      used.
         """
+        self._sessions = sessions
         # Set default output directory to a more accessible location
         if output_dir is None:
             output_dir = tempfile.gettempdir()
         
         self.output_dir = output_dir
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+
+    @property
+    def sessions(self) -> YoutubeDLSessionPool:
+        # Resolved on first use, which is in a download thread
+        if self._sessions is None:
+            self._sessions = get_session_pool()
+        return self._sessions
     
+    def extract_info(self, url: str) -> Dict[str, Any]:
+        """
+        Extract video metadata without downloading, using the shared metadata cache
+
+        The unprocessed info dict is cached so it can later be handed to
+        ``YoutubeDL.process_ie_result`` to download without extracting again.
+
+        Args:
+            url: Video URL
+
+        Returns:
+            A private copy of the raw yt-dlp info dict
+
+        Raises:
+            yt_dlp.DownloadError: if the metadata could not be extracted
+        """
+        key = canonicalize_url(url)
+        metadata_cache = _get_metadata_cache()
+        info = metadata_cache.get(key)
+        if info is None:
+            logger.info(f"Extracting info for URL: {url}")
+            extractor_key = extractor_key_from_url(url)
+            with self.sessions.limit(extractor_key), self.sessions.session(extractor_key) as ydl:
+                info = self._resolve_video(ydl, ydl.extract_info(url, download=False, process=False))
+            metadata_cache.set(key, info)
+        return copy.deepcopy(info)
+
+    def _resolve_video(self, ydl: 'yt_dlp.YoutubeDL', info: Optional[Dict[str, Any]], hops: int = 0) -> Dict[str, Any]:
+        """Follow redirect results and pick the first video of a playlist"""
+        if not info:
+            raise yt_dlp.DownloadError("Could not extract video information")
+        if hops > 5:
+            raise yt_dlp.DownloadError("Too many redirects while extracting video information")
+
+        if info.get('_type') == 'url':
+            resolved = ydl.extract_info(info['url'], download=False, ie_key=info.get('ie_key'), process=False)
+            return self._resolve_video(ydl, resolved, hops + 1)
+
+        if info.get('_type') == 'playlist':
+            entry = next((entry for entry in info.get('entries') or [] if entry), None)
+            return self._resolve_video(ydl, entry, hops + 1)
+
+        return info
+
+    @staticmethod
+    def get_video_key(info: Dict[str, Any]) -> str:
+        """Canonical, URL-independent id of a video: ``<extractor key>:<video id>``"""
+        return f"{info.get('extractor_key') or info.get('extractor') or 'Generic'}:{info.get('id')}"
+
+    @staticmethod
+    def get_author(info: Dict[str, Any]) -> str:
+        """Derive the author from Instagram's "Video by <user>" title, falling back to the uploader"""
+        title = info.get('title') or ''
+        if 'Video by' in title:
+            author = title.split('Video by', 1)[1].strip()
+            if author:
+                return author
+        return info.get('uploader') or 'Unknown'
+
     def extract_audio_from_url(
         self, 
         url: str, 
         audio_format: str = 'mp3',
-        quality: str = 'best'
+        quality: str = 'best',
+        info: Optional[Dict[str, Any]] = None,
+        profile: str = DEFAULT_AUDIO_PROFILE
     ) -> Dict[str, Any]:
         """
         Extract audio from a video URL (Instagram Reel, YouTube, TikTok, etc.)
         
+        Metadata comes from the shared cache when available and the download
+        reuses that info dict, so the video page is scraped at most once.
+        
         Args:
             url: The video URL to extract audio from
             audio_format: Audio format (mp3, wav, m4a, etc.)
             quality: Audio quality ('best', 'worst', or specific bitrate)
+            info: Raw info dict from ``extract_info``, if the caller already has it
+            profile: Extraction profile ('speech' for 16 kHz mono at a low
+                     bitrate, 'hifi' for full-quality audio)
         
         Returns:
             Dict containing:
@@ -48,130 +247,396 @@ class AudioExtractor:
                 - file_path: str (path to extracted audio file)
                 - title: str (video title)
                 - duration: float (duration in seconds)
+                - uploader: str (uploader name, if known)
+                - author: str (author derived from the title or uploader)
+                - video_id: str (extractor-specific video id)
+                - extractor_key: str (yt-dlp extractor that handled the URL)
+                - downloaded_bytes: int (source bytes downloaded)
+                - transcode_seconds: float (time spent in the ffmpeg audio extraction)
                 - error: str (if any error occurred)
         """
+        result = self._empty_result()
+        downloaded = {}
+        transcode = StageTimer('transcode')
+        
+        def on_progress(status: Dict[str, Any]) -> None:
+            if status.get('status') == 'finished':
+                downloaded[status.get('filename')] = status.get('downloaded_bytes') or status.get('total_bytes') or 0
+        
+        def on_postprocess(status: Dict[str, Any]) -> None:
+            if status.get('postprocessor') != 'ExtractAudio':
+                return
+            if status.get('status') == 'started':
+                transcode.start()
+            elif status.get('status') == 'finished':
+                result['transcode_seconds'] = transcode.stop()
+
         try:
+            if profile not in AUDIO_PROFILES:
+                result['error'] = f"Unknown audio profile: {profile}"
+                return result
+            audio_profile = AUDIO_PROFILES[profile]
+            
             # Configure yt-dlp options
             ydl_opts = {
                 'format': 'bestaudio/best',
                 'extractaudio': True,
                 'audioformat': audio_format,
                 'audioquality': quality,
-                'outtmpl': os.path.join(self.output_dir, '%(title)s.%(ext)s'),
+                # Named by video id; the final path is read back from yt-dlp
+                'outtmpl': os.path.join(self.output_dir, '%(id)s.%(ext)s'),
                 'noplaylist': True,
                 'writeinfojson': False,
                 'writesubtitles': False,
                 'writeautomaticsub': False,
                 'ignoreerrors': False,
-                'ffmpeg_location': '/opt/homebrew/bin/ffmpeg',  # Specify ffmpeg path
+                'ffmpeg_location': config.ffmpeg_location,  # Specify ffmpeg path
+                # Report the download size and time the transcode as its own stage
+                'progress_hooks': [on_progress],
+                'postprocessor_hooks': [on_postprocess],
             }
             
             # Add post-processor for audio conversion
             ydl_opts['postprocessors'] = [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': audio_format,
-                'preferredquality': '192' if quality == 'best' else quality,
+                'preferredquality': audio_profile['bitrate'] if quality == 'best' else quality,
             }]
+            if audio_profile['ffmpeg_args']:
+                ydl_opts['postprocessor_args'] = {'extractaudio': audio_profile['ffmpeg_args']}
             
-            result = {
-                'success': False,
-                'file_path': None,
-                'title': None,
-                'duration': None,
-                'error': None
-            }
+            if info is None:
+                info = self.extract_info(url)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract video info first
-                logger.info(f"Extracting info for URL: {url}")
-                info = ydl.extract_info(url, download=False)
-                
-                if not info:
-                    result['error'] = "Could not extract video information"
-                    return result
-                
-                # Get video details
-                title = info.get('title', 'Unknown')
-                duration = info.get('duration', 0)
-                
-                logger.info(f"Video found: {title} ({duration}s)")
-                
-                # Download and extract audio
+            # Get video details
+            title = info.get('title', 'Unknown')
+            duration = info.get('duration', 0)
+            
+            logger.info(f"Video found: {title} ({duration}s)")
+            
+            with self.sessions.limit(info.get('extractor_key')), self.sessions.downloader(ydl_opts, info.get('extractor_key')) as ydl:
+                # Download and extract audio from the already extracted info
                 logger.info("Downloading and extracting audio...")
-                ydl.download([url])
-                
-                # Construct expected file path
-                safe_title = self._sanitize_filename(title)
-                audio_file = os.path.join(self.output_dir, f"{safe_title}.{audio_format}")
-                
-                # Check if file was created (try multiple possible filenames)
-                possible_paths = [
-                    audio_file,
-                    os.path.join(self.output_dir, f"{title}.{audio_format}"),
-                    os.path.join(self.output_dir, f"{title}.mp3"),
-                ]
-                
-                found_file = None
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        found_file = path
-                        break
-                
-                if found_file:
-                    result.update({
-                        'success': True,
-                        'file_path': found_file,
-                        'title': title,
-                        'duration': duration
-                    })
-                    logger.info(f"Audio extracted successfully: {found_file}")
-                else:
-                    # # Try to find the file with glob pattern
-                    # possible_files = list(Path(self.output_dir).glob(f"*{safe_title}*.{audio_format}"))
-                    # if not possible_files:
-                    #     # Try with original title
-                    #     possible_files = list(Path(self.output_dir).glob(f"*{title}*.{audio_format}"))
-                    # if not possible_files:
-                    #     # Try any mp3 files
-                    #     possible_files = list(Path(self.output_dir).glob(f"*.{audio_format}"))
-                    
-                    # if possible_files:
-                    #     result.update({
-                    #         'success': True,
-                    #         'file_path': str(possible_files[0]),
-                    #         'title': title,
-                    #         'duration': duration
-                    #     })
-                    #     logger.info(f"Audio extracted successfully: {possible_files[0]}")
-                    # else:
-                    result['error'] = f"Audio file not found after extraction. Expected: {audio_file}, Searched in: {self.output_dir}"
+                try:
+                    # Work on a copy: yt-dlp records the downloads in the info
+                    # dict, which may be shared through the metadata cache
+                    processed = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                except Exception as e:
+                    # A transcode that started but never finished failed
+                    result['transcode_seconds'] = transcode.stop(e)
+                    raise
+            result['downloaded_bytes'] = sum(downloaded.values())
+            
+            # Final path after post-processing, as yt-dlp reports it
+            downloads = processed.get('requested_downloads') or [processed]
+            found_file = downloads[0].get('filepath')
+            
+            if found_file and os.path.exists(found_file):
+                result.update(self._video_fields(info))
+                result.update({
+                    'success': True,
+                    'file_path': found_file
+                })
+                logger.info(f"Audio extracted successfully: {found_file}")
+            else:
+                result['error'] = f"Audio file not found after extraction. yt-dlp reported: {found_file}"
+            
+            return result
                 
-                return result
+        except yt_dlp.DownloadError as e:
+            error_msg = f"Download error: {str(e)}"
+            logger.error(error_msg)
+            result['error'] = error_msg
+            return result
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            logger.error(error_msg)
+            result['error'] = error_msg
+            return result
+    
+    def stream_audio_from_url(
+        self,
+        url: str,
+        audio_format: str = 'mp3',
+        quality: str = 'best',
+        info: Optional[Dict[str, Any]] = None,
+        profile: str = DEFAULT_AUDIO_PROFILE,
+        spill_threshold: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract audio by piping the source stream straight through ffmpeg into memory
+        
+        ffmpeg reads the selected format's URL itself and writes the encoded
+        audio to stdout, which is collected in a ``SpooledTemporaryFile`` that
+        only spills to ``output_dir`` once it grows past ``spill_threshold``.
+        Nothing is written to disk for typical short videos. Sources ffmpeg
+        cannot read directly (e.g. DASH fragments) and formats that cannot be
+        written to a pipe fall back to ``extract_audio_from_url``.
+        
+        Args:
+            url: The video URL to extract audio from
+            audio_format: Audio format (mp3, opus, ogg, flac or wav to stream)
+            quality: Audio quality ('best' or a specific bitrate in kbps)
+            info: Raw info dict from ``extract_info``, if the caller already has it
+            profile: Extraction profile ('speech' or 'hifi')
+            spill_threshold: Bytes kept in memory before spilling to disk
+        
+        Returns:
+            The same dict as ``extract_audio_from_url``, plus:
+                - audio_file: file object positioned at the start of the audio,
+                  or None when the file-based fallback was used. The caller
+                  must close it.
+                - filename: name to give the audio when uploading it
+                - downloaded_bytes: the selected format's reported size, or 0
+        """
+        if spill_threshold is None:
+            spill_threshold = config.stream_spill_threshold_bytes
+        
+        try:
+            if info is None:
+                info = self.extract_info(url)
+            
+            if profile not in AUDIO_PROFILES or audio_format not in STREAMABLE_FORMATS:
+                return self._extract_to_file(url, audio_format, quality, info, profile)
+            
+            with self.sessions.session(info.get('extractor_key')) as ydl:
+                selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+                cookie_header = None
+                if selected.get('url') and hasattr(ydl.cookiejar, 'get_cookie_header'):
+                    cookie_header = ydl.cookiejar.get_cookie_header(selected['url'])
+            
+            if selected.get('requested_formats') or selected.get('protocol') not in STREAMABLE_PROTOCOLS:
+                logger.info(f"Source protocol {selected.get('protocol')} is not streamable, downloading to disk")
+                return self._extract_to_file(url, audio_format, quality, info, profile)
+            
+            headers = dict(selected.get('http_headers') or {})
+            if cookie_header:
+                headers['Cookie'] = cookie_header
+            
+            audio_profile = AUDIO_PROFILES[profile]
+            codec, container = STREAMABLE_FORMATS[audio_format]
+            bitrate = audio_profile['bitrate'] if quality == 'best' else quality
+            
+            # -xerror turns truncated or unseekable inputs into a failure instead of partial output
+            command = [self._ffmpeg_binary(), '-nostdin', '-loglevel', 'error', '-xerror']
+            if headers:
+                command += ['-headers', ''.join(f"{key}: {value}\r\n" for key, value in headers.items())]
+            command += ['-i', selected['url'], '-vn', *audio_profile['ffmpeg_args'], '-c:a', codec]
+            if codec not in ('flac', 'pcm_s16le'):
+                command += ['-b:a', f"{bitrate}k"]
+            command += ['-f', container, 'pipe:1']
+            
+            logger.info(f"Streaming audio for {info.get('id')} through ffmpeg")
+            audio_file = tempfile.SpooledTemporaryFile(max_size=spill_threshold, dir=self.output_dir)
+            with self.sessions.limit(info.get('extractor_key')), tempfile.TemporaryFile() as stderr:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+                try:
+                    shutil.copyfileobj(process.stdout, audio_file, 1024 * 1024)
+                finally:
+                    process.stdout.close()
+                    returncode = process.wait()
                 
+                if returncode != 0:
+                    stderr.seek(0)
+                    audio_file.close()
+                    message = stderr.read().decode('utf-8', 'replace').strip()
+            
+            if returncode != 0:
+                # Outside the extractor slot, which the fallback takes again
+                logger.warning(f"Streaming with ffmpeg failed (exit code {returncode}), downloading to disk: {message}")
+                return self._extract_to_file(url, audio_format, quality, info, profile)
+            
+            audio_file.seek(0)
+            result = self._empty_result()
+            result.update(self._video_fields(info))
+            result.update({
+                'success': True,
+                'audio_file': audio_file,
+                'filename': f"{info.get('id') or 'audio'}.{audio_format}",
+                # ffmpeg reads the source itself, so only the advertised size is known
+                'downloaded_bytes': selected.get('filesize') or selected.get('filesize_approx') or 0,
+            })
+            return result
+        
         except yt_dlp.DownloadError as e:
             error_msg = f"Download error: {str(e)}"
             logger.error(error_msg)
-            return {
-                'success': False,
-                'file_path': None,
-                'title': None,
-                'duration': None,
-                'error': error_msg
-            }
+            return self._empty_result(error_msg)
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             logger.error(error_msg)
-            return {
-                'success': False,
-                'file_path': None,
-                'title': None,
-                'duration': None,
-                'error': error_msg
-            }
+            return self._empty_result(error_msg)
+    
+    def _extract_to_file(
+        self,
+        url: str,
+        audio_format: str,
+        quality: str,
+        info: Dict[str, Any],
+        profile: str
+    ) -> Dict[str, Any]:
+        result = self.extract_audio_from_url(url, audio_format=audio_format, quality=quality, info=info, profile=profile)
+        if result['success']:
+            result['audio_file'] = None
+            result['filename'] = os.path.basename(result['file_path'])
+        return result
+    
+    def _empty_result(self, error: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'file_path': None,
+            'title': None,
+            'duration': None,
+            'uploader': None,
+            'author': None,
+            'video_id': None,
+            'extractor_key': None,
+            'error': error
+        }
+    
+    def _video_fields(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'title': info.get('title', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'uploader': info.get('uploader'),
+            'author': self.get_author(info),
+            'video_id': info.get('id'),
+            'extractor_key': info.get('extractor_key')
+        }
+    
+    def _ffmpeg_binary(self) -> str:
+        """Resolve the ffmpeg executable from the ``ffmpeg_location`` setting"""
+        location = config.ffmpeg_location
+        if location and os.path.isdir(location):
+            return os.path.join(location, 'ffmpeg')
+        return location or 'ffmpeg'
+    
+    def prepare_segments(
+        self,
+        result: Dict[str, Any],
+        max_chunk_seconds: float,
+        overlap_seconds: float,
+        search_window_seconds: float,
+        silence_db: int = -35,
+        min_silence_seconds: float = 0.4
+    ) -> Dict[str, Any]:
+        """
+        Plan how to split extracted audio into chunks of bounded duration
+        
+        Cuts are placed at the last silence within ``search_window_seconds``
+        of each chunk's maximum length. Where no silence is found the chunk is
+        cut hard at ``max_chunk_seconds`` and the next chunk starts
+        ``overlap_seconds`` earlier so no word is lost; those boundaries are
+        flagged so the transcripts can be de-duplicated when stitched.
+        
+        Args:
+            result: Result of ``extract_audio_from_url`` or ``stream_audio_from_url``
+            max_chunk_seconds: Maximum duration of a chunk
+            overlap_seconds: Overlap added at hard (non-silent) cuts
+            search_window_seconds: How far before the limit to look for silence
+            silence_db: Level below which audio counts as silence
+            min_silence_seconds: Minimum length of a usable silence
+        
+        Returns:
+            Dict containing:
+                - source_path: str (audio file the segments refer to)
+                - duration: float (measured duration in seconds)
+                - segments: list of dicts with index, start, end and
+                  overlaps_previous
+        """
+        source_path = result.get('file_path')
+        if not source_path:
+            # ffmpeg needs a seekable file to cut segments, so spill the buffer
+            audio_file = result['audio_file']
+            audio_file.seek(0)
+            with tempfile.NamedTemporaryFile(dir=self.output_dir, suffix=os.path.splitext(result['filename'])[1], delete=False) as f:
+                shutil.copyfileobj(audio_file, f, 1024 * 1024)
+                source_path = f.name
+            audio_file.seek(0)
+            result['file_path'] = source_path
+        
+        silences, duration = self._detect_silences(source_path, silence_db, min_silence_seconds)
+        if not duration:
+            duration = float(result.get('duration') or 0)
+        
+        segments = []
+        start, overlaps_previous = 0.0, False
+        while duration - start > max_chunk_seconds:
+            limit = start + max_chunk_seconds
+            cut_points = [
+                (silence_start + silence_end) / 2
+                for silence_start, silence_end in silences
+                if limit - search_window_seconds < (silence_start + silence_end) / 2 <= limit
+            ]
+            if cut_points:
+                end, next_start, overlaps_next = max(cut_points), max(cut_points), False
+            else:
+                end, next_start, overlaps_next = limit, limit - overlap_seconds, True
+            segments.append({'index': len(segments), 'start': start, 'end': end, 'overlaps_previous': overlaps_previous})
+            start, overlaps_previous = next_start, overlaps_next
+        segments.append({'index': len(segments), 'start': start, 'end': duration, 'overlaps_previous': overlaps_previous})
+        
+        return {'source_path': source_path, 'duration': duration, 'segments': segments}
+    
+    def extract_segment(self, source_path: str, segment: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cut one planned segment out of an audio file, without re-encoding when possible
+        
+        Returns:
+            Dict containing:
+                - audio_file: ``SpooledTemporaryFile`` positioned at the start
+                  of the segment audio. The caller must close it.
+                - filename: name to give the segment when uploading it
+        """
+        audio_format = os.path.splitext(source_path)[1].lstrip('.').lower()
+        command = [
+            self._ffmpeg_binary(), '-nostdin', '-loglevel', 'error',
+            '-ss', f"{segment['start']:.3f}", '-t', f"{segment['end'] - segment['start']:.3f}",
+            '-i', source_path, '-vn'
+        ]
+        if audio_format in STREAMABLE_FORMATS:
+            command += ['-c:a', 'copy', '-f', STREAMABLE_FORMATS[audio_format][1], 'pipe:1']
+        else:
+            audio_format = 'mp3'
+            command += [*AUDIO_PROFILES['speech']['ffmpeg_args'], '-c:a', 'libmp3lame', '-b:a', '32k', '-f', 'mp3', 'pipe:1']
+        
+        completed = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if completed.returncode != 0:
+            message = completed.stderr.decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"ffmpeg failed to cut segment {segment['index']}: {message}")
+        
+        audio_file = tempfile.SpooledTemporaryFile(max_size=config.stream_spill_threshold_bytes, dir=self.output_dir)
+        audio_file.write(completed.stdout)
+        audio_file.seek(0)
+        return {'audio_file': audio_file, 'filename': f"segment-{segment['index']}.{audio_format}"}
+    
+    def _detect_silences(self, source_path: str, silence_db: int, min_silence_seconds: float):
+        """Run ffmpeg's silencedetect filter and return (silences, duration)"""
+        command = [
+            self._ffmpeg_binary(), '-nostdin', '-hide_banner', '-nostats', '-i', source_path,
+            '-af', f"silencedetect=noise={silence_db}dB:d={min_silence_seconds}", '-f', 'null', '-'
+        ]
+        completed = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        output = completed.stderr.decode('utf-8', 'replace')
+        if completed.returncode != 0:
+            raise RuntimeError(f"ffmpeg silence detection failed: {output.strip()[-500:]}")
+        
+        duration = None
+        match = _DURATION_RE.search(output)
+        if match:
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        
+        starts = [float(value) for value in _SILENCE_START_RE.findall(output)]
+        ends = [float(value) for value in _SILENCE_END_RE.findall(output)]
+        # A trailing silence has no end; it runs to the end of the file
+        if len(ends) < len(starts) and duration:
+            ends.append(duration)
+        return list(zip(starts, ends)), duration
     
     def get_video_info(self, url: str) -> Dict[str, Any]:
         """
-        Get video information without downloading
+        Get video information without downloading (served from the metadata cache when possible)
         
         Args:
             url: Video URL
@@ -180,24 +645,22 @@ class AudioExtractor:
             Dict with video metadata
         """
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-            }
+            # The raw info dict lacks the fields yt-dlp derives while
+            # processing, such as upload_date (from timestamp) and thumbnail
+            info = self.extract_info(url)
+            with self.sessions.session(info.get('extractor_key')) as ydl:
+                info = ydl.process_ie_result(info, download=False)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                return {
-                    'success': True,
-                    'title': info.get('title'),
-                    'duration': info.get('duration'),
-                    'uploader': info.get('uploader'),
-                    'upload_date': info.get('upload_date'),
-                    'view_count': info.get('view_count'),
-                    'description': info.get('description'),
-                    'thumbnail': info.get('thumbnail'),
-                }
+            return {
+                'success': True,
+                'title': info.get('title'),
+                'duration': info.get('duration'),
+                'uploader': info.get('uploader'),
+                'upload_date': info.get('upload_date'),
+                'view_count': info.get('view_count'),
+                'description': info.get('description'),
+                'thumbnail': info.get('thumbnail'),
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -223,21 +686,3 @@ class AudioExtractor:
         except Exception as e:
             logger.error(f"Error cleaning up file {file_path}: {e}")
             return False
-    
-    def _sanitize_filename(self, filename: str) -> str:
-        """
-        Sanitize filename for safe file system usage
-        
-        Args:
-            filename: Original filename
-        
-        Returns:
-            Sanitized filename
-        """
-        import re
-        # Remove or replace problematic characters
-        sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
-        sanitized = re.sub(r'\s+', '_', sanitized)  # Replace spaces with underscores
-        return sanitized[:100]  # Limit length
-
-
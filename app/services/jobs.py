@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings as config
+from app.log import request_id_var
+from app.models.audio import AudioExtractionRequest, AudioExtractionResponse
+from app.services.claims import add_claim_columns, claim_is_stale, current_owner
+from app.services.pipeline import ExtractionPipeline
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobStore:
+    """Durable SQLite store for extraction jobs"""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the JobStore
+
+        Args:
+            db_path: Path of the SQLite database file. Parent directories are
+                     created if they do not exist.
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    request TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            add_claim_columns(self._conn, "jobs")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def create(self, request: AudioExtractionRequest) -> str:
+        """Persist a new queued job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, request.model_dump_json(), now, now)
+            )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job as a dict, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def claim_next(self) -> Optional[Tuple[str, AudioExtractionRequest]]:
+        """Atomically mark the oldest queued job as running by this process and return it"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, updated_at = ?
+                WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1)
+                RETURNING id, request
+                """,
+                (RUNNING, current_owner(), now, now, QUEUED)
+            ).fetchone()
+        if row is None:
+            return None
+        return row['id'], AudioExtractionRequest.model_validate_json(row['request'])
+
+    def update_stage(self, job_id: str, stage: str, progress: float) -> None:
+        """Record the stage a running job has reached"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, updated_at = ? WHERE id = ?",
+                (stage, progress, time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, result: AudioExtractionResponse) -> None:
+        """Record the final result of a job"""
+        job_status = COMPLETED if result.success else FAILED
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, progress = 1, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (job_status, job_status, result.model_dump_json(), result.error, time.time(), job_id)
+            )
+
+    def heartbeat(self) -> None:
+        """Show that this process is still working on the jobs it claimed"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                (time.time(), current_owner(), RUNNING)
+            )
+
+    def requeue_interrupted(self, stale_seconds: float) -> int:
+        """
+        Return jobs whose worker is gone to the queue
+
+        A running job is requeued when its owner process is known to be dead
+        or its heartbeat is older than ``stale_seconds``. Jobs other live
+        workers are running are left alone.
+        """
+        requeued = 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner, heartbeat_at FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for row in rows:
+                if not claim_is_stale(row['owner'], row['heartbeat_at'], stale_seconds):
+                    continue
+                # Only if nobody claimed it again in the meantime
+                cursor = self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, stage = NULL, progress = 0, owner = NULL, heartbeat_at = NULL, updated_at = ?
+                    WHERE id = ? AND status = ? AND owner IS ?
+                    """,
+                    (QUEUED, time.time(), row['id'], RUNNING, row['owner'])
+                )
+                requeued += cursor.rowcount
+        return requeued
+
+    def purge_finished(self, older_than: float) -> int:
+        """Delete completed and failed jobs last updated before the given timestamp"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (COMPLETED, FAILED, older_than)
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Runs queued extraction jobs in the background from a JobStore"""
+
+    def __init__(self, store: JobStore, pipeline: ExtractionPipeline, workers: int):
+        """
+        Initialize the JobQueue
+
+        Args:
+            store: Durable store the jobs are read from and written to
+            pipeline: Pipeline the jobs are run through
+            workers: Number of jobs processed concurrently
+        """
+        self.store = store
+        self.pipeline = pipeline
+        self.workers = max(1, workers)
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def _requeue_interrupted(self) -> None:
+        requeued = await asyncio.to_thread(self.store.requeue_interrupted, config.claim_stale_seconds)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted job(s)")
+            self._wakeup.set()
+
+    async def _heartbeat(self) -> None:
+        """Keep this process's claims fresh and take back those of workers that died"""
+        while True:
+            await asyncio.sleep(config.claim_heartbeat_seconds)
+            try:
+                await asyncio.to_thread(self.store.heartbeat)
+                await self._requeue_interrupted()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    async def start(self) -> None:
+        """Recover interrupted jobs and start the worker tasks"""
+        await self._requeue_interrupted()
+
+        retention_seconds = config.job_retention_hours * 3600
+        purged = await asyncio.to_thread(self.store.purge_finished, time.time() - retention_seconds)
+        if purged:
+            logger.info(f"Purged {purged} finished job(s)")
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop the workers and close the store; running jobs are requeued once they go stale"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.store.close()
+
+    async def submit(self, request: AudioExtractionRequest) -> str:
+        """Queue a request and return the new job id"""
+        job_id = await asyncio.to_thread(self.store.create, request)
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            self._wakeup.clear()
+            claimed = await asyncio.to_thread(self.store.claim_next)
+            if claimed is None:
+                # Sleep until a job is submitted, polling as a safety net
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, request = claimed
+            await self._run_job(job_id, request)
+
+    async def _run_job(self, job_id: str, request: AudioExtractionRequest) -> None:
+        async def on_stage(stage: str, progress: float) -> None:
+            await asyncio.to_thread(self.store.update_stage, job_id, stage, progress)
+
+        # Log the job's work under its id, as requests log under theirs
+        token = request_id_var.set(f"job-{job_id}")
+        try:
+            logger.info(f"Running job {job_id} for {request.url}")
+            result = await self.pipeline.run_safely(request, on_stage=on_stage, job_id=job_id)
+            await asyncio.to_thread(self.store.finish, job_id, result)
+        finally:
+            request_id_var.reset(token)
+
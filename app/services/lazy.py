@@ -0,0 +1,46 @@
+import importlib
+import threading
+import time
+from types import ModuleType
+from typing import Optional
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    yt-dlp and the OpenAI SDK take hundreds of milliseconds to import, so
+    worker processes start answering requests without them and import them
+    when a request first needs them, or when the background pre-warm does.
+    Only attribute access triggers the import; use string annotations for
+    types from the module.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+        self.import_seconds = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self) -> ModuleType:
+        """Import the module, once, and return it"""
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    self.import_seconds = time.perf_counter() - started
+                module = self._module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
@@ -0,0 +1,307 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Pipeline stages, in the order a request goes through them
+STAGES = ('metadata', 'download', 'transcode', 'transcription', 'summarization', 'notion')
+
+# Seconds; stages range from cache-warm metadata lookups to long transcriptions
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """A metric family with a fixed set of label names"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0.0)]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed observations, with their sum and count, per label set"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts, the +Inf count last, then the sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(counts), total[0]) for key, (counts, total) in self._values.items())
+        lines = []
+        label_names = self.labelnames + ('le',)
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(label_names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics exported on ``/metrics``"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "pipeline_stage_duration_seconds",
+    "Time spent in each pipeline stage. Streaming extraction downloads and transcodes in one "
+    "ffmpeg pass, reported as download.",
+    ("stage",)
+))
+STAGE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "pipeline_stage_in_flight",
+    "Requests currently in each pipeline stage.",
+    ("stage",)
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "pipeline_stage_errors_total",
+    "Pipeline stage failures by stage and cause.",
+    ("stage", "cause")
+))
+DOWNLOADED_BYTES = REGISTRY.register(Counter(
+    "audio_downloaded_bytes_total",
+    "Source media bytes downloaded. Streamed sources count the selected format's reported size, when known.",
+))
+EXTRACTED_BYTES = REGISTRY.register(Counter(
+    "audio_extracted_bytes_total",
+    "Encoded audio bytes produced for transcription.",
+))
+TRANSCRIBED_SECONDS = REGISTRY.register(Counter(
+    "audio_transcribed_seconds_total",
+    "Seconds of audio sent for transcription; transcript cache hits are not counted.",
+))
+SUMMARY_TOKENS = REGISTRY.register(Counter(
+    "summary_tokens_total",
+    "Tokens billed for summarization, by type (prompt, completion) and step (single, section, final).",
+    ("type", "step")
+))
+SUMMARIES_WITHOUT_MODEL = REGISTRY.register(Counter(
+    "summaries_without_model_total",
+    "Transcripts too short to summarize, used as their own summary without calling the model.",
+))
+COALESCED_REQUESTS = REGISTRY.register(Counter(
+    "pipeline_coalesced_requests_total",
+    "Requests that shared the run of a concurrent request for the same video.",
+))
+SCRATCH_RESERVED_BYTES = REGISTRY.register(Gauge(
+    "scratch_reserved_bytes",
+    "Scratch disk space reserved by running downloads.",
+))
+SCRATCH_BACKPRESSURE_WAITS = REGISTRY.register(Counter(
+    "scratch_backpressure_waits_total",
+    "Downloads that waited for scratch space because the quota was reserved.",
+))
+EXTRACTOR_LIMIT_WAITS = REGISTRY.register(Counter(
+    "ytdl_extractor_limit_waits_total",
+    "yt-dlp requests that waited for a slot under their extractor's concurrency limit.",
+    ("extractor",)
+))
+
+for _stage in STAGES:
+    STAGE_IN_FLIGHT.set(0, stage=_stage)
+SCRATCH_RESERVED_BYTES.set(0)
+
+# Stage timings of the request being processed, when it asked for them
+_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collect the seconds spent in each stage by the code run inside the block
+
+    Work handed to the stage executors is included, since they run it in a
+    copy of the caller's context. Stages that run more than once add up.
+    """
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record_stage_error(stage: str, cause: str) -> None:
+    """Count a stage failure that was handled rather than raised"""
+    STAGE_ERRORS.inc(stage=stage, cause=cause)
+
+
+class StageTimer:
+    """
+    Time one run of a pipeline stage
+
+    Use it as a context manager, or call ``start``/``stop`` from callbacks.
+    An exception leaving the block is counted as an error of the stage, by
+    its ``cause`` attribute or else its class name.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started: Optional[float] = None
+        self._excluded = 0.0
+
+    def start(self) -> "StageTimer":
+        if self._started is None:
+            STAGE_IN_FLIGHT.inc(stage=self.stage)
+            self._started = time.perf_counter()
+        return self
+
+    def exclude(self, seconds: float) -> None:
+        """Leave out time already reported under another stage"""
+        self._excluded += seconds
+
+    def stop(self, error: Optional[BaseException] = None) -> float:
+        """Record the stage; returns the seconds it took, or 0 if it was not started"""
+        if self._started is None:
+            return 0.0
+        elapsed = max(0.0, time.perf_counter() - self._started - self._excluded)
+        self._started = None
+        STAGE_IN_FLIGHT.dec(stage=self.stage)
+        STAGE_DURATION.observe(elapsed, stage=self.stage)
+        if error is not None:
+            record_stage_error(self.stage, getattr(error, 'cause', None) or type(error).__name__)
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed
+        return elapsed
+
+    def __enter__(self) -> "StageTimer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.stop(exc if isinstance(exc, Exception) else None)
+        return False
+
+
+def render_metrics() -> str:
+    """Render every registered metric for a Prometheus scrape"""
+    return REGISTRY.render()
@@ -1,13 +1,435 @@
-from notion_client import Client
+from notion_client import AsyncClient
+from notion_client.errors import APIErrorCode, APIResponseError, HTTPResponseError, RequestTimeoutError
 from app.config import settings as config
-from typing import Dict, Any, Optional
+from app.services.cache import TTLCache
+from app.services.notion_blocks import (
+    MAX_RICH_TEXT_CHARS,
+    _heading_2,
+    _paragraph,
+    _rich_text,
+    _split_text,
+    markdown_to_blocks,
+)
+from app.services.page_index import NotionPageIndex
+from app.services.ratelimit import TokenBucket, backoff_delay, get_token_bucket
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
 import datetime
+import email.utils
+import logging
+import time
+import httpx
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Notion API limits
+MAX_CHILDREN_PER_REQUEST = 100  # blocks per pages.create / blocks.children.append call
+MAX_PAGE_SIZE = 100  # results per page of a paginated endpoint
+MAX_OPTION_NAME_CHARS = 100  # characters per select / multi-select option name
+
+# Statuses worth retrying: rate limited, conflict and transient server errors
+RETRYABLE_STATUSES = {409, 429, 500, 502, 503, 504}
+
+# Statuses with which Notion turned a request away without applying it
+REJECTED_STATUSES = {409, 429}
+
+# Property types whose schema lists the allowed options
+OPTION_TYPES = ("select", "multi_select", "status")
+
+# A cached schema younger than this is trusted even when a write does not fit it
+SCHEMA_RECHECK_SECONDS = 30.0
+
+# Database schemas keyed by normalized database id
+_schema_cache: Optional[TTLCache] = None
+
+
+class PropertyValidationError(ValueError):
+    """Raised when page properties do not fit the database schema"""
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_ambiguous(error: Exception) -> bool:
+    """Whether a failed request may have been applied anyway: no response, or a server error"""
+    status = getattr(error, 'status', None)
+    return status is None or status >= 500
+
+
+def _url_filter(properties: Dict[str, Any], video_url: str) -> Optional[Dict[str, Any]]:
+    """Database query filter matching pages whose URL property holds the video URL, if there is one"""
+    prop = properties.get("URL") or {}
+    if "url" in prop:
+        return {"property": "URL", "url": {"equals": video_url}}
+    if "rich_text" in prop:
+        return {"property": "URL", "rich_text": {"equals": video_url}}
+    return None
+
+
+def _trim_children(
+    blocks: List[Dict[str, Any]],
+    path: Tuple[int, ...] = ()
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Tuple[int, ...], List[Dict[str, Any]]]]]:
+    """
+    Cut nested children lists down to the per-request limit
+
+    Returns the blocks to send, copied where their children were cut, and
+    the cut-off children as (path, children) pairs, the path holding the
+    index of the parent block at each level.
+    """
+    sent = []
+    overflow = []
+    for index, block in enumerate(blocks):
+        body = block[block["type"]]
+        children = body.get("children")
+        if children:
+            kept, nested = _trim_children(children[:MAX_CHILDREN_PER_REQUEST], path + (index,))
+            if len(children) > MAX_CHILDREN_PER_REQUEST:
+                overflow.append((path + (index,), children[MAX_CHILDREN_PER_REQUEST:]))
+            if len(children) > MAX_CHILDREN_PER_REQUEST or nested:
+                block = {**block, block["type"]: {**body, "children": kept}}
+            overflow.extend(nested)
+        sent.append(block)
+    return sent, overflow
+
+
+def _get_schema_cache() -> TTLCache:
+    """Return the process-wide schema cache, creating it on first use"""
+    global _schema_cache
+    if _schema_cache is None:
+        _schema_cache = TTLCache(maxsize=config.notion_schema_cache_size, ttl=config.notion_schema_cache_ttl_seconds)
+    return _schema_cache
+
+
+def _schema_key(database_id: str) -> str:
+    """Database ids are accepted with or without dashes"""
+    return database_id.replace("-", "").lower()
+
+
+def _plain_title(database: Dict[str, Any]) -> str:
+    title = database.get("title") or [{}]
+    return title[0].get("plain_text", "Untitled")
+
+
+def _schema_from_database(database: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a database object to the parts needed to validate page properties"""
+    properties = {}
+    for prop_name, prop_data in database["properties"].items():
+        prop = {"type": prop_data["type"], "id": prop_data["id"]}
+        if prop_data["type"] in OPTION_TYPES:
+            prop["options"] = [option["name"] for option in prop_data.get(prop_data["type"], {}).get("options", [])]
+        properties[prop_name] = prop
+    return {
+        "title": _plain_title(database),
+        "last_edited_time": database.get("last_edited_time"),
+        "fetched_at": time.time(),
+        "properties": properties,
+    }
+
+
+def _option_name(prop: Dict[str, Any], value: Any) -> str:
+    """
+    Map a value onto an existing option, ignoring case
+
+    Unknown select options are created by Notion on write, but status
+    options must already exist.
+    """
+    name = str(value).strip()
+    for option in prop.get("options", []):
+        if option.lower() == name.lower():
+            return option
+    if prop["type"] == "status":
+        raise PropertyValidationError(f"'{name}' is not one of the status options {prop.get('options', [])}")
+    # Notion rejects commas in option names
+    name = name.replace(",", " ")[:MAX_OPTION_NAME_CHARS].strip()
+    if not name:
+        raise PropertyValidationError("option name is empty")
+    return name
+
+
+def _coerce_property(prop: Dict[str, Any], value: Any) -> Dict[str, Any]:
+    """Build the page property value for a schema property, converting the value where it makes sense"""
+    prop_type = prop["type"]
+    if prop_type == "title":
+        return {"title": [{"text": {"content": str(value)[:MAX_RICH_TEXT_CHARS]}}]}
+    if prop_type == "rich_text":
+        return {"rich_text": _rich_text(str(value))}
+    if prop_type in ("select", "status"):
+        return {prop_type: {"name": _option_name(prop, value)}}
+    if prop_type == "multi_select":
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return {"multi_select": [{"name": _option_name(prop, item)} for item in values]}
+    if prop_type == "date":
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return {"date": {"start": value.isoformat()}}
+        try:
+            return {"date": {"start": datetime.datetime.fromisoformat(str(value)).isoformat()}}
+        except ValueError:
+            raise PropertyValidationError(f"'{value}' is not an ISO 8601 date")
+    if prop_type == "number":
+        try:
+            return {"number": float(value)}
+        except (TypeError, ValueError):
+            raise PropertyValidationError(f"'{value}' is not a number")
+    if prop_type == "url":
+        return {"url": str(value)}
+    raise PropertyValidationError(f"cannot write a {type(value).__name__} to a {prop_type} property")
+
+
+def build_page_properties(
+    schema: Dict[str, Any],
+    values: Dict[str, Any],
+    optional: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Validate and coerce page property values against a database schema
+
+    Args:
+        schema: Cached schema from ``NotionService.get_database_schema``
+        values: Property name to plain value. "Name" is written to the
+                database's title property whatever it is called.
+        optional: Values written only if the database has the property
+
+    Returns:
+        The page properties and the names of properties the database lacks,
+        which are left out
+
+    Raises:
+        PropertyValidationError: If a value cannot be written to its property
+    """
+    properties = {}
+    missing = []
+    problems = []
+    for name, value in values.items():
+        prop = schema["properties"].get(name)
+        if prop is None and name == "Name":
+            # Every database has exactly one title property
+            name, prop = next(
+                ((title_name, p) for title_name, p in schema["properties"].items() if p["type"] == "title"),
+                (name, None)
+            )
+        if prop is None:
+            missing.append(name)
+            continue
+        try:
+            properties[name] = _coerce_property(prop, value)
+        except PropertyValidationError as e:
+            problems.append(f"{name} ({prop['type']}): {e}")
+    for name, value in (optional or {}).items():
+        prop = schema["properties"].get(name)
+        if prop is not None and name not in properties:
+            try:
+                properties[name] = _coerce_property(prop, value)
+            except PropertyValidationError as e:
+                problems.append(f"{name} ({prop['type']}): {e}")
+    if problems:
+        raise PropertyValidationError("; ".join(problems))
+    return properties, missing
+
 
 class NotionService:
-    def __init__(self):
-        self.client = Client(auth=config.notion_api_key)
+    def __init__(
+        self,
+        client: Optional[AsyncClient] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        page_index: Optional[NotionPageIndex] = None
+    ):
+        """
+        Initialize the NotionService
+
+        Args:
+            client: Shared notion_client AsyncClient. If None, a new client is
+                    created for this service.
+            rate_limiter: Token bucket the requests go through. If None, the
+                          process-wide bucket for the integration token is used.
+            page_index: Local video id to page index used to avoid duplicate
+                        pages. If None, every call creates a new page.
+        """
+        self.client = client or AsyncClient(auth=config.notion_api_key, base_url=config.notion_base_url)
+        self.page_index = page_index
+        self.rate_limiter = rate_limiter or get_token_bucket(
+            config.notion_api_key,
+            rate=config.notion_requests_per_second,
+            capacity=config.notion_burst
+        )
+        # Short-lived index of the databases the integration can see
+        self._database_index = TTLCache(maxsize=1, ttl=config.notion_database_index_ttl_seconds)
+    
+    async def _request(self, method: Callable[..., Awaitable[Any]], idempotent: bool = True, **kwargs: Any) -> Any:
+        """
+        Call a Notion endpoint through the rate limiter, retrying transient failures
+        
+        429s honor the Retry-After header and pause every request sharing the
+        integration token; other retryable failures back off exponentially
+        with jitter.
+        
+        A request that is not ``idempotent`` (pages.create,
+        blocks.children.append) is only retried when Notion turned it away
+        (429, 409). After a timeout, transport error or 5xx it may still have
+        been applied, so the error is raised for the caller to check first.
+        """
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                return await method(**kwargs)
+            except (HTTPResponseError, RequestTimeoutError, httpx.TransportError) as e:
+                status = getattr(e, 'status', None)
+                if idempotent:
+                    retryable = status is None or status in RETRYABLE_STATUSES
+                else:
+                    retryable = status in REJECTED_STATUSES
+                if not retryable or attempt >= config.notion_max_retries:
+                    raise
+                await self._backoff(attempt, e)
+                attempt += 1
+    
+    async def _backoff(self, attempt: int, error: Exception) -> None:
+        """Sleep before retrying a failed request"""
+        status = getattr(error, 'status', None)
+        retry_after = None
+        if status == 429:
+            retry_after = _parse_retry_after(error.headers.get('Retry-After'))
+            if retry_after is not None:
+                self.rate_limiter.block_for(retry_after)
+        
+        delay = backoff_delay(
+            attempt,
+            base=config.notion_backoff_base_seconds,
+            cap=config.notion_backoff_max_seconds,
+            retry_after=retry_after
+        )
+        self.rate_limiter.record_retry(delay, rate_limited=status == 429)
+        logger.warning(f"Notion request failed ({status or type(error).__name__}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    
+    async def _create_page(
+        self,
+        database_id: str,
+        properties: Dict[str, Any],
+        children: List[Dict[str, Any]],
+        video_url: str,
+        replaces: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a page, making sure an ambiguous failure is not sent twice
+        
+        After a timeout, transport error or 5xx the database is queried for
+        a page with the video's URL created since the attempt; only if there
+        is none is the page created again. Without a URL property to query
+        the error is raised instead.
+        """
+        url_filter = _url_filter(properties, video_url)
+        attempt = 0
+        while True:
+            # Notion rounds created_time down to the minute
+            started = datetime.datetime.now(datetime.timezone.utc).replace(second=0, microsecond=0)
+            try:
+                return await self._request(
+                    self.client.pages.create,
+                    idempotent=False,
+                    parent={"database_id": database_id},
+                    properties=properties,
+                    children=children
+                )
+            except (HTTPResponseError, RequestTimeoutError, httpx.TransportError) as e:
+                if not _is_ambiguous(e) or url_filter is None or attempt >= config.notion_max_retries:
+                    raise
+                await self._backoff(attempt, e)
+                response = await self._request(
+                    self.client.databases.query,
+                    database_id=database_id,
+                    filter={"and": [
+                        url_filter,
+                        {"timestamp": "created_time", "created_time": {"on_or_after": started.isoformat()}},
+                    ]},
+                    sorts=[{"timestamp": "created_time", "direction": "descending"}],
+                    page_size=MAX_PAGE_SIZE
+                )
+                page = next((page for page in response["results"] if page["id"] != replaces), None)
+                if page is not None:
+                    logger.warning(f"Notion page {page['id']} was created despite the failed request, keeping it")
+                    return page
+                attempt += 1
+    
+    async def _append_children(self, block_id: str, children: List[Dict[str, Any]], appended: int) -> None:
+        """
+        Append a batch of blocks below the ``appended`` blocks already there
+        
+        After a timeout, transport error or 5xx the children are counted to
+        see whether the batch landed before it is sent again.
+        """
+        attempt = 0
+        while True:
+            try:
+                await self._request(self.client.blocks.children.append, idempotent=False, block_id=block_id, children=children)
+                return
+            except (HTTPResponseError, RequestTimeoutError, httpx.TransportError) as e:
+                if not _is_ambiguous(e) or attempt >= config.notion_max_retries:
+                    raise
+                await self._backoff(attempt, e)
+                count = await self._count_children(block_id)
+                if count == appended + len(children):
+                    logger.warning(f"Blocks were appended to Notion block {block_id} despite the failed request")
+                    return
+                if count != appended:
+                    raise
+                attempt += 1
+    
+    async def _child_ids(self, block_id: str) -> List[str]:
+        """Ids of the top-level child blocks, following the list cursor"""
+        ids = []
+        cursor = None
+        while True:
+            kwargs = {"block_id": block_id, "page_size": MAX_PAGE_SIZE}
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = await self._request(self.client.blocks.children.list, **kwargs)
+            ids.extend(block["id"] for block in response["results"])
+            cursor = response.get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                return ids
     
-    def create_page_in_database(
+    async def _count_children(self, block_id: str) -> int:
+        """Number of top-level child blocks"""
+        return len(await self._child_ids(block_id))
+    
+    async def _append_blocks(self, block_id: str, blocks: List[Dict[str, Any]], appended: int) -> None:
+        """Append blocks in batches below the ``appended`` already there, children past the limit included"""
+        for i in range(0, len(blocks), MAX_CHILDREN_PER_REQUEST):
+            batch, overflow = _trim_children(blocks[i:i + MAX_CHILDREN_PER_REQUEST])
+            await self._append_children(block_id, batch, appended + i)
+            await self._append_overflow(block_id, appended + i, overflow)
+    
+    async def _append_overflow(self, block_id: str, offset: int, overflow: List[Tuple[Tuple[int, ...], List[Dict[str, Any]]]]) -> None:
+        """
+        Append children cut off by ``_trim_children`` to the blocks they belong to
+        
+        The blocks were sent starting at child ``offset`` of ``block_id``; the
+        created blocks' ids are looked up by position.
+        """
+        child_ids: Dict[str, List[str]] = {}
+        for path, children in overflow:
+            parent_id = block_id
+            for depth, index in enumerate(path):
+                if parent_id not in child_ids:
+                    child_ids[parent_id] = await self._child_ids(parent_id)
+                parent_id = child_ids[parent_id][index + offset if depth == 0 else index]
+            await self._append_blocks(parent_id, children, MAX_CHILDREN_PER_REQUEST)
+    
+    async def create_page_in_database(
         self, 
         database_id: str, 
         title: str, 
@@ -17,114 +439,96 @@ class NotionService:
         transcript: str, 
         video_url: str,
         duration: Optional[float] = None,
-        video_title: Optional[str] = None
+        video_title: Optional[str] = None,
+        video_key: Optional[str] = None,
+        on_duplicate: str = "create"
     ) -> Dict[str, Any]:
         """
         Create a new page in a Notion database with the summarized content
+        
+        Properties are checked against the cached database schema first, so a
+        write that cannot succeed is rejected without an API call. Such
+        results carry ``retryable: False``.
+        
+        When ``video_key`` is given the page is recorded in the page index,
+        and ``on_duplicate`` decides what happens if the video already has a
+        page in the database: "skip" returns the existing page (with
+        ``duplicate: True``), "update" writes a new page and archives the old
+        one, "create" always adds another page.
         """
         try:
-            # Prepare properties for the new page based on the actual database schema
-            properties = {
-                "Name": {
-                    "title": [
-                        {
-                            "text": {
-                                "content": title
-                            }
-                        }
-                    ]
-                },
-                "Date": {
-                    "date": {
-                        "start": datetime.datetime.now().isoformat()
-                    }
-                },
-                "Category": {
-                    "select": {
-                        "name": category
-                    }
-                },
-                "Author": {
-                    "rich_text": [
-                        {
-                            "text": {
-                                "content": author
-                            }
-                        }
-                    ]
+            existing = await self.find_page(video_key, database_id) if video_key else None
+            if existing and on_duplicate == "skip":
+                return {
+                    "success": True,
+                    "duplicate": True,
+                    "page_id": existing["page_id"],
+                    "page_url": existing["page_url"],
+                    "message": "Notion page already exists"
                 }
+            
+            # Prepare properties for the new page based on the actual database schema
+            values = {
+                "Name": title,
+                "Date": datetime.datetime.now(),
+                "Category": category,
+                "Author": author
             }
+            try:
+                properties = await self._page_properties(database_id, values, optional={"URL": video_url})
+            except PropertyValidationError as e:
+                return {
+                    "success": False,
+                    "retryable": False,
+                    "error": f"Invalid page properties: {str(e)}",
+                    "error_type": type(e).__name__
+                }
             
-            # Create properly formatted content blocks from the summary
-            content_blocks = self._format_summary_to_blocks(summary)
+            # Compile the summary's markdown straight into blocks
+            content_blocks = [_heading_2("Summary"), *markdown_to_blocks(summary)]
             
             # Add video details section
+            details = f"Original Title: {video_title}\nURL: {video_url}"
+            if duration:
+                details += f"\nDuration: {duration:.1f} seconds"
             content_blocks.extend([
-                {
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Video Details"
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": f"Original Title: {video_title}\nURL: {video_url}\nDuration: {duration:.1f} seconds" if duration else f"Original Title: {video_title}\nURL: {video_url}"
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Full Transcript"
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": transcript
-                                }
-                            }
-                        ]
-                    }
-                }
+                _heading_2("Video Details"),
+                _paragraph(details),
+                _heading_2("Full Transcript"),
             ])
             
-            # Create the page with formatted content
-            page = self.client.pages.create(
-                parent={"database_id": database_id},
-                properties=properties,
-                children=content_blocks
+            # Long transcripts become one paragraph block per compliant segment
+            content_blocks.extend(_paragraph(segment.strip()) for segment in _split_text(transcript))
+            
+            # Create the page with the first batch of blocks, then append the rest
+            # in order; each append must land after the previous one. Children
+            # past the per-request limit follow once their parent exists.
+            first_batch, overflow = _trim_children(content_blocks[:MAX_CHILDREN_PER_REQUEST])
+            page = await self._create_page(
+                database_id,
+                properties,
+                first_batch,
+                video_url,
+                replaces=existing["page_id"] if existing else None
             )
             
+            try:
+                await self._append_overflow(page["id"], 0, overflow)
+                await self._append_blocks(page["id"], content_blocks[MAX_CHILDREN_PER_REQUEST:], len(first_batch))
+            except Exception as e:
+                # Don't leave a truncated page behind; archive it so a retry starts clean
+                logger.error(f"Appending content to Notion page {page['id']} failed, archiving it")
+                try:
+                    await self._request(self.client.pages.update, page_id=page["id"], archived=True)
+                except Exception:
+                    logger.exception(f"Could not archive incomplete Notion page {page['id']}")
+                raise e
+            
+            if video_key and self.page_index is not None:
+                await asyncio.to_thread(self.page_index.put, video_key, database_id, page["id"], page["url"])
+                if existing and on_duplicate == "update":
+                    await self._archive_replaced_page(existing["page_id"])
+            
             return {
                 "success": True,
                 "page_id": page["id"],
@@ -133,176 +537,146 @@ class NotionService:
             }
             
         except Exception as e:
+            if isinstance(e, APIResponseError) and e.code == APIErrorCode.ValidationError:
+                # The schema may have changed under the cached copy
+                _get_schema_cache().invalidate(_schema_key(database_id))
             return {
                 "success": False,
-                "error": f"Failed to create Notion page: {str(e)}"
+                "error": f"Failed to create Notion page: {str(e)}",
+                "error_type": type(e).__name__
             }
     
-    def _format_summary_to_blocks(self, summary: str) -> list:
+    async def find_page(self, video_key: str, database_id: str) -> Optional[Dict[str, Any]]:
+        """Look up the page recorded for a video in a database, without calling Notion"""
+        if self.page_index is None:
+            return None
+        return await asyncio.to_thread(self.page_index.get, video_key, database_id)
+    
+    async def _archive_replaced_page(self, page_id: str) -> None:
+        try:
+            await self._request(self.client.pages.update, page_id=page_id, archived=True)
+        except Exception:
+            logger.exception(f"Could not archive replaced Notion page {page_id}")
+    
+    async def _page_properties(
+        self,
+        database_id: str,
+        values: Dict[str, Any],
+        optional: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build page properties from the cached schema, refreshing it once if a value does not fit"""
+        schema, cached = await self._load_schema(database_id)
+        try:
+            properties, missing = build_page_properties(schema, values, optional)
+        except PropertyValidationError:
+            if not cached or time.time() - schema["fetched_at"] < SCHEMA_RECHECK_SECONDS:
+                raise
+            # The property may have changed since the schema was cached
+            schema, _ = await self._load_schema(database_id, refresh=True)
+            properties, missing = build_page_properties(schema, values, optional)
+        
+        if missing:
+            logger.warning(f"Notion database {database_id} has no {', '.join(missing)} property, leaving it out")
+        return properties
+    
+    async def _load_schema(self, database_id: str, refresh: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """Return the database schema and whether it came from the cache"""
+        key = _schema_key(database_id)
+        schema_cache = _get_schema_cache()
+        if not refresh:
+            schema = schema_cache.get(key)
+            if schema is not None:
+                return schema, True
+        
+        database = await self._request(self.client.databases.retrieve, database_id=database_id)
+        schema = _schema_from_database(database)
+        schema_cache.set(key, schema)
+        return schema, False
+    
+    async def get_database_schema(self, database_id: str, refresh: bool = False) -> Dict[str, Any]:
         """
-        Convert a plain text summary into properly formatted Notion blocks
+        Get the title, last edit time and property types/options of a database
+        
+        Args:
+            database_id: The database to describe
+            refresh: Bypass the cache and fetch the schema from Notion
         """
-        blocks = []
+        schema, _ = await self._load_schema(database_id, refresh=refresh)
+        return schema
+    
+    async def iter_databases(self, refresh: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield every database the integration has access to
         
-        # Add the main summary heading
-        blocks.append({
-            "object": "block",
-            "type": "heading_2",
-            "heading_2": {
-                "rich_text": [
-                    {
-                        "type": "text",
-                        "text": {
-                            "content": "Summary"
-                        }
-                    }
-                ]
-            }
-        })
+        Follows the search cursor until ``has_more`` is false, yielding each
+        database as its page arrives. A complete listing is cached for
+        ``notion_database_index_ttl_seconds``.
         
-        # Split the summary into lines and process line by line for better nesting
-        lines = summary.split('\n')
-        last_block_type = None
+        Args:
+            refresh: Bypass the cached index and query Notion
+        """
+        databases = None if refresh else self._database_index.get("databases")
+        if databases is not None:
+            for database in databases:
+                yield database
+            return
         
-        for line in lines:
-            if not line.strip():
-                continue
-                
-            # Check for numbered list items (1., 2., 3., etc.)
-            if line.strip().startswith(tuple(f'{i}.' for i in range(1, 21))):
-                # Extract the content after the number
-                content = line.strip()
-                # Remove the number and period, keep the colon if present
-                for i in range(1, 21):
-                    if content.startswith(f'{i}.'):
-                        content = content[len(f'{i}.'):].strip()
-                        break
+        databases = []
+        cursor = None
+        while True:
+            kwargs = {"filter": {"property": "object", "value": "database"}, "page_size": MAX_PAGE_SIZE}
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = await self._request(self.client.search, **kwargs)
+            
+            for db in response["results"]:
+                # Search returns full database objects; keep cached schemas in
+                # step with their last_edited_time at no extra cost
+                schema_cache = _get_schema_cache()
+                cached = schema_cache.get(_schema_key(db["id"]))
+                if cached is None or cached["last_edited_time"] != db.get("last_edited_time"):
+                    schema_cache.set(_schema_key(db["id"]), _schema_from_database(db))
                 
-                block = {
-                    "object": "block",
-                    "type": "numbered_list_item",
-                    "numbered_list_item": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": content
-                                }
-                            }
-                        ]
-                    }
+                database = {
+                    "id": db["id"],
+                    "title": _plain_title(db),
+                    "url": db["url"]
                 }
-                
-                # If the previous block was a numbered list, add sub-items as children
-                if last_block_type == "numbered_list_item" and len(blocks) > 1:
-                    # Add as children to the last numbered list item
-                    if "children" not in blocks[-1]["numbered_list_item"]:
-                        blocks[-1]["numbered_list_item"]["children"] = []
-                    # But actually, Notion doesn't support children in this way, so just add normally
-                
-                blocks.append(block)
-                last_block_type = "numbered_list_item"
-                
-            # Check for letter sub-items (a., b., c., etc.)
-            elif line.strip().startswith(('a.', 'b.', 'c.', 'd.', 'e.', 'f.', 'g.', 'h.')):
-                # Extract content after the letter
-                content = line.strip()[2:].strip()
-                
-                blocks.append({
-                    "object": "block",
-                    "type": "bulleted_list_item",
-                    "bulleted_list_item": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": content
-                                }
-                            }
-                        ]
-                    }
-                })
-                last_block_type = "bulleted_list_item"
-                
-            # Check for bullet points (•)
-            elif '•' in line:
-                bullet_text = line.split('•', 1)[-1].strip()
-                
-                # If this bullet follows a numbered item, treat it as a sub-item
-                if last_block_type == "numbered_list_item":
-                    # Create a bulleted list item that will appear indented
-                    blocks.append({
-                        "object": "block",
-                        "type": "bulleted_list_item",
-                        "bulleted_list_item": {
-                            "rich_text": [
-                                {
-                                    "type": "text",
-                                    "text": {
-                                        "content": bullet_text
-                                    }
-                                }
-                            ]
-                        }
-                    })
-                    last_block_type = "bulleted_list_item"
-                else:
-                    # Regular bullet point
-                    blocks.append({
-                        "object": "block",
-                        "type": "bulleted_list_item",
-                        "bulleted_list_item": {
-                            "rich_text": [
-                                {
-                                    "type": "text",
-                                    "text": {
-                                        "content": bullet_text
-                                    }
-                                }
-                            ]
-                        }
-                    })
-                    last_block_type = "bulleted_list_item"
-                    
-            # Regular text line
-            else:
-                blocks.append({
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": line.strip()
-                                }
-                            }
-                        ]
-                    }
-                })
-                last_block_type = "paragraph"
+                databases.append(database)
+                yield database
+            
+            cursor = response.get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                break
         
-        return blocks
+        self._database_index.set("databases", databases)
     
-    def list_databases(self) -> Dict[str, Any]:
+    async def iter_database_pages(self, database_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every page of a database, oldest first, following the query cursor"""
+        cursor = None
+        while True:
+            kwargs = {
+                "database_id": database_id,
+                "page_size": MAX_PAGE_SIZE,
+                "sorts": [{"timestamp": "created_time", "direction": "ascending"}]
+            }
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = await self._request(self.client.databases.query, **kwargs)
+            
+            for page in response["results"]:
+                yield page
+            
+            cursor = response.get("next_cursor")
+            if not response.get("has_more") or not cursor:
+                break
+    
+    async def list_databases(self, refresh: bool = False) -> Dict[str, Any]:
         """
         List all databases that the integration has access to
         """
         try:
-            response = self.client.search(
-                filter={
-                    "property": "object",
-                    "value": "database"
-                }
-            )
-            
-            databases = []
-            for db in response["results"]:
-                databases.append({
-                    "id": db["id"],
-                    "title": db.get("title", [{}])[0].get("plain_text", "Untitled"),
-                    "url": db["url"]
-                })
+            databases = [database async for database in self.iter_databases(refresh=refresh)]
             
             return {
                 "success": True,
@@ -315,24 +689,17 @@ class NotionService:
                 "error": f"Failed to list databases: {str(e)}"
             }
     
-    def get_database_properties(self, database_id: str) -> Dict[str, Any]:
+    async def get_database_properties(self, database_id: str) -> Dict[str, Any]:
         """
         Get the properties schema of a database to understand its structure
         """
         try:
-            database = self.client.databases.retrieve(database_id=database_id)
-            
-            properties = {}
-            for prop_name, prop_data in database["properties"].items():
-                properties[prop_name] = {
-                    "type": prop_data["type"],
-                    "id": prop_data["id"]
-                }
+            schema = await self.get_database_schema(database_id)
             
             return {
                 "success": True,
-                "properties": properties,
-                "title": database.get("title", [{}])[0].get("plain_text", "Untitled")
+                "properties": schema["properties"],
+                "title": schema["title"]
             }
             
         except Exception as e:
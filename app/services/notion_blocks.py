@@ -0,0 +1,361 @@
+import re
+from typing import Any, Dict, List, Optional
+
+# Notion API limits
+MAX_RICH_TEXT_CHARS = 2000  # characters per rich text item
+MAX_RICH_TEXT_ITEMS = 100  # items per rich text array
+MAX_NESTING_DEPTH = 2  # levels of children one pages.create / append call accepts
+
+# Languages accepted for code blocks; anything else is sent as plain text
+CODE_LANGUAGES = {
+    'bash', 'c', 'c++', 'css', 'go', 'html', 'java', 'javascript', 'json', 'markdown',
+    'python', 'ruby', 'rust', 'shell', 'sql', 'typescript', 'yaml',
+}
+
+# Block-level syntax by the first character of a line after its indent. Each
+# pattern names the kind of block it found in its outermost matching group;
+# lines starting with any other character are paragraphs without a regex.
+_FENCE_RE = re.compile(r'(?P<fence>(?:```|~~~)\s*(?P<lang>[\w+-]*))\s*$')
+_HEADING_RE = re.compile(r'(?P<heading>#{1,6})\s+')
+_QUOTE_RE = re.compile(r'(?P<quote>>)[ \t]?')
+_NUMBER_RE = re.compile(r'(?P<number>\d{1,3})[.)][ \t]+')
+_LETTER_RE = re.compile(r'(?P<letter>[a-h])\.[ \t]+')
+_BULLET_RE = re.compile(r'(?P<bullet>[-*+•])[ \t]+')
+_DASH_RE = re.compile(r'(?P<rule>(?:-[ \t]*){3,}$)|(?P<bullet>-)[ \t]+')
+_STAR_RE = re.compile(r'(?P<rule>(?:\*[ \t]*){3,}$)|(?P<bullet>\*)[ \t]+')
+_UNDERSCORE_RE = re.compile(r'(?P<rule>(?:_[ \t]*){3,}$)')
+_LINE_SYNTAX = {
+    '`': _FENCE_RE, '~': _FENCE_RE, '#': _HEADING_RE, '>': _QUOTE_RE,
+    '-': _DASH_RE, '*': _STAR_RE, '_': _UNDERSCORE_RE, '+': _BULLET_RE, '•': _BULLET_RE,
+    **{digit: _NUMBER_RE for digit in '0123456789'},
+    # Only the sub-point letters the summary prompt asks for, so prose starting "a. " stays prose
+    **{letter: _LETTER_RE for letter in 'abcdefgh'},
+}
+
+# Block types of list items by the kind of marker
+_LIST_ITEM_TYPES = {'number': 'numbered_list_item', 'letter': 'bulleted_list_item', 'bullet': 'bulleted_list_item'}
+
+
+# Inline annotations, one group per alternative holding the text to keep.
+# Alternatives are grouped by their first character, so a scan tests one
+# character per position and only tries the alternatives that can start
+# there. Within a group the longest delimiters come first, and none spans
+# lines.
+_PLAIN_INLINE_RE = re.compile(
+    r'(?:'
+    r'\*(?:\*\*(?P<bold_italic>.+?)\*\*\*'
+    r'|\*(?P<bold>.+?)\*\*'
+    r'|(?P<italic>[^*\s](?:[^*\n]*[^*\s])?)\*)'
+    r'|_(?:_(?P<bold2>.+?)__'
+    r'|(?<!\w_)(?P<italic2>[^_\s](?:[^_\n]*[^_\s])?)_(?!\w))'
+    r'|~~(?P<strikethrough>.+?)~~'
+    r'|`(?P<code>[^`\n]+)`'
+    r'|\[(?P<link_text>[^\]\n]+)\]\(https?://[^)\s]+\)'
+    r')'
+)
+
+# The same syntax captured whole, so ``split`` alternates plain text and
+# markup without a match object per annotation
+_INLINE_RE = re.compile('(' + re.sub(r'\(\?P<\w+>', '(?:', _PLAIN_INLINE_RE.pattern) + ')')
+
+# Cheap test for lines that cannot contain inline markup
+_INLINE_MARKER_RE = re.compile(r'[*_~`\[]')
+
+# Annotations by delimiter, shared by every item outside other annotations.
+# A markup token's first character is its delimiter; a doubled one is bold
+# or strikethrough, and ``***`` on both ends is bold italic.
+_ITALIC = {'italic': True}
+_BOLD = {'bold': True}
+_BOLD_ITALIC = {'bold': True, 'italic': True}
+_CODE = {'code': True}
+_SINGLE_ANNOTATIONS = {'*': _ITALIC, '_': _ITALIC, '`': _CODE}
+_DOUBLE_ANNOTATIONS = {'*': _BOLD, '_': _BOLD, '~': {'strikethrough': True}}
+
+# Line markers dropped from plain text: heading and quote prefixes, rules and code fences
+_PLAIN_LINE_RE = re.compile(
+    r'\n[ \t]*(?:#{1,6}[ \t]+|>[ \t]?|(?:(?:-[ \t]*){3,}|(?:\*[ \t]*){3,}|(?:_[ \t]*){3,}|(?:```|~~~)[\w+-]*[ \t]*)$)',
+    re.MULTILINE
+)
+
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+
+def _split_text(text: str, limit: int = MAX_RICH_TEXT_CHARS) -> List[str]:
+    """
+    Split text into pieces of at most ``limit`` characters
+
+    Prefers to break after a paragraph, then a sentence, then a word, and
+    only cuts mid-word when a single word is longer than the limit.
+    """
+    pieces = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = max(window.rfind("\n"), window.rfind(". "), window.rfind("? "), window.rfind("! "))
+        if cut <= 0:
+            cut = window.rfind(" ")
+        cut = cut + 1 if cut > 0 else limit
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text or not pieces:
+        pieces.append(text)
+    return pieces
+
+
+def _rich_text(content: str) -> List[Dict[str, Any]]:
+    """Rich text array for content of any length, split into compliant items"""
+    return [{"type": "text", "text": {"content": piece}} for piece in _split_text(content)]
+
+
+def _block(block_type: str, rich_text: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"object": "block", "type": block_type, block_type: {"rich_text": rich_text}}
+
+
+def _paragraph(content: str) -> Dict[str, Any]:
+    return _block("paragraph", _rich_text(content))
+
+
+def _heading_2(content: str) -> Dict[str, Any]:
+    return _block("heading_2", _rich_text(content))
+
+
+def _append_text(
+    items: List[Dict[str, Any]],
+    content: str,
+    annotations: Optional[Dict[str, bool]],
+    link: Optional[str]
+) -> None:
+    if not link and len(content) <= MAX_RICH_TEXT_CHARS:
+        if annotations:
+            items.append({"type": "text", "text": {"content": content}, "annotations": annotations})
+        else:
+            items.append({"type": "text", "text": {"content": content}})
+        return
+    for piece in _split_text(content):
+        item = {"type": "text", "text": {"content": piece}}
+        if link:
+            item["text"]["link"] = {"url": link}
+        if annotations:
+            item["annotations"] = annotations
+        items.append(item)
+
+
+def _markup(token: str) -> tuple:
+    """Inner text, annotations and link URL of a markup token from ``_INLINE_RE``"""
+    first = token[0]
+    if first == '[':
+        text, _, url = token[1:-1].partition('](')
+        return text, None, url
+    if token[1] != first:
+        return token[1:-1], _SINGLE_ANNOTATIONS[first], None
+    if first == '*' and token[2] == '*' and token[-3] == '*' and len(token) > 6:
+        return token[3:-3], _BOLD_ITALIC, None
+    return token[2:-2], _DOUBLE_ANNOTATIONS[first], None
+
+
+def _inline(text: str) -> List[Dict[str, Any]]:
+    """Rich text items for a line of inline markdown"""
+    if len(text) > MAX_RICH_TEXT_CHARS:
+        # Items may need splitting; the common case below appends them directly
+        return _inline_nested(text, [], None, None)
+    if not _INLINE_MARKER_RE.search(text):
+        return [{"type": "text", "text": {"content": text}}]
+
+    items: List[Dict[str, Any]] = []
+    append = items.append
+    # Plain text and markup tokens alternate, starting and ending with text
+    parts = _INLINE_RE.split(text)
+    tokens = iter(parts)
+    for before, token in zip(tokens, tokens):
+        if before:
+            append({"type": "text", "text": {"content": before}})
+        # _markup, inlined for the hot loop
+        first = token[0]
+        if token[1] != first:
+            if first == '[':
+                link_text, _, url = token[1:-1].partition('](')
+                _inline_nested(link_text, items, None, url)
+                continue
+            inner = token[1:-1]
+            annotations = _SINGLE_ANNOTATIONS[first]
+        elif first == '*' and token[2] == '*' and token[-3] == '*' and len(token) > 6:
+            inner = token[3:-3]
+            annotations = _BOLD_ITALIC
+        else:
+            inner = token[2:-2]
+            annotations = _DOUBLE_ANNOTATIONS[first]
+        if annotations is not _CODE and _INLINE_MARKER_RE.search(inner):
+            # Annotations nest, e.g. a link or italics inside bold text
+            _inline_nested(inner, items, annotations, None)
+        else:
+            # The shared annotations are used as they are
+            append({"type": "text", "text": {"content": inner}, "annotations": annotations})
+    if parts[-1] or not items:
+        append({"type": "text", "text": {"content": parts[-1]}})
+    return items
+
+
+def _inline_nested(
+    text: str,
+    items: List[Dict[str, Any]],
+    annotations: Optional[Dict[str, bool]],
+    link: Optional[str]
+) -> List[Dict[str, Any]]:
+    """``_inline`` for text inside a link or annotation, or too long for one item"""
+    parts = _INLINE_RE.split(text)
+    for index in range(1, len(parts), 2):
+        if parts[index - 1]:
+            _append_text(items, parts[index - 1], annotations, link)
+        inner, inner_annotations, url = _markup(parts[index])
+        if url is not None:
+            _inline_nested(inner, items, annotations, url)
+            continue
+        nested = inner_annotations is not _CODE and _INLINE_MARKER_RE.search(inner)
+        if annotations:
+            inner_annotations = {**annotations, **inner_annotations}
+        if nested:
+            _inline_nested(inner, items, inner_annotations, link)
+        else:
+            _append_text(items, inner, inner_annotations, link)
+    if parts[-1] or not items:
+        _append_text(items, parts[-1], annotations, link)
+    return items
+
+
+def _code_blocks(lines: List[str], language: str) -> List[Dict[str, Any]]:
+    """Code block for a fence's lines, continued in further ones past the rich text item limit"""
+    rich_text = _rich_text('\n'.join(lines))
+    return [
+        {
+            "object": "block",
+            "type": "code",
+            "code": {"rich_text": rich_text[i:i + MAX_RICH_TEXT_ITEMS], "language": language},
+        }
+        for i in range(0, len(rich_text), MAX_RICH_TEXT_ITEMS)
+    ]
+
+
+def _overflow(rich_text: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Cut a block's rich text down to the item limit, returning the rest as paragraphs
+
+    The paragraphs go right after the block, so the text reads on.
+    """
+    rest = rich_text[MAX_RICH_TEXT_ITEMS:]
+    del rich_text[MAX_RICH_TEXT_ITEMS:]
+    return [_block("paragraph", rest[i:i + MAX_RICH_TEXT_ITEMS]) for i in range(0, len(rest), MAX_RICH_TEXT_ITEMS)]
+
+
+def markdown_to_blocks(text: str) -> List[Dict[str, Any]]:
+    """
+    Compile markdown (as LLM summaries write it) into Notion blocks in one pass
+
+    Handles headings, numbered, lettered and bulleted lists, quotes, rules,
+    fenced code and bold/italic/strikethrough/code/link annotations. List
+    items nest by indentation, and bullets or lettered items directly under a
+    numbered item become its children even without indentation. Nesting is
+    capped at the depth Notion accepts in a single request, and rich text
+    past the item limit continues in the following block.
+
+    Args:
+        text: Markdown or plain text
+
+    Returns:
+        Top-level Notion block objects, children attached
+    """
+    blocks: List[Dict[str, Any]] = []
+    # Open list items as (indent, kind, block), outermost first
+    stack: List[tuple] = []
+    code_lines: Optional[List[str]] = None
+    code_language = 'plain text'
+
+    for line in text.split('\n'):
+        if code_lines is not None:
+            if line.strip() in ('```', '~~~'):
+                blocks.extend(_code_blocks(code_lines, code_language))
+                code_lines = None
+            else:
+                code_lines.append(line)
+            continue
+
+        stripped = line.lstrip()
+        if not stripped:
+            # Blank lines separate items but do not close lists
+            continue
+
+        indent = len(line) - len(stripped)
+        if indent and '\t' in line[:indent]:
+            indent = len(line[:indent].expandtabs(4))
+        syntax = _LINE_SYNTAX.get(stripped[0])
+        match = syntax.match(stripped) if syntax is not None else None
+        if match is None:
+            kind = None
+            content = stripped.rstrip()
+        else:
+            kind = match.lastgroup
+            content = stripped[match.end():].strip()
+
+        block_type = _LIST_ITEM_TYPES.get(kind)
+        if block_type is not None:
+            while stack and stack[-1][0] >= indent:
+                top_indent, top_kind, _ = stack[-1]
+                # Unindented sub-points still belong to the numbered item above
+                if top_kind == 'number' and kind != 'number' and top_indent == indent:
+                    break
+                stack.pop()
+            del stack[MAX_NESTING_DEPTH:]
+            parent = stack[-1][2] if stack else None
+        elif kind is None and stack and indent > 0:
+            # An indented line inside a list continues the current item, or
+            # follows it when the item is already as deep as blocks can nest
+            block_type = 'paragraph'
+            parent = stack[min(len(stack), MAX_NESTING_DEPTH) - 1][2]
+        else:
+            stack.clear()
+            parent = None
+            if kind == 'fence':
+                code_lines = []
+                language = (match.group('lang') or '').lower()
+                code_language = language if language in CODE_LANGUAGES else 'plain text'
+                continue
+            if kind == 'rule':
+                blocks.append({"object": "block", "type": "divider", "divider": {}})
+                continue
+            if kind == 'heading':
+                block_type = f"heading_{min(len(match.group('heading')), 3)}"
+            else:
+                block_type = 'quote' if kind == 'quote' else 'paragraph'
+
+        rich_text = _inline(content)
+        block = {"object": "block", "type": block_type, block_type: {"rich_text": rich_text}}
+        if parent is None:
+            siblings = blocks
+        else:
+            body = parent[parent["type"]]
+            siblings = body.get("children")
+            if siblings is None:
+                siblings = body["children"] = []
+        siblings.append(block)
+        if len(rich_text) > MAX_RICH_TEXT_ITEMS:
+            siblings.extend(_overflow(rich_text))
+        if kind in _LIST_ITEM_TYPES:
+            stack.append((indent, kind, block))
+
+    if code_lines is not None:
+        # Unterminated fence: keep the code rather than dropping it
+        blocks.extend(_code_blocks(code_lines, code_language))
+    return blocks
+
+
+def markdown_to_plain(text: str) -> str:
+    """
+    Strip markdown formatting, keeping list markers and line breaks
+
+    Headings, quotes and rules lose their markers, and inline annotations
+    are reduced to their text. Each step is one compiled pass over the whole
+    text.
+    """
+    # The line pattern anchors on the newline before each line, so give the first line one
+    text = _PLAIN_LINE_RE.sub('\n', '\n' + text)[1:]
+    # Splitting keeps the text between annotations and the one group each matched
+    text = ''.join(filter(None, _PLAIN_INLINE_RE.split(text)))
+    return _BLANK_LINES_RE.sub('\n\n', text).strip()
@@ -0,0 +1,331 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import settings as config
+from app.services.claims import add_claim_columns, claim_is_stale, current_owner
+from app.services.notion import NotionService
+from app.services.ratelimit import backoff_delay
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Outbox entry statuses
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SUPERSEDED = "superseded"
+
+
+class NotionOutbox:
+    """Durable SQLite outbox of Notion page writes waiting to be synced"""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the NotionOutbox
+
+        Args:
+            db_path: Path of the SQLite database file. Parent directories are
+                     created if they do not exist.
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS notion_outbox (
+                    id TEXT PRIMARY KEY,
+                    video_key TEXT NOT NULL,
+                    database_id TEXT NOT NULL,
+                    job_id TEXT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    page_id TEXT,
+                    page_url TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            add_claim_columns(self._conn, "notion_outbox")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS notion_outbox_due ON notion_outbox (status, next_attempt_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS notion_outbox_video ON notion_outbox (video_key, created_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS notion_outbox_job ON notion_outbox (job_id)")
+
+    def enqueue(self, video_key: str, database_id: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """
+        Queue a page write and return its outbox id
+
+        Pending writes of the same video to the same database are coalesced:
+        they are marked superseded so only the newest content is written.
+        """
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE notion_outbox SET status = ?, updated_at = ? WHERE video_key = ? AND database_id = ? AND status = ?",
+                    (SUPERSEDED, now, video_key, database_id, PENDING)
+                )
+                self._conn.execute(
+                    """
+                    INSERT INTO notion_outbox (id, video_key, database_id, job_id, payload, status, next_attempt_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (entry_id, video_key, database_id, job_id, json.dumps(payload), PENDING, now, now, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return entry_id
+
+    def claim_due(self) -> Optional[Dict[str, Any]]:
+        """Atomically mark the oldest due pending entry as running by this process and return it"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE notion_outbox SET status = ?, owner = ?, heartbeat_at = ?, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM notion_outbox WHERE status = ? AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at LIMIT 1
+                )
+                RETURNING *
+                """,
+                (RUNNING, current_owner(), now, now, PENDING, now)
+            ).fetchone()
+        return self._to_entry(row)
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next pending entry is due, or None if there is none"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM notion_outbox WHERE status = ?", (PENDING,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_done(self, entry_id: str, page_id: str, page_url: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE notion_outbox SET status = ?, page_id = ?, page_url = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (DONE, page_id, page_url, time.time(), entry_id)
+            )
+
+    def mark_failed(self, entry_id: str, attempts: int, error: str, retry_in: Optional[float]) -> None:
+        """Record a failed attempt; the entry is retried after ``retry_in`` seconds, or given up on if None"""
+        now = time.time()
+        with self._lock:
+            if retry_in is None:
+                self._conn.execute(
+                    "UPDATE notion_outbox SET status = ?, attempts = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (FAILED, attempts, error, now, entry_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE notion_outbox SET status = ?, attempts = ?, error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                    (PENDING, attempts, error, now + retry_in, now, entry_id)
+                )
+
+    def heartbeat(self) -> None:
+        """Show that this process is still working on the entries it claimed"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE notion_outbox SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                (time.time(), current_owner(), RUNNING)
+            )
+
+    def requeue_interrupted(self, stale_seconds: float) -> int:
+        """
+        Return entries whose worker is gone to pending
+
+        A running entry is requeued when its owner process is known to be
+        dead or its heartbeat is older than ``stale_seconds``. Writes other
+        live workers are making are left alone.
+        """
+        requeued = 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner, heartbeat_at FROM notion_outbox WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for row in rows:
+                if not claim_is_stale(row['owner'], row['heartbeat_at'], stale_seconds):
+                    continue
+                # Only if nobody claimed it again in the meantime
+                cursor = self._conn.execute(
+                    """
+                    UPDATE notion_outbox SET status = ?, owner = NULL, heartbeat_at = NULL, updated_at = ?
+                    WHERE id = ? AND status = ? AND owner IS ?
+                    """,
+                    (PENDING, time.time(), row['id'], RUNNING, row['owner'])
+                )
+                requeued += cursor.rowcount
+        return requeued
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM notion_outbox WHERE id = ?", (entry_id,)).fetchone()
+        return self._to_entry(row)
+
+    def latest_for_video(self, video_key: str) -> Optional[Dict[str, Any]]:
+        """Most recent write for a video that was not superseded"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM notion_outbox WHERE video_key = ? AND status != ? ORDER BY created_at DESC LIMIT 1",
+                (video_key, SUPERSEDED)
+            ).fetchone()
+        return self._to_entry(row)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _to_entry(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['payload'] = json.loads(entry['payload'])
+        return entry
+
+    @staticmethod
+    def public_view(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields of an entry that are safe to return to API clients"""
+        return {
+            "sync_id": entry['id'],
+            "video_id": entry['video_key'],
+            "database_id": entry['database_id'],
+            "job_id": entry['job_id'],
+            "status": entry['status'],
+            "attempts": entry['attempts'],
+            "page_id": entry['page_id'],
+            "page_url": entry['page_url'],
+            "error": entry['error'],
+            "created_at": entry['created_at'],
+            "updated_at": entry['updated_at'],
+        }
+
+
+class NotionSyncWorker:
+    """Background workers that drain the outbox into Notion, retrying failures"""
+
+    def __init__(self, outbox: NotionOutbox, notion_service: NotionService, workers: int):
+        """
+        Initialize the NotionSyncWorker
+
+        Args:
+            outbox: Outbox the writes are read from
+            notion_service: Service used to create the pages
+            workers: Number of writes in flight at once
+        """
+        self.outbox = outbox
+        self.notion_service = notion_service
+        self.workers = max(1, workers)
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def _requeue_interrupted(self) -> None:
+        requeued = await asyncio.to_thread(self.outbox.requeue_interrupted, config.claim_stale_seconds)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted Notion write(s)")
+            self._wakeup.set()
+
+    async def _heartbeat(self) -> None:
+        """Keep this process's claims fresh and take back those of workers that died"""
+        while True:
+            await asyncio.sleep(config.claim_heartbeat_seconds)
+            try:
+                await asyncio.to_thread(self.outbox.heartbeat)
+                await self._requeue_interrupted()
+            except Exception:
+                logger.exception("Notion sync heartbeat failed")
+
+    async def start(self) -> None:
+        """Recover interrupted writes and start the worker tasks"""
+        await self._requeue_interrupted()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop the workers and close the outbox; unfinished writes resume once they go stale"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.outbox.close()
+
+    async def enqueue(self, video_key: str, database_id: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        entry_id = await asyncio.to_thread(self.outbox.enqueue, video_key, database_id, payload, job_id)
+        self._wakeup.set()
+        return entry_id
+
+    async def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of an outbox entry, or None if it does not exist"""
+        entry = await asyncio.to_thread(self.outbox.get, entry_id)
+        return NotionOutbox.public_view(entry) if entry else None
+
+    async def latest_for_video(self, video_key: str) -> Optional[Dict[str, Any]]:
+        """Public view of the newest live write for a video, or None"""
+        entry = await asyncio.to_thread(self.outbox.latest_for_video, video_key)
+        return NotionOutbox.public_view(entry) if entry else None
+
+    async def _worker(self) -> None:
+        while True:
+            self._wakeup.clear()
+            entry = await asyncio.to_thread(self.outbox.claim_due)
+            if entry is None:
+                # Sleep until something is enqueued or the next retry is due
+                due_in = await asyncio.to_thread(self.outbox.next_due_in)
+                timeout = 30.0 if due_in is None else min(30.0, max(due_in, 0.05))
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._sync(entry)
+
+    async def _sync(self, entry: Dict[str, Any]) -> None:
+        try:
+            result = await self.notion_service.create_page_in_database(
+                database_id=entry['database_id'],
+                **entry['payload']
+            )
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        if result['success']:
+            logger.info(f"Synced {entry['video_key']} to Notion: {result['page_url']}")
+            await asyncio.to_thread(self.outbox.mark_done, entry['id'], result['page_id'], result['page_url'])
+            return
+
+        attempts = entry['attempts'] + 1
+        retry_in = None
+        # Writes rejected by schema validation will not succeed on a retry
+        if attempts < config.notion_sync_max_attempts and result.get('retryable', True):
+            retry_in = backoff_delay(
+                attempts,
+                base=config.notion_sync_retry_base_seconds,
+                cap=config.notion_sync_retry_max_seconds
+            )
+        logger.warning(
+            f"Notion sync of {entry['video_key']} failed (attempt {attempts}): {result.get('error')}"
+            + (f", retrying in {retry_in:.0f}s" if retry_in is not None else ", giving up")
+        )
+        await asyncio.to_thread(self.outbox.mark_failed, entry['id'], attempts, result.get('error', 'Unknown error'), retry_in)
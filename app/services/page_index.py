@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.services.extractAudio import video_key_from_url
+
+if TYPE_CHECKING:
+    from app.services.notion import NotionService
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class NotionPageIndex:
+    """
+    Persistent map of canonical video id to the Notion page created for it
+
+    Lets a request find an existing page with one local lookup instead of
+    querying the database through the rate-limited API.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize the NotionPageIndex
+
+        Args:
+            db_path: Path of the SQLite database file. Parent directories are
+                     created if they do not exist.
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS notion_pages (
+                    video_key TEXT NOT NULL,
+                    database_id TEXT NOT NULL,
+                    page_id TEXT NOT NULL,
+                    page_url TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (video_key, database_id)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS notion_pages_page ON notion_pages (page_id)")
+
+    @staticmethod
+    def _database_key(database_id: str) -> str:
+        """Database ids are accepted with or without dashes"""
+        return database_id.replace("-", "").lower()
+
+    def get(self, video_key: str, database_id: str) -> Optional[Dict[str, Any]]:
+        """Return the page recorded for a video in a database, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM notion_pages WHERE video_key = ? AND database_id = ?",
+                (video_key, self._database_key(database_id))
+            ).fetchone()
+        return dict(row) if row else None
+
+    def put(self, video_key: str, database_id: str, page_id: str, page_url: Optional[str]) -> None:
+        self.put_many(database_id, [(video_key, page_id, page_url)])
+
+    def put_many(self, database_id: str, entries: List[Tuple[str, str, Optional[str]]]) -> None:
+        """Record ``(video_key, page_id, page_url)`` entries, replacing older pages for the same videos"""
+        now = time.time()
+        database_key = self._database_key(database_id)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO notion_pages (video_key, database_id, page_id, page_url, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(video_key, database_key, page_id, page_url, now) for video_key, page_id, page_url in entries]
+            )
+
+    def remove_page(self, page_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM notion_pages WHERE page_id = ?", (page_id,))
+
+    def count(self, database_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM notion_pages WHERE database_id = ?", (self._database_key(database_id),)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _page_video_url(page: Dict[str, Any]) -> Optional[str]:
+    """The video URL stored on a page: a URL property, or a text property named URL"""
+    for name, prop in page.get("properties", {}).items():
+        if prop.get("type") == "url" and prop.get("url"):
+            return prop["url"]
+        if name.lower() == "url" and prop.get("type") == "rich_text":
+            text = "".join(item.get("plain_text", "") for item in prop["rich_text"]).strip()
+            if text:
+                return text
+    return None
+
+
+async def backfill_page_index(notion_service: "NotionService", database_id: str) -> Dict[str, Any]:
+    """
+    Index the existing pages of a database by the video they were created for
+
+    Pages are read with a paginated database query and matched through their
+    URL property. Pages without one, or whose URL no extractor recognizes,
+    are counted as skipped.
+
+    Args:
+        notion_service: Service whose page index is filled
+        database_id: Database to scan
+
+    Returns:
+        Counts of scanned, indexed and skipped pages
+    """
+    index = notion_service.page_index
+    if index is None:
+        raise RuntimeError("The Notion service has no page index")
+
+    scanned = 0
+    entries = []
+    async for page in notion_service.iter_database_pages(database_id):
+        scanned += 1
+        url = _page_video_url(page)
+        video_key = await asyncio.to_thread(video_key_from_url, url) if url else None
+        if video_key:
+            entries.append((video_key, page["id"], page.get("url")))
+
+    # Pages arrive oldest first, so the newest page wins when a video has several
+    await asyncio.to_thread(index.put_many, database_id, entries)
+    logger.info(f"Indexed {len(entries)} of {scanned} page(s) in Notion database {database_id}")
+    return {
+        "database_id": database_id,
+        "scanned": scanned,
+        "indexed": len(entries),
+        "skipped": scanned - len(entries),
+    }
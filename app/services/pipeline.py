@@ -0,0 +1,868 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings as config
+from app.models.audio import AudioExtractionRequest, AudioExtractionResponse
+from app.services.cache import ResultCache, get_result_cache
+from app.services.executors import DOWNLOAD, OPENAI, run_in_stage
+from app.services.extractAudio import AudioExtractor, canonicalize_url, video_key_from_url
+from app.services.lazy import LazyModule
+from app.services.metrics import (
+    COALESCED_REQUESTS,
+    DOWNLOADED_BYTES,
+    EXTRACTED_BYTES,
+    SUMMARIES_WITHOUT_MODEL,
+    SUMMARY_TOKENS,
+    TRANSCRIBED_SECONDS,
+    StageTimer,
+    collect_timings,
+    record_stage_error,
+)
+from app.services.notion import NotionService
+from app.services.notion_blocks import markdown_to_plain
+from app.services.outbox import NotionSyncWorker
+from app.services.scratch import ScratchManager, Workspace, estimate_scratch_bytes
+from app.services.singleflight import Flight, PipelineLease
+from app.services.tokens import count_tokens, split_by_tokens
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+openai = LazyModule('openai')
+
+TRANSCRIBE_MODEL = "gpt-4o-transcribe"
+SUMMARY_MODEL = "gpt-4o-mini"
+# Bump whenever the summary prompts or schemas change so cached summaries are not reused
+PROMPT_VERSION = "2"
+# Completion budget of the final summary
+SUMMARY_MIN_OUTPUT_TOKENS = 300
+SUMMARY_MAX_OUTPUT_TOKENS = 1000
+# Rounds of condensing section notes before the final summary
+MAX_SECTION_ROUNDS = 3
+
+SUMMARY_PROMPT = """You are a helpful assistant that summarizes content from short form videos like reels.
+
+CRITICAL: You must return ONLY a JSON object. Do NOT use any markdown formatting in the summary field.
+
+Return a JSON object with this EXACT structure:
+{
+  "title": "A concise title",
+  "category": "If fitness related categorize by body part. Otherwise categorize by topic.",
+  "summary": "Plain text summary with proper line breaks. Use numbered lists and bullet points as shown below."
+}
+
+
+REQUIRED formatting (with line breaks):
+1. First main point
+
+• Sub-point under first point
+• Another sub-point
+
+2. Second main point
+
+• Sub-point under second point
+• Final sub-point
+
+Each numbered item should be on its own line. Each bullet point should be on its own line. Use actual line breaks (\\n) between sections.
+
+Focus on key takeaways and actionable insights. No filler content or sponsorship mentions."""
+
+# Enforced through structured outputs, so the answer always parses unless it is cut off
+SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "category": {"type": "string"},
+        "summary": {"type": "string"},
+    },
+    "required": ["title", "category", "summary"],
+    "additionalProperties": False,
+}
+
+SECTION_PROMPT = """You are taking notes on one part of a long video transcript. The notes on all parts are combined into one summary of the video later.
+
+Write the key points, facts, names, numbers and actionable advice of this part as concise plain-text notes, one per line. Leave out filler, greetings and sponsorship mentions."""
+
+SECTION_SCHEMA = {
+    "type": "object",
+    "properties": {"notes": {"type": "string"}},
+    "required": ["notes"],
+    "additionalProperties": False,
+}
+
+
+def _json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+_WORD_NORMALIZE_RE = re.compile(r"[^\w']+")
+
+
+def _overlap_length(previous: List[str], current: List[str], max_words: int) -> int:
+    """Length of the longest run of words that ends ``previous`` and starts ``current``"""
+    def normalize(word: str) -> str:
+        return _WORD_NORMALIZE_RE.sub('', word).lower()
+
+    limit = min(len(previous), len(current), max_words)
+    tail = [normalize(word) for word in previous[-limit:]] if limit else []
+    head = [normalize(word) for word in current[:limit]]
+    for length in range(limit, 0, -1):
+        if tail[-length:] == head[:length]:
+            return length
+    return 0
+
+
+def merge_transcripts(texts: Sequence[str], overlaps: Sequence[bool], max_overlap_words: int = 40) -> str:
+    """
+    Stitch chunk transcripts back together in order
+
+    Where a chunk overlaps the previous one (a hard cut rather than a cut on
+    silence), the words repeated at the start of the chunk are dropped.
+    """
+    merged: List[str] = []
+    for text, overlaps_previous in zip(texts, overlaps):
+        words = text.split()
+        if overlaps_previous and merged:
+            words = words[_overlap_length(merged, words, max_overlap_words):]
+        merged.extend(words)
+    return " ".join(merged)
+
+
+def _audio_size(result: Dict[str, Any]) -> int:
+    """Size in bytes of extracted audio, in memory or on disk"""
+    audio_file = result.get('audio_file')
+    if audio_file is not None:
+        position = audio_file.tell()
+        size = audio_file.seek(0, os.SEEK_END)
+        audio_file.seek(position)
+        return size
+    if result.get('file_path') and os.path.exists(result['file_path']):
+        return os.path.getsize(result['file_path'])
+    return 0
+
+
+# Backslash escapes of JSON strings, other than \\uXXXX
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_JSON_STRING_SPECIAL_RE = re.compile(r'["\\]')
+
+
+class JsonStringFieldStream:
+    """
+    Decode one string field of a JSON object while the object is still streaming
+
+    ``feed`` takes the next piece of raw JSON text and returns the newly
+    decoded characters of the field's value, holding back an escape
+    sequence that is split across pieces.
+    """
+
+    def __init__(self, field: str):
+        self._key_re = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ''
+        self._position: Optional[int] = None
+        self.done = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        if self.done:
+            return ''
+        if self._position is None:
+            match = self._key_re.search(self._buffer)
+            if match is None:
+                return ''
+            self._position = match.end()
+
+        buffer, position, decoded = self._buffer, self._position, []
+        while position < len(buffer):
+            special = _JSON_STRING_SPECIAL_RE.search(buffer, position)
+            end = special.start() if special else len(buffer)
+            decoded.append(buffer[position:end])
+            position = end
+            if special is None:
+                break
+            if buffer[position] == '"':
+                self.done = True
+                position += 1
+                break
+            # Backslash escape; wait for the rest of it if it is cut off
+            if position + 1 >= len(buffer):
+                break
+            if buffer[position + 1] != 'u':
+                decoded.append(_JSON_ESCAPES.get(buffer[position + 1], buffer[position + 1]))
+                position += 2
+                continue
+            length = 6
+            if position + 6 <= len(buffer) and 0xD800 <= int(buffer[position + 2:position + 6], 16) < 0xDC00:
+                length = 12  # a surrogate pair spans two escapes
+            if position + length > len(buffer):
+                break
+            decoded.append(json.loads('"' + buffer[position:position + length] + '"'))
+            position += length
+        self._position = position
+        return ''.join(decoded)
+
+
+# Progress callback: receives the stage name and overall progress in [0, 1]
+StageCallback = Callable[[str, float], Awaitable[None]]
+
+# Event callback: receives each result as soon as it is known (see ``ExtractionPipeline.run``).
+# It is always called on the event loop and must not block.
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def _count_usage(usage: Any, step: str) -> None:
+    """Add a completion's billed tokens to the summarization token counter"""
+    if usage is None:
+        return
+    SUMMARY_TOKENS.inc(getattr(usage, 'prompt_tokens', 0) or 0, type='prompt', step=step)
+    SUMMARY_TOKENS.inc(getattr(usage, 'completion_tokens', 0) or 0, type='completion', step=step)
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline stage fails in a way the caller should report"""
+
+    def __init__(self, message: str, status_code: int = 500, stage: Optional[str] = None, cause: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.stage = stage
+        # Error class reported in the stage error metrics
+        self.cause = cause
+
+
+class ExtractionPipeline:
+    """Download → transcribe → summarize → Notion, with every blocking stage off the event loop"""
+
+    def __init__(
+        self,
+        openai_client: Optional["OpenAI"] = None,
+        notion_service: Optional[NotionService] = None,
+        notion_sync: Optional[NotionSyncWorker] = None,
+        lease: Optional[PipelineLease] = None,
+        scratch: Optional[ScratchManager] = None,
+        openai_factory: Optional[Callable[[], "OpenAI"]] = None
+    ):
+        # Without a client, one is taken from ``openai_factory`` (or created)
+        # on first use, so the OpenAI SDK is not imported before it is needed
+        self._openai_client = openai_client
+        self._openai_factory = openai_factory
+        self._notion_service = notion_service
+        # Write-behind outbox; without it every Notion write is synchronous
+        self.notion_sync = notion_sync
+        # Runs in progress by flight key, and the optional cross-process lease
+        self._flights: Dict[str, Flight] = {}
+        self.lease = lease
+        self.scratch = scratch or ScratchManager(
+            config.scratch_dir or None,
+            tmpfs=config.scratch_tmpfs,
+            quota_bytes=config.scratch_quota_bytes,
+            stale_seconds=config.scratch_stale_seconds,
+            db_path=config.state_db_path
+        )
+
+    @property
+    def openai_client(self) -> "OpenAI":
+        if self._openai_client is None:
+            if self._openai_factory is not None:
+                self._openai_client = self._openai_factory()
+            else:
+                self._openai_client = openai.OpenAI(api_key=config.openai_api_key, base_url=config.openai_base_url)
+        return self._openai_client
+
+    @property
+    def notion_service(self) -> NotionService:
+        if self._notion_service is None:
+            self._notion_service = NotionService()
+        return self._notion_service
+
+    async def run(
+        self,
+        request: AudioExtractionRequest,
+        on_stage: Optional[StageCallback] = None,
+        job_id: Optional[str] = None,
+        on_event: Optional[EventCallback] = None
+    ) -> AudioExtractionResponse:
+        """
+        Extract audio from a video URL, transcribe it, summarize it and
+        optionally save the result to Notion
+
+        Concurrent requests for the same video and Notion target share one
+        run (see ``flight_key``): the first one runs the pipeline and the
+        others receive its result, marked ``coalesced``, along with its
+        progress and events. With a lease configured, runs in other worker
+        processes are waited for as well.
+
+        Args:
+            request: The extraction request
+            on_stage: Optional callback invoked as each stage starts
+            job_id: Id of the background job running this request, if any
+            on_event: Optional callback receiving partial results as they
+                      become available: ``metadata`` (title, duration, author,
+                      video_id), ``transcript``, ``summary_delta`` (text of the
+                      summary as the model writes it; not sent for cached
+                      summaries), ``summary`` and ``notion``
+
+        Returns:
+            The response, with per-stage ``timings`` when ``request.debug`` or
+            the ``debug`` setting is on
+
+        Raises:
+            PipelineError: if the audio could not be extracted
+        """
+        key = await self.flight_key(request) if config.single_flight_enabled else None
+        flight = self._flights.get(key) if key is not None else None
+        shared = flight is not None
+        if flight is None:
+            flight = Flight()
+            flight.task = asyncio.ensure_future(self._execute(request, flight, key, job_id))
+            if key is not None:
+                self._flights[key] = flight
+                flight.task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            logger.info(f"Joining the in-flight run for {key}")
+            COALESCED_REQUESTS.inc()
+
+        await flight.subscribe(on_stage, on_event)
+        try:
+            # The run outlives a cancelled caller; the others still need it
+            response, timings = await asyncio.shield(flight.task)
+        finally:
+            flight.unsubscribe(on_stage, on_event)
+
+        response = response.model_copy(update={'coalesced': shared})
+        if request.debug or config.debug:
+            response.timings = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        return response
+
+    async def flight_key(self, request: AudioExtractionRequest) -> str:
+        """
+        Key under which concurrent requests share a run
+
+        The canonical video id when the URL alone reveals it, otherwise the
+        canonical URL, plus the options that change where the result goes in
+        Notion.
+        """
+        url = str(request.url)
+        video = await asyncio.to_thread(video_key_from_url, url) or canonicalize_url(url)
+        write_behind = config.notion_write_behind if request.notion_write_behind is None else request.notion_write_behind
+        return "|".join([
+            video,
+            request.notion_database_id or config.notion_database_id or "",
+            request.on_duplicate or config.notion_on_duplicate,
+            "write-behind" if write_behind else "sync",
+        ])
+
+    async def _execute(
+        self,
+        request: AudioExtractionRequest,
+        flight: Flight,
+        key: Optional[str],
+        job_id: Optional[str]
+    ) -> Tuple[AudioExtractionResponse, Dict[str, float]]:
+        """Run the pipeline once for a flight, returning the response and stage timings"""
+        # Private scratch directory for the audio, removed when the run ends
+        label = key.split("|")[0] if key is not None else "run"
+        async with self.scratch.workspace(label) as workspace:
+            with collect_timings() as timings:
+                started = time.perf_counter()
+                if key is not None and self.lease is not None:
+                    async with self.lease.hold(key, config.single_flight_lease_wait_seconds) as waited:
+                        if waited:
+                            logger.info(f"Another worker ran {key} first; its cached results will be reused")
+                        response = await self._run(request, flight, workspace, job_id)
+                else:
+                    response = await self._run(request, flight, workspace, job_id)
+                timings['total'] = time.perf_counter() - started
+                return response, timings
+
+    async def _run(
+        self,
+        request: AudioExtractionRequest,
+        flight: Flight,
+        workspace: Workspace,
+        job_id: Optional[str]
+    ) -> AudioExtractionResponse:
+        report, emit = flight.report, flight.emit
+        extractor = AudioExtractor(output_dir=workspace.path)
+
+        await report("fetching_metadata", 0.0)
+        url = str(request.url)
+        # Check the cache before asking the site: a video seen before needs no
+        # metadata request when its transcript and summary are cached too
+        url_video_key = await asyncio.to_thread(video_key_from_url, url)
+        video_cache_key = ResultCache.make_key(ResultCache.VIDEO, url_video_key) if url_video_key else None
+        video = await self._cache_get(ResultCache.VIDEO, video_cache_key) if video_cache_key else None
+        info = None
+        if video is None:
+            info = await self.fetch_metadata(extractor, url)
+            video = {
+                'title': info.get('title', 'Unknown'),
+                'duration': info.get('duration', 0),
+                'author': extractor.get_author(info),
+                'video_key': extractor.get_video_key(info),
+            }
+            if video_cache_key:
+                await self._cache_set(ResultCache.VIDEO, video_cache_key, video)
+        else:
+            logger.info(f"Video details cache hit for {video['video_key']}")
+        emit("metadata", {
+            'title': video['title'],
+            'duration': video['duration'],
+            'author': video['author'],
+            'video_id': video['video_key'],
+        })
+
+        # Step 1: Transcribe audio to text, unless this video was transcribed before
+        transcript_key = ResultCache.make_key(ResultCache.TRANSCRIPT, video['video_key'], TRANSCRIBE_MODEL)
+        transcript = await self._cache_get(ResultCache.TRANSCRIPT, transcript_key)
+        if transcript is None:
+            if info is None:
+                info = await self.fetch_metadata(extractor, url)
+            # Wait for scratch space under the disk quota before downloading
+            await workspace.reserve(estimate_scratch_bytes(info))
+            await report("downloading", 0.1)
+            result = await self.download(extractor, request, info)
+            try:
+                await report("transcribing", 0.4)
+                transcript = await self.transcribe(extractor, result)
+            finally:
+                if result.get('audio_file') is not None:
+                    result['audio_file'].close()
+            await self._cache_set(ResultCache.TRANSCRIPT, transcript_key, transcript)
+        else:
+            logger.info(f"Transcript cache hit for {video['video_key']}")
+        emit("transcript", {'transcript': transcript})
+
+        # Step 2: Summarize the transcript and extract metadata
+        summary_key = ResultCache.make_key(ResultCache.SUMMARY, video['video_key'], SUMMARY_MODEL, PROMPT_VERSION)
+        summary_data = await self._cache_get(ResultCache.SUMMARY, summary_key)
+        if summary_data is None:
+            await report("summarizing", 0.7)
+            # Stream the completion only when someone is listening for it
+            on_delta = (lambda text: emit("summary_delta", {'text': text})) if flight.listening else None
+            summary_data, structured = await self.summarize(transcript, video_title=video['title'], on_delta=on_delta)
+            # Only cache well-formed summaries so a bad response is retried next time
+            if structured:
+                await self._cache_set(ResultCache.SUMMARY, summary_key, summary_data)
+        else:
+            logger.info(f"Summary cache hit for {video['video_key']}")
+        summary = markdown_to_plain(summary_data['summary'])
+        emit("summary", {'title': summary_data['title'], 'category': summary_data['category'], 'summary': summary})
+
+        # Step 3: Optionally save to Notion
+        await report("saving_to_notion", 0.9)
+        notion_result = await self.save_to_notion(request, video, summary_data, transcript, job_id=job_id)
+        emit("notion", {
+            'page_id': notion_result.get('page_id'),
+            'page_url': notion_result.get('page_url'),
+            'sync_id': notion_result.get('sync_id'),
+            'sync_status': notion_result.get('sync_status'),
+            'duplicate': notion_result.get('duplicate', False),
+        })
+
+        return AudioExtractionResponse(
+            success=True,
+            title=summary_data['title'],
+            duration=video['duration'],
+            transcript=transcript,
+            summary=summary,
+            notion_page_id=notion_result.get('page_id'),
+            notion_page_url=notion_result.get('page_url'),
+            notion_sync_id=notion_result.get('sync_id'),
+            notion_sync_status=notion_result.get('sync_status'),
+            notion_duplicate=notion_result.get('duplicate', False),
+            video_id=video['video_key']
+        )
+
+    async def run_safely(
+        self,
+        request: AudioExtractionRequest,
+        on_stage: Optional[StageCallback] = None,
+        job_id: Optional[str] = None
+    ) -> AudioExtractionResponse:
+        """Run the pipeline, reporting any failure in the response instead of raising"""
+        try:
+            return await self.run(request, on_stage=on_stage, job_id=job_id)
+        except PipelineError as e:
+            return AudioExtractionResponse(success=False, error=str(e))
+        except Exception as e:
+            logger.exception(f"Audio processing failed for {request.url}")
+            return AudioExtractionResponse(success=False, error=f"Audio processing failed: {str(e)}")
+
+    async def run_batch(self, requests: List[AudioExtractionRequest]) -> List[AudioExtractionResponse]:
+        """
+        Run several requests through the pipeline concurrently
+
+        Items flow through the stages independently, so one item's download
+        overlaps another's transcription and a third's Notion write. Each
+        stage is bounded by its own executor, and at most
+        ``batch_max_in_flight`` items hold scratch space at once.
+
+        Returns:
+            One response per request, in request order
+        """
+        in_flight = asyncio.Semaphore(max(1, config.batch_max_in_flight))
+
+        async def run_item(request: AudioExtractionRequest) -> AudioExtractionResponse:
+            async with in_flight:
+                return await self.run_safely(request)
+
+        return list(await asyncio.gather(*(run_item(request) for request in requests)))
+
+    async def fetch_metadata(self, extractor: AudioExtractor, url: str) -> Dict[str, Any]:
+        """Extract (or reuse cached) video metadata"""
+        try:
+            with StageTimer('metadata'):
+                return await run_in_stage(DOWNLOAD, extractor.extract_info, url)
+        except Exception as e:
+            raise PipelineError(f"Download error: {str(e)}", status_code=400, stage=DOWNLOAD)
+
+    async def download(
+        self,
+        extractor: AudioExtractor,
+        request: AudioExtractionRequest,
+        info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Download the video from its extracted info and transcode its audio track
+
+        With ``streaming_extraction`` enabled the audio is piped through ffmpeg
+        into memory and returned as ``audio_file``; otherwise it is written
+        to ``file_path``. A separate ffmpeg transcode is timed as its own
+        stage and left out of the download time.
+        """
+        extract = extractor.stream_audio_from_url if config.streaming_extraction else extractor.extract_audio_from_url
+        with StageTimer('download') as timer:
+            result = await run_in_stage(
+                DOWNLOAD,
+                extract,
+                url=str(request.url),
+                audio_format=request.audio_format,
+                quality=request.quality,
+                info=info,
+                profile=request.audio_profile
+            )
+            timer.exclude(result.get('transcode_seconds') or 0)
+
+            if not result['success']:
+                cause = 'DownloadError' if result['error'].startswith('Download error') else 'ExtractionError'
+                raise PipelineError(result['error'], status_code=400, stage=DOWNLOAD, cause=cause)
+
+        DOWNLOADED_BYTES.inc(result.get('downloaded_bytes') or 0)
+        EXTRACTED_BYTES.inc(_audio_size(result))
+        return result
+
+    async def transcribe(self, extractor: AudioExtractor, result: Dict[str, Any]) -> str:
+        """Transcribe extracted audio, either in memory or on disk, to text"""
+        duration = float(result.get('duration') or 0)
+        with StageTimer('transcription'):
+            # An unknown duration is measured while planning the segments
+            if config.chunked_transcription and (duration == 0 or duration > config.chunk_threshold_seconds):
+                return await self.transcribe_chunked(extractor, result)
+            transcript = await run_in_stage(OPENAI, self._transcribe_audio, result)
+        TRANSCRIBED_SECONDS.inc(duration)
+        return transcript
+
+    async def transcribe_chunked(self, extractor: AudioExtractor, result: Dict[str, Any]) -> str:
+        """
+        Split long audio on silences and transcribe the chunks concurrently
+
+        At most ``chunk_transcription_fanout`` chunks of one request are in
+        flight at a time, so latency follows the longest chunk rather than
+        the total duration.
+        """
+        plan = await run_in_stage(
+            DOWNLOAD,
+            extractor.prepare_segments,
+            result,
+            max_chunk_seconds=config.chunk_max_seconds,
+            overlap_seconds=config.chunk_overlap_seconds,
+            search_window_seconds=config.chunk_search_window_seconds,
+            silence_db=config.chunk_silence_threshold_db,
+            min_silence_seconds=config.chunk_min_silence_seconds
+        )
+        segments = plan['segments']
+        if len(segments) == 1 or plan['duration'] <= config.chunk_threshold_seconds:
+            transcript = await run_in_stage(OPENAI, self._transcribe_audio, result)
+            TRANSCRIBED_SECONDS.inc(plan['duration'])
+            return transcript
+
+        logger.info(f"Transcribing {plan['duration']:.0f}s of audio in {len(segments)} chunks")
+        fanout = asyncio.Semaphore(max(1, config.chunk_transcription_fanout))
+
+        async def transcribe_segment(segment: Dict[str, Any]) -> str:
+            async with fanout:
+                chunk = await run_in_stage(DOWNLOAD, extractor.extract_segment, plan['source_path'], segment)
+                try:
+                    return await run_in_stage(OPENAI, self._transcribe_audio, chunk)
+                finally:
+                    chunk['audio_file'].close()
+
+        texts = await asyncio.gather(*(transcribe_segment(segment) for segment in segments))
+        TRANSCRIBED_SECONDS.inc(plan['duration'])
+        return merge_transcripts(texts, [segment['overlaps_previous'] for segment in segments])
+
+    def _transcribe_audio(self, result: Dict[str, Any]) -> str:
+        if result.get('audio_file') is not None:
+            # Upload straight from the in-memory buffer
+            return self._transcribe_file((result['filename'], result['audio_file']))
+
+        with open(result['file_path'], "rb") as audio_file:
+            return self._transcribe_file(audio_file)
+
+    def _transcribe_file(self, audio_file: Any) -> str:
+        transcription = self.openai_client.audio.transcriptions.create(
+            model=TRANSCRIBE_MODEL,
+            file=audio_file,
+        )
+        return transcription.text
+
+    async def summarize(
+        self,
+        transcript: str,
+        video_title: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Summarize a transcript into a title, category and summary
+
+        Transcripts under ``summary_min_tokens`` are their own summary and
+        the model is not called. Transcripts over ``summary_chunk_tokens``
+        are split into sections that are condensed into notes in parallel
+        (map), and the summary is written from the notes (reduce).
+
+        Args:
+            transcript: The transcript to summarize
+            video_title: Title of the video, used if the model's answer is
+                         cut off, and as the title of a too-short transcript
+            on_delta: Optional callback receiving the summary text as it is
+                      generated; the completion is streamed when it is given.
+                      It is called on the event loop.
+
+        Returns:
+            The summary data and whether it is well-formed (and may be cached)
+        """
+        forward = None
+        if on_delta is not None:
+            loop = asyncio.get_running_loop()
+
+            def forward(text: str) -> None:
+                loop.call_soon_threadsafe(on_delta, text)
+
+        with StageTimer('summarization'):
+            # Off the event loop: tiktoken may load its encoding on first use
+            tokens = await asyncio.to_thread(count_tokens, transcript, SUMMARY_MODEL)
+            if tokens < config.summary_min_tokens:
+                logger.info(f"Transcript is only {tokens} tokens, using it as the summary")
+                SUMMARIES_WITHOUT_MODEL.inc()
+                return {
+                    "title": video_title or "Video Summary",
+                    "category": "Other",
+                    "summary": transcript.strip(),
+                }, True
+
+            from_notes = False
+            if tokens > config.summary_chunk_tokens:
+                transcript, tokens = await self._condense_sections(transcript, tokens)
+                from_notes = True
+            return await run_in_stage(
+                OPENAI, self._summarize_transcript, transcript, video_title, forward, tokens, from_notes
+            )
+
+    async def _condense_sections(self, text: str, tokens: int) -> Tuple[str, int]:
+        """
+        Map step: condense each section of a long text into notes, in parallel
+
+        Repeats on the joined notes while they are still over
+        ``summary_chunk_tokens``, for at most ``MAX_SECTION_ROUNDS`` rounds.
+
+        Returns:
+            The joined notes and their token count
+        """
+        fanout = asyncio.Semaphore(max(1, config.summary_map_fanout))
+
+        async def condense(index: int, total: int, section: str) -> str:
+            async with fanout:
+                return await run_in_stage(OPENAI, self._section_notes, section, index, total)
+
+        for _ in range(MAX_SECTION_ROUNDS):
+            if tokens <= config.summary_chunk_tokens:
+                break
+            sections = await asyncio.to_thread(split_by_tokens, text, config.summary_chunk_tokens, SUMMARY_MODEL)
+            logger.info(f"Condensing {tokens} tokens in {len(sections)} sections")
+            notes = await asyncio.gather(*(condense(index, len(sections), section) for index, section in enumerate(sections)))
+            text = "\n\n".join(f"Part {index + 1} of {len(notes)}:\n{note.strip()}" for index, note in enumerate(notes))
+            tokens = await asyncio.to_thread(count_tokens, text, SUMMARY_MODEL)
+        return text, tokens
+
+    def _section_notes(self, section: str, index: int, total: int) -> str:
+        response = self.openai_client.chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SECTION_PROMPT},
+                {"role": "user", "content": f"Part {index + 1} of {total} of the transcript:\n\n{section}"}
+            ],
+            max_tokens=config.summary_section_max_tokens,
+            temperature=0.3,
+            response_format=_json_schema_format("section_notes", SECTION_SCHEMA)
+        )
+        _count_usage(getattr(response, 'usage', None), 'section')
+        content = response.choices[0].message.content or ''
+        try:
+            return json.loads(content)['notes']
+        except (json.JSONDecodeError, KeyError, TypeError):
+            # Cut off at max_tokens; the raw text still carries the notes
+            return content
+
+    def _summarize_transcript(
+        self,
+        transcript: str,
+        video_title: Optional[str],
+        on_delta: Optional[Callable[[str], None]] = None,
+        tokens: Optional[int] = None,
+        from_notes: bool = False
+    ) -> Tuple[Dict[str, Any], bool]:
+        if tokens is None:
+            tokens = count_tokens(transcript, SUMMARY_MODEL)
+        if from_notes:
+            prompt = f"These are notes on consecutive parts of a long video transcript. Summarize the whole video from them:\n\n{transcript}"
+        else:
+            prompt = f"Please analyze and summarize this transcript:\n\n{transcript}"
+
+        stream = on_delta is not None
+        extra: Dict[str, Any] = {"stream_options": {"include_usage": True}} if stream else {}
+        summary_response = self.openai_client.chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            # Room for the summary of a short transcript, capped for long ones
+            max_tokens=min(SUMMARY_MAX_OUTPUT_TOKENS, max(SUMMARY_MIN_OUTPUT_TOKENS, tokens)),
+            temperature=0.3,
+            response_format=_json_schema_format("video_summary", SUMMARY_SCHEMA),
+            stream=stream,
+            **extra
+        )
+        step = 'final' if from_notes else 'single'
+
+        if not stream:
+            _count_usage(getattr(summary_response, 'usage', None), step)
+            content = summary_response.choices[0].message.content
+        else:
+            # Pass on the summary field's text as the JSON object streams in
+            summary_field = JsonStringFieldStream("summary")
+            parts = []
+            for chunk in summary_response:
+                # The last chunk carries the usage and no choices
+                _count_usage(getattr(chunk, 'usage', None), step)
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if not text:
+                    continue
+                parts.append(text)
+                delta = summary_field.feed(text)
+                if delta:
+                    on_delta(delta)
+            content = ''.join(parts)
+
+        # The schema is enforced, so this only fails for an answer cut off at
+        # max_tokens (or a refusal); keep what there is instead of asking again
+        try:
+            # Any markdown in the summary is kept; it is compiled into Notion
+            # blocks and stripped from the API response
+            summary_data = json.loads(content)
+            return summary_data, True
+        except (json.JSONDecodeError, TypeError):
+            summary_data = {
+                "title": f"Summary: {video_title}" if video_title else "Video Summary",
+                "category": "Other",
+                "author": "Unknown",
+                "summary": content or ""
+            }
+            return summary_data, False
+
+    async def _cache_get(self, kind: str, key: str) -> Optional[Any]:
+        cache = get_result_cache()
+        if cache is None:
+            return None
+        return await asyncio.to_thread(cache.get, kind, key)
+
+    async def _cache_set(self, kind: str, key: str, value: Any) -> None:
+        cache = get_result_cache()
+        if cache is not None:
+            await asyncio.to_thread(cache.set, kind, key, value)
+
+    async def save_to_notion(
+        self,
+        request: AudioExtractionRequest,
+        video: Dict[str, Any],
+        summary_data: Dict[str, Any],
+        transcript: str,
+        job_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Save the summary to Notion if a database is configured
+
+        In write-behind mode the page is queued in the durable outbox and
+        ``sync_id``/``sync_status`` are returned instead of the page. A Notion
+        failure never fails the request; an empty dict is returned instead.
+        """
+        database_id = request.notion_database_id or config.notion_database_id
+        if not database_id:
+            return {}
+
+        with StageTimer('notion'):
+            page = {
+                'title': summary_data['title'],
+                'category': summary_data['category'],
+                'author': video['author'],
+                'summary': summary_data['summary'],
+                'transcript': transcript,
+                'video_url': str(request.url),
+                'duration': video['duration'],
+                'video_title': video['title'],
+                'video_key': video['video_key'],
+                'on_duplicate': request.on_duplicate or config.notion_on_duplicate,
+            }
+
+            if page['on_duplicate'] == 'skip':
+                existing = await self.notion_service.find_page(video['video_key'], database_id)
+                if existing:
+                    logger.info(f"{video['video_key']} already has a Notion page, skipping: {existing['page_url']}")
+                    return {'page_id': existing['page_id'], 'page_url': existing['page_url'], 'duplicate': True}
+
+            write_behind = config.notion_write_behind if request.notion_write_behind is None else request.notion_write_behind
+            if write_behind and self.notion_sync is not None:
+                try:
+                    sync_id = await self.notion_sync.enqueue(video['video_key'], database_id, page, job_id=job_id)
+                    logger.info(f"Queued Notion write {sync_id} for {video['video_key']}")
+                    return {'sync_id': sync_id, 'sync_status': 'pending'}
+                except Exception:
+                    logger.exception("Failed to queue Notion write, writing synchronously")
+
+            logger.info(f"Saving to Notion database {database_id}...")
+            try:
+                notion_result = await self.notion_service.create_page_in_database(database_id=database_id, **page)
+
+                if notion_result['success']:
+                    if notion_result.get('duplicate'):
+                        logger.info(f"Reused existing Notion page: {notion_result['page_url']}")
+                    else:
+                        logger.info(f"Successfully created Notion page: {notion_result['page_url']}")
+                    return notion_result
+
+                logger.error(f"Failed to create Notion page: {notion_result.get('error', 'Unknown error')}")
+                record_stage_error('notion', notion_result.get('error_type') or 'NotionError')
+
+            except Exception as e:
+                # Don't fail the whole request if Notion fails
+                logger.exception("Failed to save to Notion")
+                record_stage_error('notion', type(e).__name__)
+
+            return {}
@@ -0,0 +1,174 @@
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings as config
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+PROFILE_SUFFIX = ".speedscope.json"
+
+# Innermost frames of threads that are parked rather than working: idle
+# executor workers, the event loop waiting for I/O and blocking waits
+_IDLE_FRAMES = {
+    ("thread.py", "_worker"),
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+Frame = Tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for every Python thread in the process
+
+    A background thread snapshots all thread stacks every ``interval``
+    seconds. Samples are weighted by the time since the previous snapshot,
+    and threads parked in an idle wait are skipped, so the profile shows
+    where time went while the profiler ran: extractor code, subprocess
+    waits, JSON parsing and so on. Time spent inside ffmpeg shows up as the
+    Python frame waiting for it. Other requests running at the same time
+    are sampled too.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        """
+        Initialize the SamplingProfiler
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Innermost frames kept per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self._frames: List[Frame] = []
+        self._frame_ids: Dict[Frame, int] = {}
+        # Per thread: its name and (stack, weight) samples
+        self._samples: Dict[int, Tuple[str, List[Tuple[List[int], float]]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+
+    def _frame_id(self, code: Any) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        frame_id = self._frame_ids.get(key)
+        if frame_id is None:
+            frame_id = self._frame_ids[key] = len(self._frames)
+            self._frames.append(key)
+        return frame_id
+
+    def _sample(self, weight: float) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            name, samples = self._samples.setdefault(thread_id, (names.get(thread_id, str(thread_id)), []))
+            samples.append((stack, weight))
+
+    def sample_count(self) -> int:
+        return sum(len(samples) for _, samples in self._samples.values())
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """The profile in speedscope's file format, one profile per thread"""
+        profiles = []
+        for thread_name, samples in sorted(self._samples.values(), key=lambda item: item[0]):
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weight for _, weight in samples),
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight for _, weight in samples],
+            })
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "automate-notion-notes",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [{"name": func, "file": path, "line": line} for func, path, line in self._frames],
+            },
+            "profiles": profiles,
+        }
+
+
+class ProfileStore:
+    """Speedscope profiles on disk, keeping only the most recent ones"""
+
+    def __init__(self, directory: str, max_files: int = 100):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+
+    def path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, os.path.basename(profile_id) + PROFILE_SUFFIX)
+
+    def save(self, profile_id: str, profile: Dict[str, Any]) -> str:
+        """Write a profile and prune the oldest beyond ``max_files``; returns its path"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(profile_id)
+        with open(path, "w") as f:
+            json.dump(profile, f)
+
+        existing = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(PROFILE_SUFFIX)),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in existing[:-self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        return path
+
+    def load(self, profile_id: str) -> Optional[bytes]:
+        try:
+            with open(self.path(profile_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+_profile_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Return the process-wide profile store, created on first use"""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore(config.profile_dir, max_files=config.profile_max_files)
+    return _profile_store
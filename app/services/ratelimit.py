@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter
+
+    Tokens refill at ``rate`` per second up to ``capacity``. Waiters are
+    served in arrival order. ``block_for`` pauses every caller, which is how a
+    server's ``Retry-After`` is applied to all requests sharing the bucket.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize the TokenBucket
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+        # Metrics
+        self.requests = 0
+        self.throttled_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.retries = 0
+        self.rate_limited_responses = 0
+
+    async def acquire(self) -> float:
+        """
+        Wait until a request may be sent
+
+        Returns:
+            Seconds spent waiting for a token
+        """
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    wait = (1 - self._tokens) / self.rate
+                await asyncio.sleep(wait)
+
+        waited = time.monotonic() - started
+        self.requests += 1
+        self.throttled_seconds += waited
+        return waited
+
+    def block_for(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    def record_retry(self, delay: float, rate_limited: bool) -> None:
+        self.retries += 1
+        self.backoff_seconds += delay
+        if rate_limited:
+            self.rate_limited_responses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.capacity,
+            "requests": self.requests,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "backoff_seconds": round(self.backoff_seconds, 3),
+            "retries": self.retries,
+            "rate_limited_responses": self.rate_limited_responses,
+        }
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+# One bucket per API credential, shared by every client using it
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def credential_key(token: str) -> str:
+    """Stable identifier for a credential that does not expose the secret"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]
+
+
+def get_token_bucket(token: str, rate: float, capacity: int) -> TokenBucket:
+    """Return the process-wide bucket for a credential, creating it on first use"""
+    key = credential_key(token)
+    if key not in _buckets:
+        _buckets[key] = TokenBucket(rate, capacity)
+    return _buckets[key]
+
+
+def bucket_stats() -> Dict[str, Dict[str, Any]]:
+    """Metrics for every bucket, keyed by credential id"""
+    return {key: bucket.stats() for key, bucket in _buckets.items()}
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff with full jitter
+
+    A server-provided ``retry_after`` is treated as a floor, with a little
+    jitter on top so waiting clients do not retry in lockstep.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
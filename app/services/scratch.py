@@ -0,0 +1,343 @@
+import asyncio
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.config import settings as config
+from app.services.claims import current_owner, owner_is_dead, owner_is_local, pid_alive
+from app.services.metrics import SCRATCH_BACKPRESSURE_WAITS, SCRATCH_RESERVED_BYTES
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# RAM-backed filesystem used for tmpfs workspaces
+TMPFS_ROOT = "/dev/shm"
+SCRATCH_DIRNAME = "automate-notion-notes-scratch"
+
+# Workspaces are named "<pid>-<label>-<random>" so the janitor can tell whose they are
+_WORKSPACE_RE = re.compile(r'(?P<pid>\d+)-.+-[0-9a-f]{12}')
+_UNSAFE_CHARS_RE = re.compile(r'[^A-Za-z0-9_.]+')
+
+
+def estimate_scratch_bytes(info: Dict[str, Any]) -> int:
+    """
+    Scratch space to reserve for downloading and transcoding a video
+
+    Uses the reported file size when yt-dlp knows it, otherwise the
+    duration at ``scratch_bytes_per_second``, and the default reservation
+    when neither is known.
+    """
+    size = info.get('filesize') or info.get('filesize_approx')
+    if not size and info.get('duration'):
+        size = float(info['duration']) * config.scratch_bytes_per_second
+    if not size:
+        return config.scratch_default_reservation_bytes
+    # The transcoded audio sits next to the source until the source is deleted
+    return int(size * 1.5)
+
+
+class ScratchLedger:
+    """
+    Scratch space reservations of every worker process, stored in SQLite
+
+    Workers sharing ``db_path`` and a scratch root share its quota.
+    Reservations of processes that died are dropped the next time the
+    ledger is read; only processes on this host count, since another
+    host's scratch space is its own disk.
+    """
+
+    def __init__(self, db_path: str, stale_seconds: float = 6 * 3600):
+        """
+        Initialize the ScratchLedger
+
+        Args:
+            db_path: Path of the SQLite database file. Parent directories are
+                     created if they do not exist.
+            stale_seconds: Age after which reservations of other hosts,
+                           which cannot be checked, are dropped
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.stale_seconds = stale_seconds
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scratch_reservations (
+                    workspace TEXT PRIMARY KEY,
+                    root TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _reserved(self, root: str) -> int:
+        """Bytes reserved under root by live local processes, dropping dead ones; hold the lock"""
+        total = 0
+        cutoff = time.time() - self.stale_seconds
+        rows = self._conn.execute(
+            "SELECT workspace, owner, bytes, updated_at FROM scratch_reservations WHERE root = ?", (root,)
+        ).fetchall()
+        for workspace, owner, nbytes, updated_at in rows:
+            if owner_is_local(owner):
+                if owner_is_dead(owner):
+                    self._conn.execute("DELETE FROM scratch_reservations WHERE workspace = ?", (workspace,))
+                    continue
+                total += nbytes
+            elif updated_at < cutoff:
+                self._conn.execute("DELETE FROM scratch_reservations WHERE workspace = ?", (workspace,))
+        return total
+
+    def try_reserve(self, root: str, workspace: str, nbytes: int, quota_bytes: int) -> bool:
+        """
+        Add ``nbytes`` to the workspace's reservation if the quota allows it
+
+        A single reservation larger than the quota is granted while nothing
+        else is reserved.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                reserved = self._reserved(root)
+                granted = reserved == 0 or reserved + nbytes <= quota_bytes
+                if granted:
+                    self._conn.execute(
+                        """
+                        INSERT INTO scratch_reservations (workspace, root, owner, bytes, updated_at) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (workspace) DO UPDATE SET bytes = bytes + excluded.bytes, updated_at = excluded.updated_at
+                        """,
+                        (workspace, root, current_owner(), nbytes, time.time())
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return granted
+
+    def release(self, workspace: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM scratch_reservations WHERE workspace = ?", (workspace,))
+
+    def reserved(self, root: str) -> int:
+        """Bytes reserved under root by all live processes on this host"""
+        with self._lock:
+            return self._reserved(root)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class Workspace:
+    """A private scratch directory for one pipeline run"""
+
+    def __init__(self, manager: "ScratchManager", path: str):
+        self.manager = manager
+        self.path = path
+        self.reserved = 0
+
+    async def reserve(self, nbytes: int) -> None:
+        """
+        Reserve disk space before writing up to ``nbytes`` into the workspace
+
+        Waits while the reservations of all workspaces, in every worker
+        process sharing the ledger, would exceed the quota. Reservations are
+        released when the workspace is closed.
+        """
+        await self.manager._reserve(self, nbytes)
+        self.reserved += nbytes
+
+
+class ScratchManager:
+    """
+    Per-run scratch workspaces under one root, with a disk quota and a janitor
+
+    Every pipeline run gets its own directory, removed when the run ends.
+    Downloads reserve space first, so once ``quota_bytes`` are reserved new
+    downloads wait for running ones to finish instead of filling the disk.
+    The reservations are kept in a ``ScratchLedger``, so the quota holds
+    across the worker processes of a host. A janitor removes workspaces left
+    behind by workers that died.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        tmpfs: bool = False,
+        quota_bytes: int = 2 * 1024 ** 3,
+        stale_seconds: float = 6 * 3600,
+        db_path: str = ":memory:",
+        poll_interval: float = 1.0
+    ):
+        """
+        Initialize the ScratchManager
+
+        Args:
+            root: Directory that holds the workspaces; defaults to a
+                  directory under the system temp directory
+            tmpfs: Put the workspaces on the RAM-backed ``/dev/shm`` instead,
+                   when it exists
+            quota_bytes: Total space the reservations may add up to
+            stale_seconds: Age after which a workspace not owned by a live
+                           local process is reclaimed
+            db_path: SQLite database of the reservation ledger; workers
+                     sharing it share the quota. The default keeps the
+                     ledger in memory, for this process only.
+            poll_interval: Seconds between checks for space freed by other
+                           processes while waiting
+        """
+        if tmpfs:
+            if os.path.isdir(TMPFS_ROOT):
+                root = os.path.join(TMPFS_ROOT, SCRATCH_DIRNAME)
+            else:
+                logger.warning(f"{TMPFS_ROOT} does not exist, using disk-backed scratch space")
+        self.root = root or os.path.join(tempfile.gettempdir(), SCRATCH_DIRNAME)
+        self.quota_bytes = quota_bytes
+        self.stale_seconds = stale_seconds
+        self.poll_interval = poll_interval
+        self.ledger = ScratchLedger(db_path, stale_seconds=stale_seconds)
+        # Bytes reserved by this process, and a wakeup for its own releases
+        self._reserved = 0
+        self._condition = asyncio.Condition()
+        self._active: Set[str] = set()
+        self._janitor: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def workspace(self, label: str = "run") -> AsyncIterator[Workspace]:
+        """Create a workspace for the duration of the block, then delete it and free its reservation"""
+        os.makedirs(self.root, exist_ok=True)
+        name = f"{os.getpid()}-{_UNSAFE_CHARS_RE.sub('_', label)[:48]}-{uuid.uuid4().hex[:12]}"
+        path = os.path.join(self.root, name)
+        os.mkdir(path)
+        self._active.add(path)
+        workspace = Workspace(self, path)
+        try:
+            yield workspace
+        finally:
+            self._active.discard(path)
+            await asyncio.to_thread(shutil.rmtree, path, True)
+            if workspace.reserved:
+                await self._release(workspace)
+
+    async def _reserve(self, workspace: Workspace, nbytes: int) -> None:
+        name = os.path.basename(workspace.path)
+        waited = False
+        async with self._condition:
+            while not await asyncio.to_thread(self.ledger.try_reserve, self.root, name, nbytes, self.quota_bytes):
+                if not waited:
+                    waited = True
+                    SCRATCH_BACKPRESSURE_WAITS.inc()
+                    logger.info(f"Scratch quota full ({self.quota_bytes:,} bytes reserved across workers), waiting")
+                # Woken by this process's releases; others' are noticed by polling
+                try:
+                    await asyncio.wait_for(self._condition.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._reserved += nbytes
+        await self._update_gauge()
+
+    async def _release(self, workspace: Workspace) -> None:
+        await asyncio.to_thread(self.ledger.release, os.path.basename(workspace.path))
+        async with self._condition:
+            self._reserved -= workspace.reserved
+            self._condition.notify_all()
+        await self._update_gauge()
+
+    async def _update_gauge(self) -> None:
+        SCRATCH_RESERVED_BYTES.set(await asyncio.to_thread(self.ledger.reserved, self.root))
+
+    def reclaim(self) -> int:
+        """
+        Remove workspaces of dead local processes, and others past ``stale_seconds``
+
+        Workspaces of other live local processes are never touched, however
+        old. Of this process's pid only workspaces it is not using are
+        removed, once stale; they were left by an earlier process with the
+        same pid (pid 1 in a restarted container).
+
+        Returns:
+            Number of workspaces removed
+        """
+        if not os.path.isdir(self.root):
+            return 0
+        now = time.time()
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.path in self._active:
+                continue
+            match = _WORKSPACE_RE.fullmatch(entry.name)
+            try:
+                age = now - entry.stat(follow_symlinks=False).st_mtime
+            except FileNotFoundError:
+                continue
+            pid = int(match.group('pid')) if match is not None else None
+            if pid is not None and pid != os.getpid():
+                if pid_alive(pid):
+                    continue
+            elif age < self.stale_seconds:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+            removed += 1
+        if removed:
+            logger.info(f"Reclaimed {removed} stale scratch workspace(s) under {self.root}")
+        return removed
+
+    def usage(self) -> Dict[str, Any]:
+        """Reserved bytes across workers, this process's share and actual bytes in the scratch root"""
+        used = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                try:
+                    used += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return {
+            'root': self.root,
+            'quota_bytes': self.quota_bytes,
+            'reserved_bytes': self.ledger.reserved(self.root),
+            'process_reserved_bytes': self._reserved,
+            'used_bytes': used,
+            'workspaces': len(self._active),
+        }
+
+    async def start_janitor(self, interval: float) -> None:
+        """Reclaim stale workspaces now and then every ``interval`` seconds"""
+        async def janitor() -> None:
+            while True:
+                try:
+                    await asyncio.to_thread(self.reclaim)
+                except Exception:
+                    logger.exception("Scratch janitor failed")
+                await asyncio.sleep(interval)
+
+        if self._janitor is None:
+            self._janitor = asyncio.create_task(janitor())
+
+    def close(self) -> None:
+        self.ledger.close()
+
+    async def stop_janitor(self) -> None:
+        if self._janitor is not None:
+            self._janitor.cancel()
+            try:
+                await self._janitor
+            except asyncio.CancelledError:
+                pass
+            self._janitor = None
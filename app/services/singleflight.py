@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class PipelineLease:
+    """
+    Cross-process leases on pipeline keys, stored in SQLite
+
+    Workers sharing ``db_path`` take a lease before running the pipeline
+    for a video, so a duplicate submitted to another worker waits for the
+    first run and then finds its results in the shared caches. Leases are
+    renewed while held and expire after ``ttl`` seconds if their holder
+    dies.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 60.0, poll_interval: float = 0.5):
+        """
+        Initialize the PipelineLease
+
+        Args:
+            db_path: Path of the SQLite database file. Parent directories are
+                     created if they do not exist.
+            ttl: Seconds a lease lasts without being renewed
+            poll_interval: Seconds between attempts while waiting for a lease
+        """
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pipeline_leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+
+    def try_acquire(self, key: str, owner: str) -> bool:
+        """Take the lease on key unless another owner holds an unexpired one"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO pipeline_leases (key, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE pipeline_leases.owner = excluded.owner OR pipeline_leases.expires_at <= ?
+                """,
+                (key, owner, now + self.ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def renew(self, key: str, owner: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE pipeline_leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                (time.time() + self.ttl, key, owner)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pipeline_leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @asynccontextmanager
+    async def hold(self, key: str, max_wait: float) -> AsyncIterator[bool]:
+        """
+        Hold the lease on key for the duration of the block
+
+        Waits up to ``max_wait`` seconds for another holder to finish, then
+        goes ahead without the lease rather than failing the request.
+
+        Yields:
+            Whether another worker held the lease when we arrived
+        """
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        deadline = time.monotonic() + max_wait
+        waited = False
+        acquired = await asyncio.to_thread(self.try_acquire, key, owner)
+        while not acquired and time.monotonic() < deadline:
+            waited = True
+            await asyncio.sleep(self.poll_interval)
+            acquired = await asyncio.to_thread(self.try_acquire, key, owner)
+        if not acquired:
+            logger.warning(f"Lease on {key} still held after {max_wait:.0f}s, running without it")
+
+        async def keep_alive() -> None:
+            while True:
+                await asyncio.sleep(self.ttl / 3)
+                await asyncio.to_thread(self.renew, key, owner)
+
+        renewer = asyncio.create_task(keep_alive()) if acquired else None
+        try:
+            yield waited
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+                await asyncio.to_thread(self.release, key, owner)
+
+
+class Flight:
+    """
+    One pipeline run shared by every concurrent request for the same key
+
+    Progress and events of the run are fanned out to each subscriber. A
+    late subscriber first gets the events it missed, so a streaming client
+    that joins halfway still sees the metadata and transcript.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.subscribers = 0
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+        self._event_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._stage: Optional[Tuple[str, float]] = None
+        self._stage_listeners: List[Callable[[str, float], Awaitable[None]]] = []
+
+    @property
+    def listening(self) -> bool:
+        """Whether any subscriber takes events"""
+        return bool(self._event_listeners)
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        self._events.append((event, data))
+        for listener in list(self._event_listeners):
+            try:
+                listener(event, data)
+            except Exception:
+                logger.exception(f"Event listener failed on {event}")
+
+    async def report(self, stage: str, progress: float) -> None:
+        self._stage = (stage, progress)
+        for listener in list(self._stage_listeners):
+            try:
+                await listener(stage, progress)
+            except Exception:
+                logger.exception(f"Stage listener failed on {stage}")
+
+    async def subscribe(
+        self,
+        on_stage: Optional[Callable[[str, float], Awaitable[None]]],
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]]
+    ) -> None:
+        self.subscribers += 1
+        if on_event is not None:
+            for event, data in self._events:
+                on_event(event, data)
+            self._event_listeners.append(on_event)
+        if on_stage is not None:
+            self._stage_listeners.append(on_stage)
+            if self._stage is not None:
+                await on_stage(*self._stage)
+
+    def unsubscribe(
+        self,
+        on_stage: Optional[Callable[[str, float], Awaitable[None]]],
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]]
+    ) -> None:
+        if on_event in self._event_listeners:
+            self._event_listeners.remove(on_event)
+        if on_stage in self._stage_listeners:
+            self._stage_listeners.remove(on_stage)
@@ -0,0 +1,91 @@
+import logging
+import math
+import re
+import threading
+from typing import List, Optional
+
+from app.services.lazy import LazyModule
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+tiktoken = LazyModule('tiktoken')
+
+# Encoding of the gpt-4o model family
+DEFAULT_ENCODING = "o200k_base"
+
+# Characters per token of English text, for estimates without an encoding
+CHARS_PER_TOKEN = 4.0
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding(model: Optional[str]):
+    """tiktoken encoding for the model, or None when it cannot be loaded"""
+    key = model or DEFAULT_ENCODING
+    if key in _encodings:
+        return _encodings[key]
+    with _encodings_lock:
+        if key not in _encodings:
+            encoding = None
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+                except KeyError:
+                    encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+            except Exception as e:
+                # The encoding files are downloaded on first use, which fails offline
+                logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+            _encodings[key] = encoding
+    return _encodings[key]
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Number of tokens ``text`` takes for ``model``
+
+    Counted with tiktoken. If the encoding cannot be loaded it is estimated
+    from the length, which is close for English and errs high for text with
+    many short words.
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(math.ceil(len(text) / CHARS_PER_TOKEN), len(text.split()))
+
+
+def split_by_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """
+    Split text into consecutive chunks of at most about ``max_tokens`` tokens
+
+    Chunks end at sentence boundaries where possible; a single sentence
+    longer than the limit is split between words.
+    """
+    pieces: List[str] = []
+    for sentence in _SENTENCE_END_RE.split(text.strip()):
+        if count_tokens(sentence, model) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        # Words per piece, from the sentence's own tokens per word
+        step = max(1, int(len(words) * max_tokens / count_tokens(sentence, model)))
+        pieces.extend(' '.join(words[i:i + step]) for i in range(0, len(words), step))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = count_tokens(piece, model) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(' '.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
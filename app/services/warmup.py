@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services import extractAudio
+from app.services.clients import ServiceClients
+from app.services.pipeline import SUMMARY_MODEL
+from app.services.tokens import count_tokens
+from app.services.ytdl_sessions import get_session_pool
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Matches no site-specific extractor, so every extractor compiles its URL pattern
+PREWARM_URL = "https://prewarm.invalid/video"
+
+
+def _open_session() -> None:
+    with get_session_pool().session():
+        pass
+
+
+def prewarm(clients: ServiceClients) -> Dict[str, float]:
+    """
+    Do the slow first-use work of a worker process ahead of the first request
+
+    Imports yt-dlp, matches a URL against every extractor, which compiles
+    their URL patterns, and opens a pooled yt-dlp session with the saved
+    cookies, then imports the OpenAI SDK, creates the pooled client and
+    loads the tiktoken encoding (downloaded on its first use).
+    Requests that arrive before it finishes do the parts they need
+    themselves; the imports are locked, so a module is never imported twice.
+
+    Args:
+        clients: The process's shared API clients
+
+    Returns:
+        Seconds spent per step
+    """
+    steps: List[Tuple[str, Callable[[], object]]] = [
+        ('yt_dlp', extractAudio.yt_dlp.load),
+        ('extractors', lambda: extractAudio.video_key_from_url(PREWARM_URL)),
+        ('ytdl_session', _open_session),
+        ('openai', clients.get_openai),
+        ('tiktoken', lambda: count_tokens('prewarm', SUMMARY_MODEL)),
+    ]
+    timings: Dict[str, float] = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            # Not fatal: the request that needs it will report the error
+            logger.exception(f"Pre-warm step {name} failed")
+            continue
+        timings[name] = round(time.perf_counter() - started, 3)
+    logger.info(f"Pre-warmed in {sum(timings.values()):.2f}s", extra={"prewarm": timings})
+    return timings
+
+
+def start_prewarm(clients: ServiceClients) -> Optional[asyncio.Task]:
+    """
+    Run ``prewarm`` in a thread, so the app starts serving while it runs
+
+    Call it from the lifespan before yielding; the task finishes on its own.
+    """
+    return asyncio.create_task(asyncio.to_thread(prewarm, clients))
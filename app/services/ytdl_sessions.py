@@ -0,0 +1,279 @@
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Mapping, Optional
+
+from app.config import settings as config
+from app.services.lazy import LazyModule
+from app.services.metrics import EXTRACTOR_LIMIT_WAITS
+
+if TYPE_CHECKING:
+    import yt_dlp as _yt_dlp
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+yt_dlp = LazyModule('yt_dlp')
+
+# Options of the pooled sessions: metadata extraction and format selection
+SESSION_PARAMS = {'quiet': True, 'no_warnings': True, 'noplaylist': True, 'format': 'bestaudio/best'}
+
+# Save the cookie jar at most this often while sessions are in use
+COOKIE_SAVE_INTERVAL_SECONDS = 60.0
+
+
+class _Session:
+    def __init__(self, ydl: "_yt_dlp.YoutubeDL"):
+        self.ydl = ydl
+        self.created = time.monotonic()
+        self.uses = 0
+
+
+class YoutubeDLSessionPool:
+    """
+    Long-lived yt-dlp sessions for one worker process, sharing one cookie jar
+
+    A ``YoutubeDL`` keeps its extractor instances, which remember what they
+    set up for a site (Instagram's session token, for one), and its HTTP
+    connections. Reusing it saves those round trips on every request.
+    A ``YoutubeDL`` is not thread-safe, so each thread checks one out for
+    the duration of a call; the pool grows to the number of concurrent
+    callers and keeps up to ``max_idle`` of them.
+
+    All sessions, and one-off downloaders from ``downloader``, share a cookie
+    jar that is loaded from and saved to ``cookie_file``, so a logged-in
+    session survives restarts. Sessions are replaced after ``max_age``
+    seconds, and as soon as a call using one fails, so expired site
+    sessions are set up again.
+
+    ``limit`` caps the concurrent requests per extractor to stay under
+    platform throttles. Login credentials are set on a session only while
+    it is checked out for their extractor, so no other site is sent them.
+    """
+
+    def __init__(
+        self,
+        cookie_file: Optional[str] = None,
+        max_age: float = 3600.0,
+        max_idle: int = 8,
+        extractor_limits: Optional[Mapping[str, int]] = None,
+        credentials: Optional[Mapping[str, Dict[str, str]]] = None
+    ):
+        """
+        Initialize the YoutubeDLSessionPool
+
+        Args:
+            cookie_file: Netscape cookie file to load and persist; None keeps
+                         cookies in memory only
+            max_age: Seconds after which a session is replaced
+            max_idle: Idle sessions kept for reuse
+            extractor_limits: Max concurrent requests per extractor key
+                              (e.g. ``{"Instagram": 2}``); others are unlimited
+            credentials: yt-dlp login params (``username``, ``password``)
+                         per extractor key, e.g. ``{"Instagram": {...}}``
+        """
+        self.cookie_file = cookie_file
+        self.max_age = max_age
+        self.credentials = dict(credentials or {})
+        # Whether each extractor with credentials accepts a password login
+        self._login_supported: Dict[str, bool] = {}
+        self._idle: "queue.LifoQueue[_Session]" = queue.LifoQueue(maxsize=max(1, max_idle))
+        self._limits = {key: threading.BoundedSemaphore(limit) for key, limit in (extractor_limits or {}).items() if limit > 0}
+        self._jar = None
+        self._jar_lock = threading.Lock()
+        self._last_saved = time.monotonic()
+        self.created = 0
+        self.reused = 0
+
+    @property
+    def cookiejar(self):
+        """The shared ``YoutubeDLCookieJar``, loaded from ``cookie_file`` on first use"""
+        if self._jar is None:
+            with self._jar_lock:
+                if self._jar is None:
+                    jar = yt_dlp.cookies.YoutubeDLCookieJar()
+                    if self.cookie_file and os.path.exists(self.cookie_file):
+                        try:
+                            jar.load(self.cookie_file)
+                            logger.info(f"Loaded {len(jar)} cookies from {self.cookie_file}")
+                        except Exception as e:
+                            logger.warning(f"Ignoring unreadable cookie file {self.cookie_file}: {e}")
+                    self._jar = jar
+        return self._jar
+
+    def _login_params(self, extractor_key: Optional[str]) -> Dict[str, str]:
+        """The login params for an extractor, if it has credentials and can use them"""
+        login = self.credentials.get(extractor_key or 'Generic')
+        if not login:
+            return {}
+        if extractor_key not in self._login_supported:
+            supported = yt_dlp.extractor.get_info_extractor(extractor_key).supports_login()
+            if not supported:
+                logger.warning(
+                    f"This yt-dlp cannot log in to {extractor_key} with a password; put the cookies of a "
+                    f"logged-in session in {self.cookie_file or 'YTDL_COOKIE_FILE'} instead"
+                )
+            self._login_supported[extractor_key] = supported
+        return login if self._login_supported[extractor_key] else {}
+
+    def _new_ydl(self, params: Dict[str, Any]) -> "_yt_dlp.YoutubeDL":
+        ydl = yt_dlp.YoutubeDL(params)
+        # ``YoutubeDL.cookiejar`` is a cached property; setting it shares the jar
+        ydl.cookiejar = self.cookiejar
+        return ydl
+
+    @contextmanager
+    def session(self, extractor_key: Optional[str] = None) -> Iterator["_yt_dlp.YoutubeDL"]:
+        """
+        Check out a session for the block
+
+        The session goes back to the pool unless the block raised or the
+        session is older than ``max_age``; then it is closed. With
+        ``extractor_key`` it carries that extractor's login for the block.
+        """
+        session = None
+        while session is None:
+            try:
+                candidate = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - candidate.created < self.max_age:
+                session = candidate
+            else:
+                self._close(candidate)
+
+        if session is None:
+            session = _Session(self._new_ydl(SESSION_PARAMS))
+            self.created += 1
+        else:
+            self.reused += 1
+
+        login = self._login_params(extractor_key)
+        session.ydl.params.update(login)
+        try:
+            yield session.ydl
+        except BaseException:
+            # The site session may have expired or been blocked; start over next time
+            self._close(session)
+            raise
+        finally:
+            for key in login:
+                session.ydl.params.pop(key, None)
+        session.uses += 1
+        if time.monotonic() - session.created >= self.max_age:
+            self._close(session)
+        else:
+            try:
+                self._idle.put_nowait(session)
+            except queue.Full:
+                self._close(session)
+        if time.monotonic() - self._last_saved >= COOKIE_SAVE_INTERVAL_SECONDS:
+            self.save_cookies()
+
+    def downloader(self, params: Dict[str, Any], extractor_key: Optional[str] = None) -> "_yt_dlp.YoutubeDL":
+        """
+        A one-off ``YoutubeDL`` with its own options (hooks, postprocessors),
+        the shared cookies and the login of ``extractor_key``
+        """
+        return self._new_ydl({**params, **self._login_params(extractor_key)})
+
+    @contextmanager
+    def limit(self, extractor_key: Optional[str]) -> Iterator[None]:
+        """Hold one of the extractor's concurrency slots for the block, waiting for one if needed"""
+        semaphore = self._limits.get(extractor_key or 'Generic')
+        if semaphore is None:
+            yield
+            return
+        if not semaphore.acquire(blocking=False):
+            EXTRACTOR_LIMIT_WAITS.inc(extractor=extractor_key)
+            semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def _close(self, session: _Session) -> None:
+        try:
+            session.ydl.close()
+        except Exception:
+            logger.exception("Failed to close yt-dlp session")
+
+    def save_cookies(self) -> None:
+        """Write the cookie jar to ``cookie_file``, readable by the owner only"""
+        self._last_saved = time.monotonic()
+        if not self.cookie_file or self._jar is None:
+            return
+        with self._jar_lock:
+            directory = os.path.dirname(self.cookie_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.cookie_file}.{os.getpid()}.tmp"
+            try:
+                # Sessions in other threads add cookies under the jar's own lock
+                with self._jar._cookies_lock:
+                    self._jar.save(temp_path)
+                os.chmod(temp_path, 0o600)
+                os.replace(temp_path, self.cookie_file)
+            except OSError:
+                logger.exception(f"Failed to save cookies to {self.cookie_file}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'idle_sessions': self._idle.qsize(),
+            'sessions_created': self.created,
+            'sessions_reused': self.reused,
+            'cookies': len(self._jar) if self._jar is not None else None,
+        }
+
+    def close(self) -> None:
+        """Close the idle sessions and save the cookies"""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        self.save_cookies()
+
+
+def _login_credentials() -> Dict[str, Dict[str, str]]:
+    """yt-dlp login params per extractor from the configured accounts"""
+    credentials = {}
+    if config.instagram_username and config.instagram_password:
+        credentials['Instagram'] = {'username': config.instagram_username, 'password': config.instagram_password}
+    return credentials
+
+
+_session_pool: Optional[YoutubeDLSessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> YoutubeDLSessionPool:
+    """
+    Return the process-wide yt-dlp session pool, creating it on first use
+
+    Creating it does not import yt-dlp; the app lifespan creates it at
+    startup, in a thread.
+    """
+    global _session_pool
+    if _session_pool is None:
+        with _session_pool_lock:
+            if _session_pool is None:
+                _session_pool = YoutubeDLSessionPool(
+                    cookie_file=config.ytdl_cookie_file or None,
+                    max_age=config.ytdl_session_max_age_seconds,
+                    max_idle=config.ytdl_max_idle_sessions,
+                    extractor_limits=config.ytdl_extractor_concurrency,
+                    credentials=_login_credentials()
+                )
+    return _session_pool
+
+
+def shutdown_session_pool() -> None:
+    """Close the process-wide session pool if it was created"""
+    global _session_pool
+    if _session_pool is not None:
+        _session_pool.close()
+        _session_pool = None
@@ -0,0 +1,203 @@
+"""
+End-to-end benchmark of the extraction API against local stand-ins
+
+Starts fake OpenAI and Notion servers and a media server (see
+``benchmarks.fakes``), runs the real app with uvicorn pointed at them, and
+drives ``/api/audio/extract`` at increasing concurrency. Reports p50/p95/p99
+latency and throughput per level. Needs ffmpeg on the PATH and no network
+access.
+
+Usage:
+    python -m benchmarks.bench_extract [--concurrency 1,4,16] [--requests 32]
+        [--scenario cold|cached|write-behind] [--transcript-words 150] [--max-p95-ms 2000] [--json out.json]
+
+With ``--max-p95-ms`` or ``--max-error-rate`` the exit status is 1 when a
+level exceeds the budget, so the script can gate CI.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.fakes import BackgroundServer, FakeBehavior, make_audio_fixture, media_app, notion_app, openai_app
+
+SCENARIOS = {
+    "cold": "a new video every request: download, transcribe, summarize and a synchronous Notion write",
+    "cached": "the same video every request: metadata, transcript and summary come from the caches",
+    "write-behind": "a new video every request, with the Notion write queued in the outbox",
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+async def run_level(client: httpx.AsyncClient, media_url: str, scenario: str, concurrency: int, requests: int) -> Dict[str, Any]:
+    """Send ``requests`` extractions with ``concurrency`` in flight and summarize the latencies"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            name = "clip" if scenario == "cached" else f"clip-{uuid.uuid4().hex[:12]}"
+            body: Dict[str, Any] = {"url": f"{media_url}/media/{name}.m4a"}
+            if scenario == "write-behind":
+                body["notion_write_behind"] = True
+            started = time.perf_counter()
+            try:
+                response = await client.post("/api/audio/extract", json=body)
+                outcome = None if response.status_code == 200 else f"http_{response.status_code}"
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if outcome:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "error_rate": sum(errors.values()) / requests if requests else 0.0,
+        "rps": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+async def drive(app_url: str, media_url: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=app_url, timeout=timeout, limits=limits) as client:
+        # Warm up imports, pools and (for the cached scenario) the caches
+        await run_level(client, media_url, args.scenario, 1, args.warmup)
+        for concurrency in args.concurrency:
+            result = await run_level(client, media_url, args.scenario, concurrency, args.requests)
+            results.append(result)
+            print(
+                f"  c={concurrency:<4} n={result['requests']:<5} rps={result['rps']:8.2f}"
+                f"  p50={result['p50_ms']:8.1f}ms  p95={result['p95_ms']:8.1f}ms  p99={result['p99_ms']:8.1f}ms"
+                f"  errors={sum(result['errors'].values())}",
+                flush=True
+            )
+    return results
+
+
+def configure_app(workdir: str, openai_url: str, notion_url: str, args: argparse.Namespace) -> None:
+    """Point the app's settings at the fakes and its files into ``workdir``; must run before ``app`` is imported"""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "NOTION_API_KEY": "bench",
+        "NOTION_BASE_URL": notion_url,
+        "NOTION_DATABASE_ID": "bench-database",
+        "NOTION_REQUESTS_PER_SECOND": str(args.notion_rps),
+        "NOTION_BURST": str(max(1, int(args.notion_rps))),
+        "NOTION_BACKOFF_BASE_SECONDS": "0.05",
+        "NOTION_SYNC_RETRY_BASE_SECONDS": "0.1",
+        "STATE_DB_PATH": os.path.join(workdir, "state.db"),
+        "RESULT_CACHE_PATH": os.path.join(workdir, "results.db"),
+        "YTDL_COOKIE_FILE": os.path.join(workdir, "cookies.txt"),
+        "SCRATCH_DIR": os.path.join(workdir, "scratch"),
+        "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        "FFMPEG_LOCATION": shutil.which("ffmpeg") or "ffmpeg",
+    })
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="cold")
+    parser.add_argument("--concurrency", default="1,2,4,8,16",
+                        type=lambda value: [int(level) for level in value.split(",")],
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--audio-seconds", type=float, default=20.0, help="length of the media fixture")
+    parser.add_argument("--transcript-words", type=int, default=150,
+                        help="length of the fake transcripts; long ones are summarized in sections")
+    parser.add_argument("--openai-latency-ms", type=float, default=150.0)
+    parser.add_argument("--notion-latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake API calls that fail")
+    parser.add_argument("--notion-rps", type=float, default=1000.0,
+                        help="Notion rate limit for the app; the real API allows about 3")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if any level's p95 latency exceeds this")
+    parser.add_argument("--max-error-rate", type=float, help="fail if any level's error rate exceeds this")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if shutil.which("ffmpeg") is None:
+        print("ffmpeg is required on the PATH", file=sys.stderr)
+        return 2
+
+    workdir = tempfile.mkdtemp(prefix="bench-extract-")
+    servers: List[BackgroundServer] = []
+    try:
+        fixture_path = os.path.join(workdir, "fixture.m4a")
+        make_audio_fixture(fixture_path, args.audio_seconds)
+        with open(fixture_path, "rb") as f:
+            fixture = f.read()
+
+        openai_server = BackgroundServer(openai_app(FakeBehavior(args.openai_latency_ms, args.jitter_ms, args.error_rate), args.transcript_words), "openai").start()
+        notion_server = BackgroundServer(notion_app(FakeBehavior(args.notion_latency_ms, args.jitter_ms, args.error_rate)), "notion").start()
+        media_server = BackgroundServer(media_app(fixture), "media").start()
+        servers.extend([openai_server, notion_server, media_server])
+
+        configure_app(workdir, openai_server.url, notion_server.url, args)
+        from app.main import app
+        app_server = BackgroundServer(app, "app").start()
+        servers.append(app_server)
+
+        print(f"scenario {args.scenario}: {SCENARIOS[args.scenario]}")
+        print(
+            f"fixture {args.audio_seconds:.0f}s / {len(fixture):,} bytes, openai {args.openai_latency_ms:.0f}ms,"
+            f" notion {args.notion_latency_ms:.0f}ms, error rate {args.error_rate:.1%}"
+        )
+        results = asyncio.run(drive(app_server.url, media_server.url, args))
+    finally:
+        for server in reversed(servers):
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenario": args.scenario, "args": vars(args), "levels": results}, f, indent=2)
+
+    failed = False
+    for result in results:
+        if args.max_p95_ms is not None and result["p95_ms"] > args.max_p95_ms:
+            print(f"FAIL: p95 {result['p95_ms']:.1f}ms > {args.max_p95_ms:.1f}ms at c={result['concurrency']}")
+            failed = True
+        if args.max_error_rate is not None and result["error_rate"] > args.max_error_rate:
+            print(f"FAIL: error rate {result['error_rate']:.1%} > {args.max_error_rate:.1%} at c={result['concurrency']}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Micro-benchmark of summary -> Notion block compilation
+
+Compares the single-pass compiler in ``app.services.notion_blocks`` with the
+previous two-step path (regex ``clean_markdown`` followed by line-by-line
+block inference), reproduced below as the baseline.
+
+Usage:
+    python -m benchmarks.bench_markdown_blocks [--points 2000] [--repeat 15]
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.services.notion_blocks import _rich_text, markdown_to_blocks, markdown_to_plain
+
+
+def legacy_clean_markdown(text: str) -> str:
+    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    text = re.sub(r'^---+$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+
+def legacy_format_summary_to_blocks(summary: str) -> List[Dict[str, Any]]:
+    blocks = [{"object": "block", "type": "heading_2", "heading_2": {"rich_text": _rich_text("Summary")}}]
+    for line in summary.split('\n'):
+        if not line.strip():
+            continue
+        if line.strip().startswith(tuple(f'{i}.' for i in range(1, 21))):
+            content = line.strip()
+            for i in range(1, 21):
+                if content.startswith(f'{i}.'):
+                    content = content[len(f'{i}.'):].strip()
+                    break
+            blocks.append({"object": "block", "type": "numbered_list_item",
+                           "numbered_list_item": {"rich_text": _rich_text(content)}})
+        elif line.strip().startswith(('a.', 'b.', 'c.', 'd.', 'e.', 'f.', 'g.', 'h.')):
+            blocks.append({"object": "block", "type": "bulleted_list_item",
+                           "bulleted_list_item": {"rich_text": _rich_text(line.strip()[2:].strip())}})
+        elif '•' in line:
+            blocks.append({"object": "block", "type": "bulleted_list_item",
+                           "bulleted_list_item": {"rich_text": _rich_text(line.split('•', 1)[-1].strip())}})
+        else:
+            blocks.append({"object": "block", "type": "paragraph",
+                           "paragraph": {"rich_text": _rich_text(line.strip())}})
+    return blocks
+
+
+def legacy(summary: str) -> List[Dict[str, Any]]:
+    return legacy_format_summary_to_blocks(legacy_clean_markdown(summary))
+
+
+def compiled(summary: str) -> List[Dict[str, Any]]:
+    # The API response also needs the plain text, which the legacy path got from clean_markdown
+    markdown_to_plain(summary)
+    return markdown_to_blocks(summary)
+
+
+WORDS = "squat depth knee tracking hip hinge tempo brace core volume recovery protein sleep cadence".split()
+
+
+def synthetic_summary(points: int, markdown: bool = True, seed: int = 0) -> str:
+    """
+    A summary in the shape the model produces
+
+    With ``markdown`` it also has the headings, rules, quotes, indented bullets
+    and bold/italic words models add despite the prompt; without it, it
+    follows the prompt's plain numbered-point and bullet format.
+    """
+    rng = random.Random(seed)
+
+    def sentence() -> str:
+        words = rng.choices(WORDS, k=rng.randint(6, 14))
+        if markdown:
+            words[rng.randrange(len(words))] = f"**{rng.choice(WORDS)}**"
+            words[rng.randrange(len(words))] = f"*{rng.choice(WORDS)}*"
+        return " ".join(words).capitalize() + "."
+
+    if not markdown:
+        lines = []
+        for number in range(1, points + 1):
+            lines.extend([f"{number}. {sentence()}", ""])
+            lines.extend(f"• {sentence()}" for _ in range(rng.randint(1, 3)))
+            lines.append("")
+        return "\n".join(lines)
+
+    lines = ["## Overview", sentence(), ""]
+    for number in range(1, points + 1):
+        lines.append(f"{number}. {sentence()}")
+        lines.append("")
+        for _ in range(rng.randint(1, 3)):
+            lines.append(f"• {sentence()}")
+            if rng.random() < 0.3:
+                lines.append(f"    - {sentence()}")
+        lines.append("")
+        if number % 25 == 0:
+            lines.extend(["---", f"### Section {number // 25 + 1}", f"> {sentence()}", ""])
+    return "\n".join(lines)
+
+
+def count_blocks(blocks: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Number of blocks and rich text items, children included"""
+    total_blocks = total_items = 0
+    for block in blocks:
+        body = block[block["type"]]
+        children_blocks, children_items = count_blocks(body.get("children", []))
+        total_blocks += 1 + children_blocks
+        total_items += len(body.get("rich_text", [])) + children_items
+    return total_blocks, total_items
+
+
+def measure(funcs: Dict[str, Callable[[str], Any]], summary: str, repeat: int) -> Dict[str, List[float]]:
+    """Time each function ``repeat`` times, taking turns so load on the machine hits all of them alike"""
+    timings: Dict[str, List[float]] = {name: [] for name in funcs}
+    for _ in range(repeat):
+        for name, func in funcs.items():
+            started = time.perf_counter()
+            func(summary)
+            timings[name].append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--points", type=int, default=2000, help="numbered points in the synthetic summary")
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    for markdown in (False, True):
+        summary = synthetic_summary(args.points, markdown=markdown)
+        print(f"{'markdown' if markdown else 'plain'} summary: {len(summary):,} chars, {summary.count(chr(10)):,} lines")
+        funcs = {"legacy": legacy, "compiled": compiled}
+        for func in funcs.values():
+            func(summary)  # warm up regex caches
+        all_timings = measure(funcs, summary, args.repeat)
+        results = {}
+        for name, func in funcs.items():
+            timings = all_timings[name]
+            blocks, items = count_blocks(func(summary))
+            results[name] = statistics.median(timings)
+            print(
+                f"  {name:>9}: median {results[name] * 1000:8.2f} ms  min {min(timings) * 1000:8.2f} ms"
+                f"  blocks {blocks:,}  rich text items {items:,}"
+            )
+        print(f"    speedup: {results['legacy'] / results['compiled']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
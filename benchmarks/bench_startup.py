@@ -0,0 +1,178 @@
+"""
+Startup benchmark: how soon a fresh worker process serves, and serves fast
+
+Each run starts the app in a new uvicorn process and measures:
+
+- import: seconds to ``import app.main`` (in a separate interpreter), and
+  which heavy dependencies that import pulled in
+- ready: from spawning the process until ``/health`` answers
+- first info: latency of the first ``/api/audio/info`` request, for a
+  video on a local media server, sent ``--delay-ms`` after the process is
+  ready. Without pre-warming it pays for importing yt-dlp and building
+  its extractor list; ``--delay-ms 0`` shows the worst case, a request
+  racing the pre-warm.
+
+Runs once with the background pre-warm and once without, and reports the
+median of each. Needs no network access or ffmpeg.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--delay-ms 1000] [--max-ready-ms 1500] [--json out.json]
+
+With ``--max-ready-ms`` the exit status is 1 when the median time to ready
+exceeds the budget, so the script can gate CI.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.fakes import BackgroundServer, media_app
+
+# Imports that used to be paid by every worker before it could serve
+HEAVY_MODULES = ("yt_dlp", "openai", "notion_client")
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - started\n"
+    f"print(elapsed, ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def app_env(workdir: str, prewarm: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "bench",
+        "NOTION_API_KEY": "bench",
+        "STATE_DB_PATH": os.path.join(workdir, "state.db"),
+        "RESULT_CACHE_PATH": os.path.join(workdir, "results.db"),
+        "PREWARM_ENABLED": "true" if prewarm else "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    return env
+
+
+def measure_import(env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], env=env, check=True, capture_output=True, text=True
+    ).stdout.split()
+    return {"import_s": float(output[0]), "loaded": output[1].split(",") if len(output) > 1 else []}
+
+
+def measure_server(env: Dict[str, str], media_url: str, delay: float, timeout: float) -> Dict[str, float]:
+    """Start uvicorn, time until ``/health`` answers, then time one ``/api/audio/info`` request"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = started + timeout
+    try:
+        with httpx.Client(base_url=base, timeout=timeout) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"app exited with status {process.returncode}")
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("app did not become ready")
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter() - started
+
+            time.sleep(delay)
+            requested = time.perf_counter()
+            response = client.get("/api/audio/info", params={"url": f"{media_url}/media/startup-{port}.m4a"})
+            response.raise_for_status()
+            first_info = time.perf_counter() - requested
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return {"ready_s": ready, "first_info_s": first_info}
+
+
+def run_mode(prewarm: bool, media_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    runs: List[Dict[str, Any]] = []
+    for _ in range(args.runs):
+        workdir = tempfile.mkdtemp(prefix="bench-startup-")
+        try:
+            env = app_env(workdir, prewarm)
+            run = measure_import(env)
+            run.update(measure_server(env, media_url, args.delay_ms / 1000, args.timeout))
+            runs.append(run)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result: Dict[str, Any] = {"prewarm": prewarm, "runs": runs, "loaded_by_import": runs[-1]["loaded"]}
+    for key in ("import_s", "ready_s", "first_info_s"):
+        result[f"{key[:-2]}_ms"] = statistics.median(run[key] for run in runs) * 1000
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per mode")
+    parser.add_argument("--delay-ms", type=float, default=1000.0,
+                        help="wait between ready and the first info request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--max-ready-ms", type=float, help="fail if the median time to ready exceeds this")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    media_server = BackgroundServer(media_app(b"\0" * 4096), "media").start()
+    results = []
+    try:
+        for prewarm in (True, False):
+            result = run_mode(prewarm, media_server.url, args)
+            results.append(result)
+            print(
+                f"  prewarm={'on ' if prewarm else 'off'}  import={result['import_ms']:7.1f}ms"
+                f"  ready={result['ready_ms']:7.1f}ms  first info={result['first_info_ms']:7.1f}ms"
+                f"  loaded by import: {', '.join(result['loaded_by_import']) or 'none'}",
+                flush=True
+            )
+    finally:
+        media_server.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "modes": results}, f, indent=2)
+
+    failed = False
+    for result in results:
+        if args.max_ready_ms is not None and result["ready_ms"] > args.max_ready_ms:
+            print(f"FAIL: ready {result['ready_ms']:.1f}ms > {args.max_ready_ms:.1f}ms with prewarm={result['prewarm']}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
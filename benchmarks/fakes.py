@@ -0,0 +1,262 @@
+"""
+Local stand-ins for the services the pipeline talks to
+
+- ``openai_app``: the transcription and chat completion endpoints
+- ``notion_app``: the Notion endpoints used to create and look up pages
+- ``media_app``: a media file server for yt-dlp's generic extractor
+
+Each fake API answers after a configurable latency and fails a configurable
+share of requests with retryable errors, so retries and backoff are part of
+what gets measured. ``BackgroundServer`` runs any of them (or the app under
+test) with uvicorn on a free local port.
+"""
+import asyncio
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+WORDS = "squat depth knee tracking hip hinge tempo brace core volume recovery protein sleep cadence".split()
+
+SUMMARY = (
+    "## Key points\n"
+    "1. **Brace** before every rep\n\n"
+    "• Breathe into the *belly*\n"
+    "• Keep the ribs down\n\n"
+    "2. Control the tempo\n\n"
+    "• Three seconds down\n"
+)
+
+
+@dataclass
+class FakeBehavior:
+    """How a fake API responds"""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # share of requests answered with a retryable error
+
+    async def delay(self) -> None:
+        seconds = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+def openai_app(behavior: FakeBehavior, transcript_words: int = 150) -> FastAPI:
+    """Fake OpenAI API; point ``OPENAI_BASE_URL`` at ``<server>/v1``"""
+    app = FastAPI()
+    app.state.requests = 0
+
+    def error() -> JSONResponse:
+        return JSONResponse(
+            {"error": {"message": "Injected failure", "type": "server_error", "code": None}},
+            status_code=503
+        )
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        app.state.requests += 1
+        # Read the upload like the real API would, without parsing the form
+        body = await request.body()
+        await behavior.delay()
+        if behavior.should_fail():
+            return error()
+        rng = random.Random(len(body))
+        return {"text": " ".join(rng.choices(WORDS, k=transcript_words)) + "."}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        payload = await request.json()
+        await behavior.delay()
+        if behavior.should_fail():
+            return error()
+        schema = ((payload.get("response_format") or {}).get("json_schema") or {}).get("name")
+        if schema == "section_notes":
+            content = json.dumps({"notes": SUMMARY})
+        else:
+            content = json.dumps({"title": "Bracing for squats", "category": "Legs", "summary": SUMMARY})
+        # Roughly what the real API would bill
+        prompt_tokens = sum(len(message.get("content") or "") for message in payload.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def notion_app(behavior: FakeBehavior) -> FastAPI:
+    """Fake Notion API; point ``NOTION_BASE_URL`` at the server root"""
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.pages = 0
+
+    database = {
+        "object": "database",
+        "id": "bench-database",
+        "url": "https://www.notion.so/bench-database",
+        "last_edited_time": "2024-01-01T00:00:00.000Z",
+        "title": [{"plain_text": "Benchmark"}],
+        "properties": {
+            "Name": {"id": "title", "type": "title", "title": {}},
+            "Date": {"id": "date", "type": "date", "date": {}},
+            "Category": {"id": "cat", "type": "select", "select": {"options": [{"name": "Legs"}]}},
+            "Author": {"id": "auth", "type": "rich_text", "rich_text": {}},
+            "URL": {"id": "url", "type": "url", "url": {}},
+        },
+    }
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        app.state.requests += 1
+        await behavior.delay()
+        if behavior.should_fail():
+            # Alternate between the two retryable failures the service handles
+            if random.random() < 0.5:
+                return JSONResponse(
+                    {"object": "error", "status": 429, "code": "rate_limited", "message": "Injected rate limit"},
+                    status_code=429,
+                    headers={"Retry-After": "0.05"}
+                )
+            return JSONResponse(
+                {"object": "error", "status": 503, "code": "service_unavailable", "message": "Injected failure"},
+                status_code=503
+            )
+        return await call_next(request)
+
+    def page() -> Dict[str, Any]:
+        app.state.pages += 1
+        page_id = str(uuid.uuid4())
+        return {"object": "page", "id": page_id, "url": f"https://www.notion.so/{page_id.replace('-', '')}"}
+
+    @app.get("/v1/databases/{database_id}")
+    async def retrieve_database(database_id: str):
+        return {**database, "id": database_id}
+
+    @app.post("/v1/databases/{database_id}/query")
+    async def query_database(database_id: str):
+        return {"object": "list", "results": [], "has_more": False, "next_cursor": None}
+
+    @app.post("/v1/search")
+    async def search():
+        return {"object": "list", "results": [database], "has_more": False, "next_cursor": None}
+
+    @app.post("/v1/pages")
+    async def create_page():
+        return page()
+
+    @app.patch("/v1/pages/{page_id}")
+    async def update_page(page_id: str):
+        return {"object": "page", "id": page_id, "url": f"https://www.notion.so/{page_id}"}
+
+    @app.patch("/v1/blocks/{block_id}/children")
+    async def append_children(block_id: str):
+        return {"object": "list", "results": [], "has_more": False, "next_cursor": None}
+
+    return app
+
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def make_audio_fixture(path: str, seconds: float, ffmpeg: str = "ffmpeg") -> None:
+    """
+    Write an AAC clip of tones separated by short silences
+
+    The moov atom is moved to the front so ffmpeg can stream the file.
+    """
+    subprocess.run(
+        [
+            ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+            "-af", "volume='if(lt(mod(t,4),3.5),1,0)':eval=frame",
+            "-c:a", "aac", "-b:a", "64k", "-movflags", "+faststart", path,
+        ],
+        check=True
+    )
+
+
+def media_app(fixture: bytes, content_type: str = "audio/mp4") -> FastAPI:
+    """
+    Serve ``fixture`` at ``/media/<any name>.m4a``, with Range support
+
+    Every distinct name is a distinct video to yt-dlp's generic extractor,
+    so a benchmark can defeat the metadata and result caches by varying it.
+    """
+    app = FastAPI()
+    size = len(fixture)
+
+    @app.api_route("/media/{name}.m4a", methods=["GET", "HEAD"])
+    async def media(name: str, request: Request):
+        headers = {"Accept-Ranges": "bytes", "Content-Type": content_type}
+        match = _RANGE_RE.fullmatch(request.headers.get("range", ""))
+        if not match:
+            body = b"" if request.method == "HEAD" else fixture
+            return Response(body, headers={**headers, "Content-Length": str(size)})
+
+        start, end = match.groups()
+        if start:
+            first, last = int(start), min(int(end) if end else size - 1, size - 1)
+        else:
+            first, last = max(0, size - int(end)), size - 1
+        if first >= size:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        body = fixture[first:last + 1] if request.method != "HEAD" else b""
+        return Response(
+            body,
+            status_code=206,
+            headers={**headers, "Content-Range": f"bytes {first}-{last}/{size}", "Content-Length": str(last - first + 1)}
+        )
+
+    return app
+
+
+class BackgroundServer:
+    """Run an ASGI app with uvicorn in a daemon thread on a free local port"""
+
+    def __init__(self, app: Any, name: str):
+        self.name = name
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name=f"server-{name}", daemon=True)
+        self.url: Optional[str] = None
+
+    def start(self, timeout: float = 30.0) -> "BackgroundServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"{self.name} server did not start")
+            time.sleep(0.02)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=30)